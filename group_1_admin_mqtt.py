@@ -1,29 +1,70 @@
 # group_1_admin_mqtt.py
 #Syed
+import os
 import json
 import time
 import threading
-from typing import Optional
 import paho.mqtt.client as mqtt
-from group_1_storage import (
-    init_db, insert_message, insert_anomaly, insert_status,
-    get_schedules, purge_old_data
-)
+import group_1_codec as codec
+from group_1_db_pool import get_pool
+from group_1_migrations import PARTITIONED_TABLES
+from group_1_partitions import get_partitions
+import group_1_rollups as rollups
+from group_1_write_queue import WriteBehindQueue
+from group_1_live_feed import LiveFeed
+from group_1_device_registry import DeviceRegistry
+from group_1_validator import validate_payload, validate_object, decode_failure
+from group_1_metrics import (MESSAGES, DEVICE_MESSAGES, DUPLICATES, PAYLOAD_FORMATS, BATCH_READINGS, STAGE_SECONDS,
+                             SCHEDULE_FIRINGS, PURGE_SECONDS)
+from group_1_ingest_pool import IngestPool
+from group_1_dedupe import SeqDeduper, DUPLICATE
+from group_1_latency import LatencyTracker
+from group_1_util import expand_status
+
+# standalone -- one process ingests, serves the API state, runs schedules (default)
+# ingest     -- shared-subscription worker ($share/<group>/...): ingest and write only
+# api        -- the Flask process while ingest workers run: schedules, control, live
+#               feed (observed, not persisted) and a device registry refreshed from SQLite
+MODES = ("standalone", "ingest", "api")
+
 
 class AdminMQTT:
     """
     Background MQTT bridge:
     - Subscribes to data/status topics
-    - Persists messages/statuses and service-level metadata (QoS, schema_ok)
-    - Detects anomalies (wild/corrupt values, schema errors)
-    - Publishes control commands (pause/resume/shutdown/reconfig) on schedule or on demand
+    - Persists messages/statuses and service-level metadata
+    - Detects anomalies
+    - Publishes control commands
     - Can hot-reconfigure MQTT protocol version and QoS
+    - Runs standalone, or split into N shared-subscription ingest workers plus the API process;
+      the API process then stores nothing and only follows statuses plus a sampled live feed
+      that the workers publish on feed_topic
     """
-    def __init__(self, config: dict):
+    def __init__(self, config: dict, mode: str = "standalone", client_id: str = None):
+        if mode not in MODES:
+            raise ValueError(f"unknown bridge mode {mode!r} (expected one of {MODES})")
         self.cfg = config
         self.db_path = self.cfg["admin"]["db_path"]
-        init_db(self.db_path)
+        self.mode = mode
+        self.persist = mode != "api"
+        self.client_id = client_id or "group1_admin"
 
+        # shared-subscription ingest (see group_1_run_ingest_workers.py)
+        shared_cfg = self.cfg.get("admin", {}).get("shared_ingest", {})
+        self.share_group = shared_cfg.get("group", "group1_ingest")
+        self.registry_refresh_s = float(shared_cfg.get("registry_refresh_s", 2))
+        self._last_registry_refresh = 0
+        # live feed for the API process: each worker sends at most one event per (kind, device)
+        # every feed_sample_s, batched, at most feed_max_events per batch
+        self.feed_topic = shared_cfg.get("feed_topic", "group_1/admin/feed")
+        self.feed_sample_s = float(shared_cfg.get("feed_sample_s", 1))
+        self.feed_max_events = int(shared_cfg.get("feed_max_events", 500))
+        self._feed_lock = threading.Lock()
+        self._feed_out = []
+        self._feed_last = {}   # (kind, device_id) -> last forwarded time
+        self._feed_skipped = 0
+        self._feed_thread = threading.Thread(target=self._feed_loop, daemon=True)
+        
         # thresholds for "wild" data detection
         self.allowed_min = self.cfg.get("subscriber", {}).get("allowed_temp_min", 0)
         self.allowed_max = self.cfg.get("subscriber", {}).get("allowed_temp_max", 50)
@@ -40,22 +81,95 @@ class AdminMQTT:
         self.status_topic = self.topics["status"]
         self.control_base = self.topics["control"]
 
-        self.client: Optional[mqtt.Client] = None
+        self.client: mqtt.Client = None
+        self.connected = False
         self._stop = threading.Event()
 
         # maintenance timers
         self.retention_days = int(self.cfg.get("history", {}).get("retention_days", 30))
         self._last_purge = 0
+        self.rollup_retention_days = int(self.cfg.get("history", {}).get("rollup_retention_days", 365))
+        self.partitions = get_partitions(
+            self.db_path,
+            period_s=float(self.cfg.get("history", {}).get("partition_hours", 24)) * 3600
+        )
 
         # background scheduler thread
         self._schedule_thread = threading.Thread(target=self._schedule_loop, daemon=True)
 
+        # write-behind queue: inserts are group-committed off the paho network thread
+        wq_cfg = self.cfg.get("admin", {}).get("write_queue", {})
+        self.writer = WriteBehindQueue(
+            self.db_path,
+            batch_size=wq_cfg.get("batch_size", 500),
+            flush_ms=wq_cfg.get("flush_ms", 50),
+            max_size=wq_cfg.get("max_size", 20000)
+        )
+
+        # per-device rollups, committed in the same transaction as the raw rows
+        self.rollups = rollups.RollupAccumulator()
+        self.writer.add_flush_hook(self.rollups.flush)
+
+        # authoritative device table in memory; written back from the same flush transaction
+        reg_cfg = self.cfg.get("admin", {}).get("device_registry", {})
+        self.registry = DeviceRegistry(rate_tau_s=reg_cfg.get("rate_tau_s", 60))
+        if mode != "ingest":
+            # ingest workers only write back what they see; they never serve the list
+            try:
+                with get_pool(self.db_path).connection(readonly=True) as conn:
+                    self.registry.load(conn)
+            except Exception as e:
+                print(f"[ADMIN] Could not load devices: {e}")
+        self.writer.add_flush_hook(self.registry.flush)
+
+        # publish -> ingest -> commit latency, per device and minute (latency_1m)
+        self.latency = LatencyTracker()
+        self.writer.add_flush_hook(self.latency.flush)
+        self.writer.add_commit_hook(self.latency.on_commit)
+
+        # bounded hand-off from the paho callback to a pool of processing workers
+        ingest_cfg = self.cfg.get("admin", {}).get("ingest", {})
+        self.ingest = IngestPool(
+            self._process_message,
+            workers=ingest_cfg.get("workers", 2),
+            max_size=ingest_cfg.get("max_size", 10000),
+            policy=ingest_cfg.get("overflow", "spill"),
+            block_timeout_s=ingest_cfg.get("block_timeout_s", 5),
+            late_ms=ingest_cfg.get("late_ms", 2000),
+            # one spill file per process (the Flask reloader runs two api-mode processes)
+            spill_path=ingest_cfg.get("spill_path", self.db_path + ".spill")
+            + (f".{self.client_id}" if mode == "ingest" else f".{os.getpid()}")
+        )
+        # widest publisher-side spread trusted inside one envelope (spool replays span the most)
+        self.max_batch_span = float(ingest_cfg.get("max_batch_span_s", 3600))
+
+        # QoS 1 redeliveries: per-device sliding window over packet_id counters
+        dedupe_cfg = self.cfg.get("admin", {}).get("dedupe", {})
+        self.dedupe = SeqDeduper(window=dedupe_cfg.get("window", 1024),
+                                 max_skew=dedupe_cfg.get("max_skew_s", 86400)) if dedupe_cfg.get("enabled", True) else None
+
+        # in-memory event ring behind /api/stream (live console updates); not served by workers
+        feed_cfg = self.cfg.get("admin", {}).get("live_feed", {})
+        self.feed = None if mode == "ingest" else LiveFeed(
+            capacity=feed_cfg.get("capacity", 4096),
+            max_clients=feed_cfg.get("max_clients", 32)
+        )
+
     # ------------------ Public API ------------------
     def start(self):
-        self._build_client()
-        self.client.connect(self.broker, self.port, keepalive=self.keepalive)
-        self.client.loop_start()
-        self._schedule_thread.start()
+        self.writer.start()
+        self.ingest.start()
+        try:
+            self._build_client()
+            self.client.connect(self.broker, self.port, keepalive=self.keepalive)
+            self.client.loop_start()
+            if self.mode != "ingest":
+                self._schedule_thread.start()
+            else:
+                self._feed_thread.start()
+            print(f"[ADMIN] Connected to MQTT broker at {self.broker}:{self.port} as {self.client_id} ({self.mode})")
+        except Exception as e:
+            print(f"[ADMIN] Connection failed: {str(e)}")
 
     def stop(self):
         self._stop.set()
@@ -63,17 +177,26 @@ class AdminMQTT:
             if self.client:
                 self.client.loop_stop()
                 self.client.disconnect()
-        except Exception:
-            pass
+        except Exception as e:
+            print(f"[ADMIN] Error stopping: {e}")
+        self.ingest.stop()
+        self.writer.stop()
 
     def publish_control(self, device_id: str, payload: dict):
+        if not self.client:
+            print("[ADMIN] Cannot publish - MQTT client not initialized")
+            return
+            
         topic = f"{self.control_base}/{device_id}"
         data = json.dumps(payload)
         with self.mqtt_settings_lock:
             qos = self.mqtt_qos
             client = self.client
         if client:
-            client.publish(topic, data, qos=qos)
+            try:
+                client.publish(topic, data, qos=qos)
+            except Exception as e:
+                print(f"[ADMIN] Publish error: {e}")
 
     def update_mqtt_settings(self, version: int, qos: int):
         """Hot-reconfigure admin bridge (v3.1.1 or v5) and QoS."""
@@ -86,109 +209,364 @@ class AdminMQTT:
                 if self.client:
                     self.client.loop_stop()
                     self.client.disconnect()
-            except Exception:
-                pass
-            self._build_client()
-            self.client.connect(self.broker, self.port, keepalive=self.keepalive)
-            self.client.loop_start()
+            except Exception as e:
+                print(f"[ADMIN] Error reconfiguring: {e}")
+                
+            try:
+                self._build_client()
+                self.client.connect(self.broker, self.port, keepalive=self.keepalive)
+                self.client.loop_start()
+            except Exception as e:
+                print(f"[ADMIN] Reconnect after reconfig failed: {e}")
 
     # ------------------ Internal ------------------
     def _build_client(self):
-        proto = mqtt.MQTTv5 if self.mqtt_version == 5 else mqtt.MQTTv311
-        self.client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, client_id="group1_admin", protocol=proto)
-        self.client.on_connect = self._on_connect
-        self.client.on_message = self._on_message
-        self.client.on_disconnect = self._on_disconnect
+        try:
+            proto = mqtt.MQTTv5 if self.mqtt_version == 5 else mqtt.MQTTv311
+            self.client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, client_id=self.client_id, protocol=proto)
+            self.client.on_connect = self._on_connect
+            self.client.on_message = self._on_message
+            self.client.on_disconnect = self._on_disconnect
+        except Exception as e:
+            print(f"[ADMIN] Client build error: {e}")
 
     def _on_connect(self, client, userdata, flags, reason_code, properties=None):
+        self.connected = reason_code == 0
         if reason_code == 0:
+            topics = [self.data_topic, self.status_topic]
+            if self.mode == "ingest":
+                # the broker hands each message to exactly one worker in the group
+                topics = [f"$share/{self.share_group}/{t}" for t in topics]
+            elif self.mode == "api":
+                # the workers store the data; this process only needs statuses and their sampled feed
+                topics = [self.status_topic, self.feed_topic]
             try:
-                client.subscribe(self.data_topic, qos=self.mqtt_qos)
-                client.subscribe(self.status_topic, qos=self.mqtt_qos)
+                for topic in topics:
+                    client.subscribe(topic, qos=self.mqtt_qos)
             except Exception as e:
                 print("[ADMIN] Subscribe error:", e)
-            print(f"[ADMIN] Connected. Subscribed to {self.data_topic} and {self.status_topic}")
+            print(f"[ADMIN] Connected. Subscribed to {topics[0]} and {topics[1]}")
         else:
             print(f"[ADMIN] Connect failed rc={reason_code}")
 
     def _on_disconnect(self, client, userdata, flags, reason_code, properties=None):
+        self.connected = False
         print(f"[ADMIN] Disconnected rc={reason_code}")
 
     def _on_message(self, client, userdata, msg):
-        ts = time.time()
-        topic = msg.topic
-        qos = msg.qos
-        payload = msg.payload
-
-        if topic == self.status_topic:
-            # Status messages
-            try:
-                obj = json.loads(payload.decode())
-                device_id = obj.get("device_id")
-                location = obj.get("location")
-                status = obj.get("status")
-                insert_status(self.db_path, ts, device_id, location, status)
-            except Exception as e:
-                insert_anomaly(self.db_path, ts, None, "CORRUPT", f"Status decode error: {e}")
+        # paho network thread: hand off only, so keepalives and PUBACKs never wait on SQLite
+        MESSAGES.inc(msg.topic)
+        if self.mode == "api" and msg.topic == self.feed_topic:
+            self._receive_feed(msg.payload)
             return
+        self.ingest.submit((time.time(), msg.topic, msg.qos, msg.payload))
 
-        # Data topic
-        schema_ok = False
-        device_id = location = None
-        core_temp = None
-        raw_data = None
-
+    def _process_message(self, ts, topic, qos, payload):
+        """Runs on an ingest worker thread."""
         try:
-            obj = json.loads(payload.decode())
-            device_id = obj.get("device_id")
-            location = obj.get("location")
-            raw_data = obj
-
-            # Extract temperature
-            if "sensor_data" in obj and isinstance(obj["sensor_data"], dict):
-                val = obj["sensor_data"].get("value")
+            if topic == self.status_topic:
+                # Status messages
                 try:
-                    if val is not None and val != "SENSOR_FAULT":
-                        core_temp = float(val)
-                        schema_ok = True
-                    else:
-                        core_temp = None
-                        schema_ok = False
-                except (ValueError, TypeError):
-                    core_temp = None
-                    schema_ok = False
-            else:
-                schema_ok = False
+                    obj = json.loads(payload.decode())
+                    # one device, or a fleet connection's grouped will
+                    for device_id, location, status in expand_status(obj):
+                        self._insert_status(ts, device_id, location, status)
+                    return
+                except Exception as e:
+                    log_message = f"Status decode error: {e}"
+                    self._insert_anomaly(ts, None, "CORRUPT", log_message)
+                    self._insert_service_log(ts, None, topic, qos, False, log_message, "CORRUPT")
+                    return
 
+            # Data topic: shared compiled validator (group_1_validator), no exceptions for bad readings
+            t0 = time.perf_counter()
+            # the first byte identifies the wire format (group_1_codec), so the
+            # ingest hand-off and spill file do not need to carry the content type
+            fmt = codec.sniff(payload)
+            try:
+                obj = codec.decode(payload, fmt)
+            except ValueError as e:
+                obj, decode_error = None, e
+            t1 = time.perf_counter()
+            STAGE_SECONDS.observe(t1 - t0, "decode")
+            PAYLOAD_FORMATS.inc(fmt)
+            if codec.is_envelope(obj):
+                self._process_envelope(ts, topic, qos, obj)
+                return
+            if obj is not None:
+                result = validate_object(obj, ts)
+            elif fmt == codec.JSON:
+                # validate_payload() re-reports the decode error with its reason code
+                result = validate_payload(payload, ts)
+            else:
+                result = decode_failure(f"{fmt} decode error: {decode_error}")
+            STAGE_SECONDS.observe(time.perf_counter() - t1, "validate")
+            if fmt != codec.JSON:
+                # keep raw_data readable in the UI and exports
+                raw_data = json.dumps(obj) if obj is not None else bytes(payload).hex()
+            else:
+                raw_data = payload.decode(errors="replace") if isinstance(payload, bytes) else str(payload)
+            self._process_reading(ts, topic, qos, result, raw_data)
         except Exception as e:
-            core_temp = None
-            raw_data = {"_raw": payload.decode(errors="replace")}
-            schema_ok = False
-            insert_anomaly(self.db_path, ts, None, "CORRUPT", f"JSON decode error: {e}")
+            print(f"[ADMIN] Error processing message: {e}")
+
+    def _process_envelope(self, ts, topic, qos, envelope):
+        """A batched message: every reading goes through _process_reading, rows are queued per statement."""
+        try:
+            readings = codec.expand(envelope)
+        except ValueError as e:
+            self._process_reading(ts, topic, qos, decode_failure(f"Envelope decode error: {e}"),
+                                  json.dumps(envelope, default=repr))
+            return
+        t0 = time.perf_counter()
+        # timestamps that are non-finite or far from the arrival time come back as None
+        results = [validate_object(reading, ts) for reading in readings]
+        STAGE_SECONDS.observe(time.perf_counter() - t0, "validate")
+        # rows keep the publisher-side spacing of the readings, anchored at the arrival time
+        stamps = [r.fields.get("timestamp") for r in results if r.fields.get("timestamp") is not None]
+        last = max(stamps, default=None)
+        if last is not None and last - min(stamps) > self.max_batch_span:
+            # implausible spread (a bogus timestamp in the batch): do not move siblings off the arrival time
+            last = None
+        rows = {}
+        for reading, result in zip(readings, results):
+            published = result.fields.get("timestamp")
+            row_ts = ts
+            if last is not None and published is not None and 0 <= last - published <= self.max_batch_span:
+                row_ts = ts - (last - published)
+            self._process_reading(row_ts, topic, qos, result, json.dumps(reading), rows=rows, received=ts)
+        for sql, (params, tags) in rows.items():
+            self.writer.put_many(sql, params, tags)
+        BATCH_READINGS.observe(len(readings))
+
+    def _process_reading(self, ts, topic, qos, result, raw_data, rows=None, received=None):
+        """
+        One validated reading: dedupe, latency, anomalies, message and service-log rows.
+        `rows` collects the rows of a batched message instead of queueing them one by one;
+        `received` is the MQTT arrival time when the row's ts has been shifted.
+        """
+        started = time.perf_counter()
+        received = ts if received is None else received
+        log_message = ""
+        anomaly_type = None
+        schema_ok = False
+        fields = result.fields
+        device_id = fields.get("device_id")
+        location = fields.get("location")
+        if location is None and device_id:
+            # compact formats only send the location now and then
+            location = self.registry.location(device_id)
+        packet_id = fields.get("packet_id") or "N/A"
+        published = fields.get("timestamp")
+        if self.dedupe and device_id and self.dedupe.check(device_id, packet_id, published, received) == DUPLICATE:
+            # already stored: drop before any row, rollup or registry update
+            DUPLICATES.inc(device_id)
+            return
+        if self.persist and device_id and isinstance(published, (int, float)):
+            # non-finite / absurd timestamps are counted as skewed, never bucketed (group_1_latency)
+            self.latency.record(device_id, "publish_ingest", (received - published) * 1000.0, received)
+        core_temp = None
 
-        # Wild value detection
-        if schema_ok and core_temp is not None:
+        if result.ok:
+            core_temp = float(fields["value"])
+            schema_ok = True
+            # Validate temperature range
             if core_temp < self.allowed_min or core_temp > self.allowed_max:
-                insert_anomaly(
-                    self.db_path,
-                    ts,
-                    device_id,
-                    "WILD",
-                    f"Temperature {core_temp} outside allowed range ({self.allowed_min}-{self.allowed_max})"
-                )
+                log_message = f"Temperature {core_temp} outside allowed range ({self.allowed_min}-{self.allowed_max})"
+                anomaly_type = "WILD"
+                self._insert_anomaly(ts, device_id, anomaly_type, log_message, rows)
+        else:
+            if not device_id:
+                device_id = "unknown"
+            log_message = result.detail
+            anomaly_type = "INVALID"
+            self._insert_anomaly(ts, device_id, anomaly_type, log_message, rows)
 
         # Store message
-        insert_message(
-            self.db_path,
+        valid = 1 if core_temp is not None and schema_ok else 0
+        self._insert_message(
             ts,
             device_id,
             location,
             core_temp,
+            packet_id,
+            valid,
+            schema_ok,
+            qos,
+            topic,
             raw_data,
+            rows,
+            received
+        )
+
+        # Store service log
+        self._insert_service_log(
+            ts,
+            device_id,
             topic,
             qos,
-            schema_ok
+            schema_ok,
+            log_message if log_message else "Valid message",
+            anomaly_type,
+            rows
         )
+        STAGE_SECONDS.observe(time.perf_counter() - started, "insert")
+        DEVICE_MESSAGES.inc(device_id)
+
+    def _insert_status(self, ts, device_id, location, status):
+        if self.persist:
+            # the registry is the source of truth; the writer persists it on its next flush
+            self.registry.record_status(device_id, location, status, ts)
+            self.writer.kick()
+        self._emit("status", device_id, {
+            "device_id": device_id, "location": location, "status": status, "last_updated": ts
+        })
+
+    def _insert_message(self, ts, device_id, location, core_temp, packet_id, valid, schema_ok, qos, topic, raw_data,
+                        rows=None, received=None):
+        if self.persist:
+            self.rollups.add_message(device_id, ts, core_temp, valid, schema_ok)
+            if device_id != "unknown":
+                self.registry.record_message(device_id, location, core_temp, ts)
+            table = self.partitions.route("messages", ts)
+            self._write(f'''
+                INSERT INTO {table} (
+                    device_id, ts, location, core_temp, packet_id, 
+                    valid, schema_ok, qos, topic, raw_data
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (
+                device_id, ts, location, core_temp, packet_id,
+                valid, schema_ok, qos, topic, raw_data
+            ), (device_id, ts if received is None else received), rows)
+        self._emit("reading", device_id, {
+            "device_id": device_id, "ts": ts, "core_temp": core_temp,
+            "location": location, "valid": valid
+        })
+
+    def _insert_service_log(self, ts, device_id, topic, qos, schema_ok, log_message, anomaly_type, rows=None):
+        if not self.persist:
+            return
+        table = self.partitions.route("service_logs", ts)
+        self._write(f'''
+            INSERT INTO {table} (
+                device_id, ts, topic, qos, 
+                schema_ok, log_message, anomaly_type
+            ) VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', (
+            device_id, ts, topic, qos,
+            schema_ok, log_message, anomaly_type
+        ), rows=rows)
+
+    def _insert_anomaly(self, ts, device_id, anomaly_type, message, rows=None):
+        if self.persist:
+            self.rollups.add_anomaly(device_id, ts)
+            table = self.partitions.route("anomalies", ts)
+            self._write(f'''
+                INSERT INTO {table} (device_id, ts, anomaly_type, message)
+                VALUES (?, ?, ?, ?)
+            ''', (device_id, ts, anomaly_type, message), rows=rows)
+        self._emit("anomaly", device_id, {
+            "device_id": device_id, "ts": ts, "anomaly_type": anomaly_type, "message": message
+        })
+
+    def _write(self, sql, params, tag=None, rows=None):
+        """Queue one row, or collect it for put_many() when processing a batched message."""
+        if rows is None:
+            self.writer.put(sql, params, tag)
+            return
+        pending = rows.get(sql)
+        if pending is None:
+            pending = rows[sql] = ([], [])
+        pending[0].append(params)
+        if tag is not None:
+            pending[1].append(tag)
+
+    def _emit(self, kind, device_id, data):
+        if self.feed is not None:
+            self.feed.publish(kind, device_id, data)
+        elif self.mode == "ingest" and kind != "status":
+            self._forward_feed(kind, device_id, data)
+
+    # ------------------ Sampled live feed (shared ingest) ------------------
+    def _forward_feed(self, kind, device_id, data):
+        now = time.monotonic()
+        key = (kind, device_id)
+        with self._feed_lock:
+            if now - self._feed_last.get(key, -self.feed_sample_s) < self.feed_sample_s \
+                    or len(self._feed_out) >= self.feed_max_events:
+                self._feed_skipped += 1
+                return
+            self._feed_last[key] = now
+            self._feed_out.append((kind, device_id, data))
+
+    def _feed_loop(self):
+        while not self._stop.wait(0.5):
+            with self._feed_lock:
+                events, self._feed_out = self._feed_out, []
+            if not events or not self.connected:
+                continue
+            try:
+                self.client.publish(self.feed_topic, json.dumps(events), qos=0)
+            except Exception as e:
+                print(f"[ADMIN] Feed publish error: {e}")
+
+    def _receive_feed(self, payload):
+        try:
+            events = json.loads(payload)
+            for kind, device_id, data in events[:self.feed_max_events]:
+                self.feed.publish(kind, device_id, data)
+        except (ValueError, TypeError) as e:
+            print(f"[ADMIN] Bad feed message: {e}")
+
+    def _db(self, readonly=False):
+        try:
+            return get_pool(self.db_path).acquire(readonly=readonly)
+        except Exception as e:
+            print(f"[ADMIN] Error connecting to database: {e}")
+            return None
+
+    def _refresh_registry(self):
+        """api mode: the ingest workers own the devices table; re-read it for /api/devices."""
+        conn = self._db(readonly=True)
+        if not conn:
+            return
+        try:
+            self.registry.refresh(conn)
+        except Exception as e:
+            print(f"[ADMIN] Registry refresh error: {e}")
+        finally:
+            conn.close()
+
+    def _get_schedules(self):
+        conn = self._db(readonly=True)
+        if not conn:
+            return []
+        try:
+            schedules = conn.execute('SELECT * FROM schedules').fetchall()
+            return [dict(sched) for sched in schedules]
+        except Exception as e:
+            print(f"[ADMIN] Error getting schedules: {e}")
+            return []
+        finally:
+            conn.close()
+
+    def _purge_old_data(self):
+        cutoff = time.time() - (self.retention_days * 24 * 3600)
+        conn = self._db()
+        if not conn:
+            return
+        try:
+            # whole expired partitions are dropped; no row-by-row DELETE holding the write lock
+            for base in PARTITIONED_TABLES:
+                dropped = self.partitions.drop_expired(conn, base, cutoff)
+                if dropped:
+                    print(f"[ADMIN] Purged partitions: {', '.join(dropped)}")
+            rollups.purge(conn, cutoff, time.time() - self.rollup_retention_days * 24 * 3600)
+            conn.execute("DELETE FROM latency_1m WHERE bucket_ts < ?", (cutoff,))
+        except Exception as e:
+            print(f"[ADMIN] Purge error: {e}")
+        finally:
+            conn.close()
 
     def _schedule_loop(self):
         """Periodically executes schedules and purges old data."""
@@ -197,12 +575,26 @@ class AdminMQTT:
 
             # Execute schedules
             try:
-                schedules = get_schedules(self.db_path)
+                schedules = self._get_schedules()
                 for s in schedules:
                     start_ts, end_ts = s["start_ts"], s["end_ts"]
                     if start_ts <= now <= end_ts:
                         self.publish_control(s["device_id"], {"action": s["action"]})
-                        s["start_ts"] = now + 3600 * 24 * 365  # Debounce
+                        SCHEDULE_FIRINGS.inc(s["action"])
+                        # Debounce by extending the start time
+                        conn = self._db()
+                        if conn:
+                            try:
+                                conn.execute('''
+                                    UPDATE schedules
+                                    SET start_ts = ?
+                                    WHERE id = ?
+                                ''', (now + 3600 * 24 * 365, s["id"]))
+                                conn.commit()
+                            except Exception as e:
+                                print(f"[ADMIN] Schedule update error: {e}")
+                            finally:
+                                conn.close()
                 time.sleep(1.0)
             except Exception as e:
                 print("[ADMIN] schedule loop error:", e)
@@ -210,7 +602,13 @@ class AdminMQTT:
             # Purge old data periodically
             if now - self._last_purge > 6 * 3600:
                 try:
-                    purge_old_data(self.db_path, self.retention_days)
+                    t0 = time.perf_counter()
+                    self._purge_old_data()
+                    PURGE_SECONDS.observe(time.perf_counter() - t0)
                     self._last_purge = now
                 except Exception as e:
                     print("[ADMIN] purge error:", e)
+
+            if self.mode == "api" and now - self._last_registry_refresh >= self.registry_refresh_s:
+                self._refresh_registry()
+                self._last_registry_refresh = now
@@ -2,14 +2,20 @@
 
 import os
 import time
-import sqlite3
 import csv
 import io
 import json
-import threading
-import paho.mqtt.client as mqtt
 from datetime import datetime
-from flask import Flask, request, jsonify, send_from_directory, Response, make_response
+from flask import Flask, request, jsonify, send_from_directory, Response
+from group_1_db_pool import get_pool
+from group_1_migrations import migrate
+from group_1_partitions import get_partitions
+import group_1_rollups as rollups
+import group_1_latency as latency
+from group_1_admin_mqtt import AdminMQTT
+from group_1_util import encode_cursor, decode_cursor
+from group_1_export import EXPORT_TABLES, EXPORT_FORMATS, iter_chunks, csv_stream, ndjson_stream
+from group_1_metrics import REGISTRY as METRICS, CONTENT_TYPE as METRICS_CONTENT_TYPE
 
 app = Flask(__name__, template_folder='templates')
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'admin-secret-key')
@@ -40,7 +46,7 @@ if not os.path.exists(CONFIG_PATH):
             }
         },
         "subscriber": {"allowed_temp_min": 0.0, "allowed_temp_max": 50.0},
-        "history": {"retention_days": 30}
+        "history": {"retention_days": 30, "partition_hours": 24}
     }
     with open(CONFIG_PATH, 'w') as f:
         json.dump(CFG, f, indent=2)
@@ -49,82 +55,38 @@ else:
     with open(CONFIG_PATH) as f:
         CFG = json.load(f)
 
+# GROUP1_MQTT_BROKER / GROUP1_MQTT_PORT override the config (e.g. a local group_1_mini_broker.py)
+if os.environ.get("GROUP1_MQTT_BROKER"):
+    CFG["mqtt"]["broker"] = os.environ["GROUP1_MQTT_BROKER"]
+if os.environ.get("GROUP1_MQTT_PORT"):
+    CFG["mqtt"]["port"] = int(os.environ["GROUP1_MQTT_PORT"])
+
 # Database file path
 DB_PATH = CFG["admin"]["db_path"]
 
-# Initialize the database
+# Shared connection pool (also used by the MQTT bridge for the same file)
+_pool_cfg = CFG["admin"].get("db_pool", {})
+DB_POOL = get_pool(
+    DB_PATH,
+    max_readers=_pool_cfg.get("max_readers", 8),
+    max_writers=_pool_cfg.get("max_writers", 4)
+)
+
+# messages / service_logs / anomalies are split into per-period tables
+PARTITIONS = get_partitions(
+    DB_PATH,
+    period_s=float(CFG.get("history", {}).get("partition_hours", 24)) * 3600
+)
+
+# Initialize the database (create or upgrade the schema, then seed)
 def init_db():
     try:
-        with sqlite3.connect(DB_PATH) as conn:
+        with DB_POOL.connection() as conn:
+            before, after = migrate(conn)
+            if before != after:
+                print(f"[ADMIN] Database schema upgraded v{before} -> v{after}")
             c = conn.cursor()
             
-            # Create tables
-            c.execute('''
-                CREATE TABLE IF NOT EXISTS devices (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    device_id TEXT UNIQUE,
-                    location TEXT,
-                    status TEXT DEFAULT 'online',
-                    last_updated REAL
-                )
-            ''')
-            
-            c.execute('''
-                CREATE TABLE IF NOT EXISTS messages (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    device_id TEXT,
-                    ts REAL,
-                    core_temp REAL,
-                    packet_id TEXT,
-                    valid INTEGER,
-                    schema_ok INTEGER,
-                    qos INTEGER,
-                    topic TEXT,
-                    raw_data TEXT
-                )
-            ''')
-            
-            c.execute('''
-                CREATE TABLE IF NOT EXISTS schedules (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    device_id TEXT,
-                    action TEXT,
-                    start_ts REAL,
-                    end_ts REAL
-                )
-            ''')
-            
-            c.execute('''
-                CREATE TABLE IF NOT EXISTS service_logs (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    device_id TEXT,
-                    ts REAL,
-                    qos INTEGER,
-                    schema_ok INTEGER,
-                    log_message TEXT,
-                    anomaly_type TEXT
-                )
-            ''')
-            
-            c.execute('''
-                CREATE TABLE IF NOT EXISTS anomalies (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    device_id TEXT,
-                    ts REAL,
-                    anomaly_type TEXT,
-                    message TEXT
-                )
-            ''')
-            
-            c.execute('''
-                CREATE TABLE IF NOT EXISTS mqtt_config (
-                    id INTEGER PRIMARY KEY DEFAULT 1,
-                    version INTEGER DEFAULT 5,
-                    qos INTEGER DEFAULT 1,
-                    CONSTRAINT config_pk UNIQUE (id)
-                )
-            ''')
-            
             # Insert default MQTT config 
             c.execute('''
                 INSERT OR IGNORE INTO mqtt_config (id, version, qos) 
@@ -152,400 +114,66 @@ def init_db():
             ]
             
             for anomaly in sample_anomalies:
-                c.execute('''
-                    INSERT OR IGNORE INTO anomalies (device_id, ts, anomaly_type, message)
+                table = PARTITIONS.route('anomalies', anomaly[1])
+                c.execute(f'''
+                    INSERT OR IGNORE INTO {table} (device_id, ts, anomaly_type, message)
                     VALUES (?, ?, ?, ?)
                 ''', anomaly)
-            
-            conn.commit()
     except Exception as e:
         print(f"Error initializing database: {e}")
 
 # Initialize database on startup
 init_db()
 
-# Get database connection
-def get_db_connection():
+# Get a pooled database connection; conn.close() returns it to the pool
+def get_db_connection(readonly=False):
     try:
-        conn = sqlite3.connect(DB_PATH)
-        conn.row_factory = sqlite3.Row
-        return conn
+        return DB_POOL.acquire(readonly=readonly)
     except Exception as e:
         print(f"Error connecting to database: {e}")
         return None
 
-# MQTT Admin Bridge
-class AdminMQTT:
-    """
-    Background MQTT bridge:
-    - Subscribes to data/status topics
-    - Persists messages/statuses and service-level metadata
-    - Detects anomalies
-    - Publishes control commands
-    - Can hot-reconfigure MQTT protocol version and QoS
-    """
-    def __init__(self, config: dict):
-        self.cfg = config
-        self.db_path = self.cfg["admin"]["db_path"]
-        
-        # thresholds for "wild" data detection
-        self.allowed_min = self.cfg.get("subscriber", {}).get("allowed_temp_min", 0)
-        self.allowed_max = self.cfg.get("subscriber", {}).get("allowed_temp_max", 50)
-
-        # mqtt settings
-        self.mqtt_settings_lock = threading.Lock()
-        self.mqtt_version = int(self.cfg.get("mqtt", {}).get("version", 5))
-        self.mqtt_qos = int(self.cfg.get("mqtt", {}).get("qos", 1))
-        self.broker = self.cfg["mqtt"]["broker"]
-        self.port = int(self.cfg["mqtt"]["port"])
-        self.keepalive = int(self.cfg["mqtt"]["keepalive"])
-        self.topics = self.cfg["mqtt"]["topics"]
-        self.data_topic = self.topics["data"]
-        self.status_topic = self.topics["status"]
-        self.control_base = self.topics["control"]
-
-        self.client: mqtt.Client = None
-        self._stop = threading.Event()
-
-        # maintenance timers
-        self.retention_days = int(self.cfg.get("history", {}).get("retention_days", 30))
-        self._last_purge = 0
-
-        # background scheduler thread
-        self._schedule_thread = threading.Thread(target=self._schedule_loop, daemon=True)
-
-    # ------------------ Public API ------------------
-    def start(self):
-        try:
-            self._build_client()
-            self.client.connect(self.broker, self.port, keepalive=self.keepalive)
-            self.client.loop_start()
-            self._schedule_thread.start()
-            print(f"[ADMIN] Connected to MQTT broker at {self.broker}:{self.port}")
-        except Exception as e:
-            print(f"[ADMIN] Connection failed: {str(e)}")
-
-    def stop(self):
-        self._stop.set()
-        try:
-            if self.client:
-                self.client.loop_stop()
-                self.client.disconnect()
-        except Exception as e:
-            print(f"[ADMIN] Error stopping: {e}")
-
-    def publish_control(self, device_id: str, payload: dict):
-        if not self.client:
-            print("[ADMIN] Cannot publish - MQTT client not initialized")
-            return
-            
-        topic = f"{self.control_base}/{device_id}"
-        data = json.dumps(payload)
-        with self.mqtt_settings_lock:
-            qos = self.mqtt_qos
-            client = self.client
-        if client:
-            try:
-                client.publish(topic, data, qos=qos)
-            except Exception as e:
-                print(f"[ADMIN] Publish error: {e}")
-
-    def update_mqtt_settings(self, version: int, qos: int):
-        """Hot-reconfigure admin bridge (v3.1.1 or v5) and QoS."""
-        with self.mqtt_settings_lock:
-            self.mqtt_version = 5 if int(version) == 5 else 3
-            self.mqtt_qos = qos if qos in (0, 1, 2) else 0
-
-            # rebuild client
-            try:
-                if self.client:
-                    self.client.loop_stop()
-                    self.client.disconnect()
-            except Exception as e:
-                print(f"[ADMIN] Error reconfiguring: {e}")
-                
-            try:
-                self._build_client()
-                self.client.connect(self.broker, self.port, keepalive=self.keepalive)
-                self.client.loop_start()
-            except Exception as e:
-                print(f"[ADMIN] Reconnect after reconfig failed: {e}")
-
-    # ------------------ Internal ------------------
-    def _build_client(self):
-        try:
-            proto = mqtt.MQTTv5 if self.mqtt_version == 5 else mqtt.MQTTv311
-            self.client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, client_id="group1_admin", protocol=proto)
-            self.client.on_connect = self._on_connect
-            self.client.on_message = self._on_message
-            self.client.on_disconnect = self._on_disconnect
-        except Exception as e:
-            print(f"[ADMIN] Client build error: {e}")
-
-    def _on_connect(self, client, userdata, flags, reason_code, properties=None):
-        if reason_code == 0:
-            try:
-                client.subscribe(self.data_topic, qos=self.mqtt_qos)
-                client.subscribe(self.status_topic, qos=self.mqtt_qos)
-            except Exception as e:
-                print("[ADMIN] Subscribe error:", e)
-            print(f"[ADMIN] Connected. Subscribed to {self.data_topic} and {self.status_topic}")
-        else:
-            print(f"[ADMIN] Connect failed rc={reason_code}")
-
-    def _on_disconnect(self, client, userdata, flags, reason_code, properties=None):
-        print(f"[ADMIN] Disconnected rc={reason_code}")
-
-    def _on_message(self, client, userdata, msg):
-        try:
-            ts = time.time()
-            topic = msg.topic
-            qos = msg.qos
-            payload = msg.payload
-            log_message = ""
-            anomaly_type = None
-            schema_ok = False
-
-            if topic == self.status_topic:
-                # Status messages
-                try:
-                    obj = json.loads(payload.decode())
-                    device_id = obj.get("device_id")
-                    location = obj.get("location")
-                    status = obj.get("status")
-                    self._insert_status(ts, device_id, location, status)
-                    return
-                except Exception as e:
-                    log_message = f"Status decode error: {e}"
-                    anomaly_type = "CORRUPT"
-                    self._insert_anomaly(ts, None, anomaly_type, log_message)
-                    self._insert_service_log(ts, None, topic, qos, False, log_message, anomaly_type)
-                    return
-
-            # Data topic
-            device_id = location = None
-            core_temp = None
-            raw_data = None
-            packet_id = None
-
-            try:
-                # Try to parse JSON
-                obj = json.loads(payload.decode())
-                raw_data = json.dumps(obj)  # Store as string
-                device_id = obj.get("device_id")
-                location = obj.get("location")
-                packet_id = obj.get("packet_id", "N/A")
-                
-                # Validate schema
-                if not device_id:
-                    raise ValueError("Missing device_id")
-                    
-                if "sensor_data" not in obj:
-                    raise ValueError("Missing sensor_data")
-                    
-                sensor_data = obj["sensor_data"]
-                if not isinstance(sensor_data, dict):
-                    raise ValueError("sensor_data should be an object")
-                    
-                if "value" not in sensor_data:
-                    raise ValueError("Missing value in sensor_data")
-                    
-                # Validate value
-                value = sensor_data["value"]
-                if value == "SENSOR_FAULT":
-                    raise ValueError("Sensor fault detected")
-                    
-                try:
-                    core_temp = float(value)
-                    schema_ok = True
-                except (TypeError, ValueError):
-                    raise ValueError(f"Invalid temperature value: {value}")
-                    
-                # Validate temperature range
-                if core_temp < self.allowed_min or core_temp > self.allowed_max:
-                    log_message = f"Temperature {core_temp} outside allowed range ({self.allowed_min}-{self.allowed_max})"
-                    anomaly_type = "WILD"
-                    self._insert_anomaly(ts, device_id, anomaly_type, log_message)
-
-            except Exception as e:
-                # Handle parsing/validation errors
-                if not device_id:
-                    device_id = "unknown"
-                log_message = str(e)
-                anomaly_type = "INVALID"
-                self._insert_anomaly(ts, device_id, anomaly_type, log_message)
-                schema_ok = False
-                if not raw_data:
-                    raw_data = payload.decode(errors="replace")
-
-            # Store message
-            valid = 1 if core_temp is not None and schema_ok else 0
-            self._insert_message(
-                ts,
-                device_id,
-                location,
-                core_temp,
-                packet_id,
-                valid,
-                schema_ok,
-                qos,
-                topic,
-                raw_data
-            )
-            
-            # Store service log
-            self._insert_service_log(
-                ts,
-                device_id,
-                topic,
-                qos,
-                schema_ok,
-                log_message if log_message else "Valid message",
-                anomaly_type
-            )
-        except Exception as e:
-            print(f"[ADMIN] Error processing message: {e}")
-
-    def _insert_status(self, ts, device_id, location, status):
-        conn = get_db_connection()
-        if not conn:
-            return
-        try:
-            conn.execute('''
-                INSERT OR REPLACE INTO devices (device_id, location, status, last_updated)
-                VALUES (?, ?, ?, ?)
-            ''', (device_id, location, status, ts))
-            conn.commit()
-        except Exception as e:
-            print(f"[ADMIN] Error inserting status: {e}")
-        finally:
-            conn.close()
-
-    def _insert_message(self, ts, device_id, location, core_temp, packet_id, valid, schema_ok, qos, topic, raw_data):
-        conn = get_db_connection()
-        if not conn:
-            return
-        try:
-            conn.execute('''
-                INSERT INTO messages (
-                    device_id, ts, core_temp, packet_id, 
-                    valid, schema_ok, qos, topic, raw_data
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                device_id, ts, core_temp, packet_id,
-                valid, schema_ok, qos, topic, raw_data
-            ))
-            conn.commit()
-        except Exception as e:
-            print(f"[ADMIN] Error inserting message: {e}")
-        finally:
-            conn.close()
-
-    def _insert_service_log(self, ts, device_id, topic, qos, schema_ok, log_message, anomaly_type):
-        conn = get_db_connection()
-        if not conn:
-            return
-        try:
-            conn.execute('''
-                INSERT INTO service_logs (
-                    device_id, ts, topic, qos, 
-                    schema_ok, log_message, anomaly_type
-                ) VALUES (?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                device_id, ts, topic, qos,
-                schema_ok, log_message, anomaly_type
-            ))
-            conn.commit()
-        except Exception as e:
-            print(f"[ADMIN] Error inserting service log: {e}")
-        finally:
-            conn.close()
-
-    def _insert_anomaly(self, ts, device_id, anomaly_type, message):
-        conn = get_db_connection()
-        if not conn:
-            return
-        try:
-            conn.execute('''
-                INSERT INTO anomalies (device_id, ts, anomaly_type, message)
-                VALUES (?, ?, ?, ?)
-            ''', (device_id, ts, anomaly_type, message))
-            conn.commit()
-        except Exception as e:
-            print(f"[ADMIN] Error inserting anomaly: {e}")
-        finally:
-            conn.close()
-
-    def _get_schedules(self):
-        conn = get_db_connection()
-        if not conn:
-            return []
-        try:
-            schedules = conn.execute('SELECT * FROM schedules').fetchall()
-            return [dict(sched) for sched in schedules]
-        except Exception as e:
-            print(f"[ADMIN] Error getting schedules: {e}")
-            return []
-        finally:
-            conn.close()
-
-    def _purge_old_data(self):
-        cutoff = time.time() - (self.retention_days * 24 * 3600)
-        conn = get_db_connection()
-        if not conn:
-            return
-        try:
-            conn.execute('DELETE FROM messages WHERE ts < ?', (cutoff,))
-            conn.execute('DELETE FROM service_logs WHERE ts < ?', (cutoff,))
-            conn.execute('DELETE FROM anomalies WHERE ts < ?', (cutoff,))
-            conn.commit()
-        except Exception as e:
-            print(f"[ADMIN] Purge error: {e}")
-        finally:
-            conn.close()
-
-    def _schedule_loop(self):
-        """Periodically executes schedules and purges old data."""
-        while not self._stop.is_set():
-            now = time.time()
-
-            # Execute schedules
-            try:
-                schedules = self._get_schedules()
-                for s in schedules:
-                    start_ts, end_ts = s["start_ts"], s["end_ts"]
-                    if start_ts <= now <= end_ts:
-                        self.publish_control(s["device_id"], {"action": s["action"]})
-                        # Debounce by extending the start time
-                        conn = get_db_connection()
-                        if conn:
-                            try:
-                                conn.execute('''
-                                    UPDATE schedules
-                                    SET start_ts = ?
-                                    WHERE id = ?
-                                ''', (now + 3600 * 24 * 365, s["id"]))
-                                conn.commit()
-                            except Exception as e:
-                                print(f"[ADMIN] Schedule update error: {e}")
-                            finally:
-                                conn.close()
-                time.sleep(1.0)
-            except Exception as e:
-                print("[ADMIN] schedule loop error:", e)
-
-            # Purge old data periodically
-            if now - self._last_purge > 6 * 3600:
-                try:
-                    self._purge_old_data()
-                    self._last_purge = now
-                except Exception as e:
-                    print("[ADMIN] purge error:", e)
-
-# Initialize MQTT bridge
-admin_mqtt = AdminMQTT(CFG)
+# Initialize MQTT bridge (api mode when group_1_run_ingest_workers.py does the ingest)
+_shared_ingest = CFG.get("admin", {}).get("shared_ingest", {}).get("enabled", False)
+admin_mqtt = AdminMQTT(CFG, mode="api" if _shared_ingest else "standalone")
 admin_mqtt.start()
 
+# Scrape-time gauges for /api/metrics (counters and histograms are recorded by the bridge itself)
+METRICS.gauge("group1_mqtt_connected", "1 while the bridge is connected to the broker",
+              lambda: 1 if admin_mqtt.connected else 0)
+METRICS.gauge("group1_ingest_queue_depth", "Messages waiting for an ingest worker",
+              lambda: admin_mqtt.ingest.depth())
+METRICS.gauge("group1_ingest_spill_pending", "Messages waiting in the overflow spill file",
+              lambda: admin_mqtt.ingest.stats()["spill_pending"])
+METRICS.gauge("group1_write_queue_depth", "Rows waiting for the write-behind queue",
+              lambda: admin_mqtt.writer.depth())
+METRICS.gauge("group1_db_pool_connections", "Open pooled SQLite connections",
+              lambda: {("reader",): DB_POOL.stats()["open_readers"], ("writer",): DB_POOL.stats()["open_writers"]},
+              ("kind",))
+METRICS.gauge("group1_live_feed_clients", "Connected /api/stream consoles",
+              lambda: admin_mqtt.feed.clients if admin_mqtt.feed else None)
+
+# Keyset pagination: pages are seeked by the (ts, id) of the previous page's last row
+def _fetch_page(conn, base, where='1=1', params=(), limit=200, since=None, until=None):
+    """Returns (rows, next_cursor); next_cursor is None on the last page."""
+    token = request.args.get('cursor')
+    before = decode_cursor(token) if token else None
+    limit = max(1, limit)
+    # one extra row tells us whether another page exists
+    rows = PARTITIONS.fetch_newest(conn, base, where, params, limit + 1,
+                                   since=since, until=until, before=before)
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(rows[-1]['ts'], rows[-1]['id'])
+
+def _paged_response(body, next_cursor):
+    response = jsonify(body)
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+        response.headers['Access-Control-Expose-Headers'] = 'X-Next-Cursor'
+    return response
+
 # API Routes
 @app.route('/')
 def index():
@@ -555,19 +183,47 @@ def index():
 def api_health():
     return jsonify({'ok': True, 'time': time.time()})
 
+@app.route('/api/metrics')
+def api_metrics():
+    # Prometheus text exposition format
+    return Response(METRICS.render(), mimetype=None, content_type=METRICS_CONTENT_TYPE)
+
+@app.route('/api/ingest_stats')
+def api_ingest_stats():
+    return jsonify({
+        'mode': admin_mqtt.mode,
+        'ingest': admin_mqtt.ingest.stats(),
+        'dedupe': admin_mqtt.dedupe.stats() if admin_mqtt.dedupe else None,
+        'write_queue': admin_mqtt.writer.stats(),
+        'db_pool': DB_POOL.stats(),
+        'live_feed': admin_mqtt.feed.stats()
+    })
+
+@app.route('/api/stream')
+def api_stream():
+    # Server-Sent Events: ?device_id=dev001,dev002 and ?events=reading,status,anomaly filter the feed
+    device_ids = {d for d in request.args.get('device_id', '').split(',') if d} or None
+    kinds = {k for k in request.args.get('events', '').split(',') if k} or None
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    heartbeat_s = float(CFG["admin"].get("live_feed", {}).get("heartbeat_s", 15))
+    
+    stream = admin_mqtt.feed.stream(last_event_id, device_ids, kinds, heartbeat_s)
+    return Response(stream, mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
 @app.route('/api/devices')
 def api_devices():
-    conn = get_db_connection()
-    if not conn:
-        return jsonify([])
-    try:
-        devices = conn.execute('SELECT * FROM devices').fetchall()
-        return jsonify([dict(device) for device in devices])
-    except Exception as e:
-        print(f"Error loading devices: {e}")
-        return jsonify([])
-    finally:
-        conn.close()
+    # served from the bridge's in-memory registry; never touches SQLite
+    etag, body = admin_mqtt.registry.snapshot_json()
+    if etag in request.headers.get('If-None-Match', ''):
+        response = Response(status=304)
+    else:
+        response = Response(body, mimetype='application/json')
+    response.headers['ETag'] = etag
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
 
 @app.route('/api/messages')
 def api_messages():
@@ -576,33 +232,33 @@ def api_messages():
     until = request.args.get('until', type=float)
     limit = request.args.get('limit', default=200, type=int)
     
-    conn = get_db_connection()
+    conn = get_db_connection(readonly=True)
     if not conn:
         return jsonify([])
     
     try:
-        query = 'SELECT * FROM messages WHERE 1=1'
+        where = '1=1'
         params = []
         
         if device_id:
-            query += ' AND device_id = ?'
+            where += ' AND device_id = ?'
             params.append(device_id)
         
         if since:
-            query += ' AND ts >= ?'
+            where += ' AND ts >= ?'
             params.append(since)
         
         if until:
-            query += ' AND ts <= ?'
+            where += ' AND ts <= ?'
             params.append(until)
         
-        query += ' ORDER BY ts DESC LIMIT ?'
-        params.append(limit)
+        messages, next_cursor = _fetch_page(
+            conn, 'messages', where, params, limit,
+            since=since or None, until=until or None
+        )
         
-        messages = conn.execute(query, params).fetchall()
-        
-        # If no messages, return sample data
-        if len(messages) == 0:
+        # If no messages, return sample data (first page only)
+        if len(messages) == 0 and not request.args.get('cursor'):
             sample_ts = time.time()
             device = device_id or "dev001"
             return jsonify([
@@ -622,7 +278,9 @@ def api_messages():
                 "device_id": msg["device_id"],
                 "location": msg["location"]
             })
-        return jsonify(messages_list)
+        return _paged_response(messages_list, next_cursor)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         print(f"Error fetching messages: {e}")
         return jsonify([])
@@ -632,16 +290,14 @@ def api_messages():
 @app.route('/api/anomalies')
 def api_anomalies():
     limit = request.args.get('limit', default=10, type=int)
-    conn = get_db_connection()
+    conn = get_db_connection(readonly=True)
     if not conn:
         return jsonify([])
     try:
-        anomalies = conn.execute('''
-            SELECT * FROM anomalies 
-            ORDER BY ts DESC 
-            LIMIT ?
-        ''', (limit,)).fetchall()
-        return jsonify([dict(anom) for anom in anomalies])
+        anomalies, next_cursor = _fetch_page(conn, 'anomalies', limit=limit)
+        return _paged_response([dict(anom) for anom in anomalies], next_cursor)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         print(f"Error fetching anomalies: {e}")
         return jsonify([])
@@ -650,25 +306,23 @@ def api_anomalies():
 
 @app.route('/api/anomalies.csv')
 def api_anomalies_csv():
+    # latest N anomalies; /api/export/anomalies.csv streams the full table
     limit = request.args.get('limit', default=10, type=int)
-    conn = get_db_connection()
+    conn = get_db_connection(readonly=True)
     if not conn:
         return jsonify([])
     try:
-        anomalies = conn.execute('''
-            SELECT * FROM anomalies 
-            ORDER BY ts DESC 
-            LIMIT ?
-        ''', (limit,)).fetchall()
-        
-        # Create CSV output
+        anomalies = PARTITIONS.fetch_newest(conn, 'anomalies', limit=limit)
+    except Exception as e:
+        print(f"Error generating CSV: {e}")
+        return jsonify({"error": str(e)}), 500
+    finally:
+        conn.close()
+    
+    def generate():
         output = io.StringIO()
         writer = csv.writer(output)
-        
-        # Write header
         writer.writerow(['id', 'device_id', 'timestamp', 'anomaly_type', 'message'])
-        
-        # Write data
         for anom in anomalies:
             writer.writerow([
                 anom['id'],
@@ -677,17 +331,57 @@ def api_anomalies_csv():
                 anom['anomaly_type'],
                 anom['message']
             ])
-        
-        # Create response
-        response = make_response(output.getvalue())
-        response.headers['Content-Type'] = 'text/csv'
-        response.headers['Content-Disposition'] = f'attachment; filename=anomalies-{int(time.time())}.csv'
-        return response
-    except Exception as e:
-        print(f"Error generating CSV: {e}")
-        return jsonify({"error": str(e)}), 500
-    finally:
-        conn.close()
+            yield output.getvalue()
+            output.seek(0)
+            output.truncate()
+        yield output.getvalue()
+    
+    response = Response(generate(), mimetype='text/csv')
+    response.headers['Content-Disposition'] = f'attachment; filename=anomalies-{int(time.time())}.csv'
+    return response
+
+@app.route('/api/export/<table>.<fmt>')
+def api_export(table, fmt):
+    # Unbounded export, streamed chunk by chunk in (ts, id) order
+    if table not in EXPORT_TABLES or fmt not in EXPORT_FORMATS:
+        return jsonify({'error': f'Unknown export {table}.{fmt}'}), 404
+    device_id = request.args.get('device_id')
+    since = request.args.get('since', type=float)
+    until = request.args.get('until', type=float)
+    
+    where = '1=1'
+    params = []
+    if device_id:
+        where += ' AND device_id = ?'
+        params.append(device_id)
+    if since:
+        where += ' AND ts >= ?'
+        params.append(since)
+    if until:
+        where += ' AND ts <= ?'
+        params.append(until)
+    
+    chunks = iter_chunks(
+        DB_POOL, PARTITIONS, table, where, tuple(params),
+        since=since or None, until=until or None,
+        chunk_rows=int(CFG["admin"].get("export_chunk_rows", 1000))
+    )
+    
+    def generate():
+        try:
+            if fmt == 'csv':
+                yield from csv_stream(chunks)
+            else:
+                yield from ndjson_stream(chunks)
+        except Exception as e:
+            # headers are already sent; all we can do is stop the stream
+            print(f"[ADMIN] Export of {table} aborted: {e}")
+        finally:
+            chunks.close()
+    
+    response = Response(generate(), mimetype=EXPORT_FORMATS[fmt])
+    response.headers['Content-Disposition'] = f'attachment; filename={table}-{int(time.time())}.{fmt}'
+    return response
 
 @app.route('/api/stats')
 def api_stats():
@@ -695,39 +389,20 @@ def api_stats():
     since = request.args.get('since', type=float)
     until = request.args.get('until', type=float)
     
-    conn = get_db_connection()
+    conn = get_db_connection(readonly=True)
     if not conn:
         return jsonify({})
     try:
-        query = '''
-            SELECT 
-                COUNT(*) as total_messages,
-                AVG(core_temp) as avg_temperature,
-                SUM(CASE WHEN valid = 0 THEN 1 ELSE 0 END) as invalid_count,
-                SUM(CASE WHEN schema_ok = 0 THEN 1 ELSE 0 END) as schema_invalid_count
-            FROM messages
-            WHERE 1=1
-        '''
-        params = []
-        
-        if device_id:
-            query += ' AND device_id = ?'
-            params.append(device_id)
-        
-        if since:
-            query += ' AND ts >= ?'
-            params.append(since)
-        
-        if until:
-            query += ' AND ts <= ?'
-            params.append(until)
-        
-        stats = conn.execute(query, params).fetchone()
+        # answered from the coarsest rollups that fit, raw rows only at the edges
+        stats = rollups.stats(conn, PARTITIONS, device_id, since or None, until or None)
         return jsonify({
-            "total_messages": stats['total_messages'] or 0,
-            "avg_temperature": stats['avg_temperature'] or 0,
-            "invalid_count": stats['invalid_count'] or 0,
-            "schema_invalid_count": stats['schema_invalid_count'] or 0
+            "total_messages": stats['count'],
+            "avg_temperature": stats['avg'] or 0,
+            "min_temperature": stats['min'],
+            "max_temperature": stats['max'],
+            "invalid_count": stats['invalid_count'],
+            "schema_invalid_count": stats['schema_invalid_count'],
+            "anomaly_count": stats['anomaly_count']
         })
     except Exception as e:
         print(f"Error fetching stats: {e}")
@@ -735,10 +410,53 @@ def api_stats():
     finally:
         conn.close()
 
+@app.route('/api/latency')
+def api_latency():
+    # publish->ingest and ingest->commit quantiles, merged from the per-minute sketches
+    device_id = request.args.get('device_id')
+    metric = request.args.get('metric')
+    since = request.args.get('since', type=float)
+    until = request.args.get('until', type=float)
+    per_minute = request.args.get('per_minute', '0') in ('1', 'true')
+    if metric and metric not in latency.METRICS:
+        return jsonify({'error': f"unknown metric (expected one of {', '.join(latency.METRICS)})"}), 400
+
+    conn = get_db_connection(readonly=True)
+    if not conn:
+        return jsonify({})
+    try:
+        result = latency.query(conn, device_id, metric, since, until, per_minute)
+        # in-memory totals since the bridge started (includes the minute not yet flushed)
+        result['live'] = admin_mqtt.latency.totals()
+        return jsonify(result)
+    except Exception as e:
+        print(f"Error fetching latency: {e}")
+        return jsonify({})
+    finally:
+        conn.close()
+
+@app.route('/api/history')
+def api_history():
+    device_id = request.args.get('device_id')
+    since = request.args.get('since', type=float)
+    until = request.args.get('until', type=float)
+    points = request.args.get('points', default=300, type=int)
+    
+    conn = get_db_connection(readonly=True)
+    if not conn:
+        return jsonify({})
+    try:
+        return jsonify(rollups.history(conn, device_id, since, until, max(1, points)))
+    except Exception as e:
+        print(f"Error fetching history: {e}")
+        return jsonify({})
+    finally:
+        conn.close()
+
 @app.route('/api/schedule', methods=['GET', 'POST'])
 def api_schedule():
     if request.method == 'GET':
-        conn = get_db_connection()
+        conn = get_db_connection(readonly=True)
         if not conn:
             return jsonify([])
         try:
@@ -842,16 +560,14 @@ def api_mqttconfig():
 @app.route('/api/service_logs')
 def api_service_logs():
     limit = request.args.get('limit', default=30, type=int)
-    conn = get_db_connection()
+    conn = get_db_connection(readonly=True)
     if not conn:
         return jsonify([])
     try:
-        logs = conn.execute('''
-            SELECT * FROM service_logs 
-            ORDER BY ts DESC 
-            LIMIT ?
-        ''', (limit,)).fetchall()
-        return jsonify([dict(log) for log in logs])
+        logs, next_cursor = _fetch_page(conn, 'service_logs', limit=limit)
+        return _paged_response([dict(log) for log in logs], next_cursor)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         print(f"Error fetching service logs: {e}")
         return jsonify([])
@@ -0,0 +1,151 @@
+# group_1_bench_generator.py
+# Microbenchmark: DataGenerator.get_value() one sample at a time vs the NumPy
+# block paths (get_values(n) for one device, DataGeneratorBank.values() for one
+# sample of many devices), in samples/s on one core.
+#
+#   python group_1_bench_generator.py --n 1000000
+#
+# Before timing, the block paths are checked against the scalar path on the
+# same settings (wild + corrupt injection on; the bank against one scalar
+# generator per device, stepped the same way): mean / std of the clean samples,
+# injection shares and a two-sample Kolmogorov-Smirnov distance between the
+# clean-sample distributions must agree within sampling error.
+import sys
+import math
+import json
+import time
+import random
+import argparse
+import statistics
+
+import group_1_data_generator as gen_mod
+from group_1_data_generator import DataGenerator, DataGeneratorBank, CORRUPT_MARKERS
+
+WILD, CORRUPT = 0.02, 0.02
+
+
+def scalar_samples(n, inject=True):
+    g = DataGenerator(wild_rate=WILD, corrupt_rate=CORRUPT)
+    g.set_wild_enabled(inject)
+    g.set_corrupt_enabled(inject)
+    return [g.get_value() for _ in range(n)]
+
+
+def block_samples(n, block, inject=True):
+    g = DataGenerator(wild_rate=WILD, corrupt_rate=CORRUPT)
+    g.set_wild_enabled(inject)
+    g.set_corrupt_enabled(inject)
+    out = []
+    while len(out) < n:
+        out.extend(g.get_values(min(block, n - len(out))))
+    return out
+
+
+def scalar_fleet_samples(n, devices, inject=True):
+    # reference for the bank: one DataGenerator per device, stepped round-robin
+    gens = [DataGenerator(wild_rate=WILD, corrupt_rate=CORRUPT) for _ in range(devices)]
+    for g in gens:
+        g.set_wild_enabled(inject)
+        g.set_corrupt_enabled(inject)
+    out = []
+    while len(out) < n:
+        out.extend(g.get_value() for g in gens)
+    return out[:n]
+
+
+def bank_samples(n, devices, inject=True):
+    # one device's consecutive samples come from consecutive values() calls on the bank
+    bank = DataGeneratorBank(devices, wild_rate=WILD if inject else 0.0, corrupt_rate=CORRUPT if inject else 0.0)
+    slots = list(range(devices))
+    out = []
+    while len(out) < n:
+        out.extend(bank.values(slots))
+    return out[:n]
+
+
+def describe(samples) -> dict:
+    clean = [v for v in samples if isinstance(v, float) and -1 < v < 51]
+    wild = sum(1 for v in samples if isinstance(v, float) and not -1 < v < 51)
+    corrupt = sum(1 for v in samples if v in CORRUPT_MARKERS)
+    return {"mean": statistics.fmean(clean), "std": statistics.pstdev(clean),
+            "wild_share": wild / len(samples), "corrupt_share": corrupt / len(samples), "clean": clean}
+
+
+def ks_distance(a, b) -> float:
+    a, b = sorted(a), sorted(b)
+    i = j = 0
+    d = 0.0
+    while i < len(a) and j < len(b):
+        if a[i] <= b[j]:
+            i += 1
+        else:
+            j += 1
+        d = max(d, abs(i / len(a) - j / len(b)))
+    return d
+
+
+def check_same_distribution(name, ref, other):
+    """Fails when `other` differs from the scalar reference by more than sampling error."""
+    n = len(ref["clean"])
+    ks = ks_distance(ref["clean"], other["clean"])
+    ks_limit = 1.95 * math.sqrt(2.0 / n)  # ~0.1% false-alarm level
+    checks = {
+        "mean": abs(ref["mean"] - other["mean"]) < 6 * ref["std"] / math.sqrt(n),
+        "std": abs(ref["std"] - other["std"]) < 0.02 * ref["std"],
+        "wild_share": abs(ref["wild_share"] - other["wild_share"]) < 6 * math.sqrt(WILD / n) + 1e-3,
+        "corrupt_share": abs(ref["corrupt_share"] - other["corrupt_share"]) < 6 * math.sqrt(CORRUPT / n) + 1e-3,
+        "ks": ks < ks_limit,
+    }
+    print(f"[BENCH] {name:<12} mean {other['mean']:.4f} std {other['std']:.4f} "
+          f"wild {other['wild_share']:.4f} corrupt {other['corrupt_share']:.4f} KS {ks:.4f} (< {ks_limit:.4f})")
+    failed = [k for k, ok in checks.items() if not ok]
+    if failed:
+        raise SystemExit(f"{name}: distribution differs from get_value() ({', '.join(failed)})")
+    return ks
+
+
+def samples_per_s(fn, n, repeat):
+    best = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(n)
+        best.append(n / (time.perf_counter() - t0))
+    return statistics.median(best)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark scalar vs NumPy block sample generation")
+    ap.add_argument("--n", type=int, default=1_000_000, help="samples per case (default: 1000000)")
+    ap.add_argument("--check-n", type=int, default=200_000, help="samples for the distribution check")
+    ap.add_argument("--repeat", type=int, default=3, help="runs per case, median is reported (default: 3)")
+    ap.add_argument("--seed", type=int, default=216)
+    ap.add_argument("--json", help="also write results to this JSON file")
+    args = ap.parse_args()
+    if gen_mod.np is None:
+        raise SystemExit("numpy is not installed: get_values() and DataGeneratorBank fall back to the scalar path")
+
+    random.seed(args.seed)
+    ref = describe(scalar_samples(args.check_n))
+    print(f"[BENCH] {'get_value':<12} mean {ref['mean']:.4f} std {ref['std']:.4f} "
+          f"wild {ref['wild_share']:.4f} corrupt {ref['corrupt_share']:.4f}")
+    ks = {"get_values": check_same_distribution("get_values", ref, describe(block_samples(args.check_n, 1024)))}
+    fleet_ref = describe(scalar_fleet_samples(args.check_n, 1000))
+    ks["bank"] = check_same_distribution("bank x1000", fleet_ref, describe(bank_samples(args.check_n, 1000)))
+
+    cases = [("get_value", lambda n: scalar_samples(n))]
+    cases += [(f"get_values({b})", lambda n, b=b: block_samples(n, b)) for b in (16, 256, 4096)]
+    cases += [(f"bank x{d}", lambda n, d=d: bank_samples(n, d)) for d in (16, 256, 5000)]
+    results = {}
+    print(f"\n{'path':<18} {'samples/s':>12} {'vs scalar':>10}")
+    for name, fn in cases:
+        rate = samples_per_s(fn, args.n, args.repeat)
+        results[name] = round(rate)
+        print(f"{name:<18} {rate:>12,.0f} {rate / results['get_value']:>9.1f}x")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"n": args.n, "repeat": args.repeat, "samples_per_s": results, "ks": ks}, f, indent=2)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
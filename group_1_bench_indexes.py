@@ -0,0 +1,170 @@
+# group_1_bench_indexes.py
+# Query latency on the admin database before and after the index migration.
+#
+#   python group_1_bench_indexes.py --rows 10000000
+#
+# Builds a synthetic database at schema v2 (no indexes), times the queries the
+# admin API runs, applies the remaining migrations and times them again.
+import os
+import sys
+import json
+import time
+import random
+import sqlite3
+import argparse
+import statistics
+
+from group_1_migrations import migrate, LATEST_VERSION
+
+DAY = 24 * 3600
+
+# (name, sql, params builder) -- same shapes as the /api routes and the purge
+QUERIES = [
+    ("messages latest 200",
+     "SELECT * FROM messages ORDER BY ts DESC LIMIT 200",
+     lambda a: ()),
+    ("messages device latest 200",
+     "SELECT * FROM messages WHERE device_id = ? ORDER BY ts DESC LIMIT 200",
+     lambda a: (a.device,)),
+    ("messages device last hour",
+     "SELECT * FROM messages WHERE device_id = ? AND ts >= ? AND ts <= ? ORDER BY ts DESC LIMIT 200",
+     lambda a: (a.device, a.now - 3600, a.now)),
+    ("stats device last day",
+     "SELECT COUNT(*), AVG(core_temp), SUM(CASE WHEN valid = 0 THEN 1 ELSE 0 END), "
+     "SUM(CASE WHEN schema_ok = 0 THEN 1 ELSE 0 END) FROM messages WHERE device_id = ? AND ts >= ?",
+     lambda a: (a.device, a.now - DAY)),
+    ("stats fleet last hour",
+     "SELECT COUNT(*), AVG(core_temp), SUM(CASE WHEN valid = 0 THEN 1 ELSE 0 END), "
+     "SUM(CASE WHEN schema_ok = 0 THEN 1 ELSE 0 END) FROM messages WHERE ts >= ?",
+     lambda a: (a.now - 3600,)),
+    ("schema failures device",
+     "SELECT * FROM messages WHERE device_id = ? AND schema_ok = 0 ORDER BY ts DESC LIMIT 50",
+     lambda a: (a.device,)),
+    ("anomalies latest 10",
+     "SELECT * FROM anomalies ORDER BY ts DESC LIMIT 10",
+     lambda a: ()),
+    ("service_logs latest 30",
+     "SELECT * FROM service_logs ORDER BY ts DESC LIMIT 30",
+     lambda a: ()),
+    ("purge candidates (messages)",
+     "SELECT COUNT(*) FROM messages WHERE ts < ?",
+     lambda a: (a.now - 30 * DAY,)),
+]
+
+
+def build(conn, args):
+    rng = random.Random(args.seed)
+    devices = [f"dev{i:04d}" for i in range(args.devices)]
+    start = args.now - args.days * DAY
+    step = (args.days * DAY) / max(1, args.rows)
+
+    def messages():
+        for i in range(args.rows):
+            ts = start + i * step
+            dev = devices[i % len(devices)]
+            roll = rng.random()
+            if roll < 0.02:
+                yield (dev, ts, None, f"{dev}-{i}", 0, 0, 1, "group_1/temp", '{"bad": true}', "Site")
+            else:
+                temp = round(20 + 5 * rng.random(), 2)
+                yield (dev, ts, temp, f"{dev}-{i}", 1, 1, 1, "group_1/temp", "{}", "Site")
+
+    def anomalies():
+        for i in range(args.rows // 50):
+            yield (devices[i % len(devices)], start + i * step * 50, "WILD", "synthetic")
+
+    def service_logs():
+        n = int(args.rows * args.log_ratio)
+        log_step = (args.days * DAY) / max(1, n)
+        for i in range(n):
+            yield (devices[i % len(devices)], start + i * log_step, 1, 1, "Valid message", None, "group_1/temp")
+
+    conn.execute("PRAGMA journal_mode=OFF")
+    conn.execute("PRAGMA synchronous=OFF")
+    t0 = time.perf_counter()
+    conn.execute("BEGIN")
+    conn.executemany(
+        "INSERT INTO messages (device_id, ts, core_temp, packet_id, valid, schema_ok, qos, topic, raw_data, location) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", messages())
+    conn.executemany("INSERT INTO anomalies (device_id, ts, anomaly_type, message) VALUES (?, ?, ?, ?)", anomalies())
+    conn.executemany(
+        "INSERT INTO service_logs (device_id, ts, qos, schema_ok, log_message, anomaly_type, topic) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)", service_logs())
+    conn.execute("COMMIT")
+    return time.perf_counter() - t0
+
+
+def run_queries(conn, args):
+    results = {}
+    for name, sql, params in QUERIES:
+        p = params(args)
+        plan = " | ".join(r[3] for r in conn.execute("EXPLAIN QUERY PLAN " + sql, p).fetchall())
+        samples = []
+        for _ in range(args.repeat):
+            t0 = time.perf_counter()
+            conn.execute(sql, p).fetchall()
+            samples.append((time.perf_counter() - t0) * 1000.0)
+        results[name] = {"median_ms": round(statistics.median(samples), 3), "plan": plan}
+    return results
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark admin DB queries before/after index migration")
+    ap.add_argument("--rows", type=int, default=10_000_000, help="messages rows to generate (default: 10M)")
+    ap.add_argument("--devices", type=int, default=100, help="distinct device ids (default: 100)")
+    ap.add_argument("--days", type=float, default=35, help="time span of the data in days (default: 35)")
+    ap.add_argument("--log-ratio", type=float, default=0.1, help="service_logs rows per message (default: 0.1)")
+    ap.add_argument("--repeat", type=int, default=5, help="runs per query, median is reported (default: 5)")
+    ap.add_argument("--seed", type=int, default=216)
+    ap.add_argument("--db", default="bench_indexes.db", help="scratch database path (deleted first)")
+    ap.add_argument("--keep", action="store_true", help="keep the scratch database afterwards")
+    ap.add_argument("--json", help="also write results to this JSON file")
+    args = ap.parse_args()
+    args.now = time.time()
+    args.device = "dev0000"
+
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(args.db + suffix):
+            os.remove(args.db + suffix)
+
+    conn = sqlite3.connect(args.db, isolation_level=None)
+    migrate(conn, target=2)
+    print(f"Generating {args.rows:,} messages across {args.devices} devices...")
+    build_s = build(conn, args)
+    print(f"  done in {build_s:.1f}s")
+
+    print("Timing queries without indexes...")
+    before = run_queries(conn, args)
+
+    t0 = time.perf_counter()
+    migrate(conn)
+    migrate_s = time.perf_counter() - t0
+    print(f"Migrated to v{LATEST_VERSION} in {migrate_s:.1f}s")
+
+    print("Timing queries with indexes...")
+    after = run_queries(conn, args)
+    conn.close()
+
+    width = max(len(name) for name, _, _ in QUERIES)
+    print(f"\n{'query':<{width}}  {'before ms':>11}  {'after ms':>10}  {'speedup':>8}")
+    for name, _, _ in QUERIES:
+        b, a = before[name]["median_ms"], after[name]["median_ms"]
+        speedup = (b / a) if a > 0 else float("inf")
+        print(f"{name:<{width}}  {b:>11.3f}  {a:>10.3f}  {speedup:>7.1f}x")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({
+                "rows": args.rows, "devices": args.devices, "days": args.days,
+                "build_s": round(build_s, 3), "migrate_s": round(migrate_s, 3),
+                "before": before, "after": after,
+            }, f, indent=2)
+
+    if not args.keep:
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(args.db + suffix):
+                os.remove(args.db + suffix)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,372 @@
+# group_1_bench_ingest.py
+# Headless fleet load generator + ingest benchmark for the admin bridge.
+#
+#   python group_1_bench_ingest.py --devices 2000 --interval 1 --duration 60 --json bench_ingest.json
+#
+# Simulates --devices publishers (DataGenerator + MessagePackager, no Tk) over a
+# few MQTT connections, publishing to the broker in group_1_config.json (or
+# --broker/--port, or --local-broker for group_1_mini_broker.py). The admin server (or --embedded) must be ingesting into the
+# database named by admin.db_path; the report is read back from that database:
+#   sustained ingest msgs/s, publish->ingest / ingest->commit percentiles
+#   (latency_1m), loss and duplicates (stored packet_ids vs sent), DB growth.
+#
+# Every simulated device has its own seeded generator, so two runs with the same
+# --seed offer the same values. --trace replays a recorded trace instead
+# (group_1_trace.py): same devices, values and packet counters every run, at the
+# recorded pace or --speed times faster; timestamps are taken at publish time.
+import os
+import sys
+import json
+import time
+import heapq
+import random
+import socket
+import sqlite3
+import argparse
+import threading
+import subprocess
+
+import paho.mqtt.client as mqtt
+
+import group_1_codec as codec
+from group_1_util import MessagePackager
+from group_1_data_generator import DataGenerator
+from group_1_trace import TracePlayer
+from group_1_partitions import get_partitions
+from group_1_latency import LogSketch, QUANTILES
+
+
+def db_size(path: str) -> int:
+    return sum(os.path.getsize(p) for p in (path, path + "-wal") if os.path.exists(p))
+
+
+class FleetPublisher(threading.Thread):
+    """
+    One MQTT connection publishing for a slice of the simulated devices:
+    - devices: [(generator, packager)], or with a trace {trace device index: (None, packager)}
+    - Trace replay publishes this slice's records at the recorded spacing / --speed
+    """
+    def __init__(self, index, devices, args, topic, stop, in_burst, trace=None):
+        super().__init__(name=f"bench-pub-{index}", daemon=True)
+        self.index = index
+        self.devices = devices
+        self.args = args
+        self.topic = topic
+        self.stop_event = stop
+        self.in_burst = in_burst
+        self.trace = trace
+        self.sent = 0          # readings
+        self.publishes = 0     # MQTT PUBLISH packets (fewer than readings with --batch)
+        self.errors = 0
+        self.payload_bytes = 0
+        self.pending = {}      # device index -> readings waiting for a full batch
+        # content-type property only exists in MQTT v5; 3.1.1 consumers sniff the format
+        self.props = codec.publish_properties(args.format) if args.mqtt_version == 5 else None
+        proto = mqtt.MQTTv5 if args.mqtt_version == 5 else mqtt.MQTTv311
+        self.client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2,
+                                  client_id=f"{args.run_id}-pub{index}", protocol=proto)
+        # QoS 1 at thousands of msgs/s needs a deep in-flight window
+        self.client.max_inflight_messages_set(args.inflight)
+        self.client.max_queued_messages_set(0)
+
+    def run(self):
+        self.client.connect(self.args.broker, self.args.port, keepalive=30)
+        self.client.loop_start()
+        try:
+            if self.trace is not None:
+                self.trace.play(self._replay, self.args.speed, self.stop_event)
+            else:
+                self._simulate()
+            # partial batches
+            for i, batch in self.pending.items():
+                self._publish(self.devices[i][1].package_batch(batch), len(batch))
+            self.pending.clear()
+        finally:
+            # let QoS 1 publishes already queued reach the broker
+            deadline = time.monotonic() + 10
+            while self.client.want_write() and time.monotonic() < deadline:
+                time.sleep(0.05)
+            self.client.loop_stop()
+            self.client.disconnect()
+
+    def _simulate(self):
+        rng = random.Random(self.args.seed * 1000 + self.index)
+        now = time.monotonic()
+        # (next send time, device index); start times are spread over one interval
+        heap = [(now + rng.uniform(0, self.args.interval), i) for i in range(len(self.devices))]
+        heapq.heapify(heap)
+        while not self.stop_event.is_set() and heap:
+            due, i = heap[0]
+            delay = due - time.monotonic()
+            if delay > 0:
+                self.stop_event.wait(min(delay, 0.05))
+                continue
+            self._emit(i, self.devices[i][0].get_value())
+            interval = self.args.interval / (self.args.burst_factor if self.in_burst.is_set() else 1.0)
+            heapq.heapreplace(heap, (due + interval, i))
+
+    def _replay(self, ts, d, counter, value):
+        if d in self.devices:
+            # keep the recorded numbering, so recorded sequence gaps replay as gaps
+            self.devices[d][1].counter = counter - 1
+            self._emit(d, value)
+
+    def _emit(self, i, value):
+        packager = self.devices[i][1]
+        if self.args.batch > 1:
+            batch = self.pending.setdefault(i, [])
+            batch.append(packager.reading(value))
+            if len(batch) >= self.args.batch:
+                self._publish(packager.package_batch(batch), len(batch))
+                del self.pending[i]
+        else:
+            self._publish(packager.package(value), 1)
+
+    def _publish(self, payload, readings):
+        try:
+            info = self.client.publish(self.topic, payload, qos=self.args.qos, properties=self.props)
+            if info.rc == mqtt.MQTT_ERR_SUCCESS:
+                self.sent += readings
+                self.publishes += 1
+                self.payload_bytes += len(payload)
+            else:
+                self.errors += 1
+        except Exception:
+            self.errors += 1
+
+
+class StoreProbe:
+    """Reads bench rows back from the admin database (read-only)."""
+    def __init__(self, db_path, run_id, since, partition_hours):
+        self.conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True, timeout=30)
+        self.partitions = get_partitions(db_path, period_s=partition_hours * 3600)
+        self.like = f"{run_id}-%"
+        self.since = since
+
+    def counts(self):
+        src = self.partitions.source(self.conn, "messages", self.since)
+        row = self.conn.execute(
+            f"SELECT COUNT(*), COUNT(DISTINCT packet_id) FROM {src} WHERE ts >= ? AND device_id LIKE ?",
+            (self.since, self.like)).fetchone()
+        return row[0], row[1]
+
+    def latency(self):
+        sketches = {}
+        for metric, blob in self.conn.execute(
+                "SELECT metric, sketch FROM latency_1m WHERE bucket_ts >= ? AND device_id LIKE ?",
+                (self.since - self.since % 60, self.like)):
+            sketches.setdefault(metric, LogSketch()).merge(LogSketch.from_bytes(blob))
+        return {m: s.summary() for m, s in sketches.items()}
+
+
+def main():
+    with open("group_1_config.json") as f:
+        cfg = json.load(f)
+
+    ap = argparse.ArgumentParser(description="Headless fleet load generator and ingest benchmark")
+    ap.add_argument("--devices", type=int, default=1000, help="simulated devices (default: 1000)")
+    ap.add_argument("--interval", type=float, default=1.0, help="seconds between readings per device (default: 1)")
+    ap.add_argument("--duration", type=float, default=60, help="publishing time, seconds (default: 60)")
+    ap.add_argument("--connections", type=int, default=4, help="MQTT connections shared by the devices (default: 4)")
+    ap.add_argument("--wild-rate", type=float, default=0.0, help="share of wild readings (default: 0)")
+    ap.add_argument("--corrupt-rate", type=float, default=0.0, help="share of corrupt readings (default: 0)")
+    ap.add_argument("--burst-every", type=float, default=0, help="start a burst every N seconds (default: off)")
+    ap.add_argument("--burst-len", type=float, default=5, help="burst length, seconds (default: 5)")
+    ap.add_argument("--burst-factor", type=float, default=10, help="rate multiplier during bursts (default: 10)")
+    ap.add_argument("--format", default="json", choices=codec.FORMATS,
+                    help="data payload wire format (group_1_codec, default: json)")
+    ap.add_argument("--batch", type=int, default=1,
+                    help="readings per MQTT message (batched envelopes, default: 1 = off)")
+    ap.add_argument("--qos", type=int, default=int(cfg["mqtt"].get("qos", 1)), choices=(0, 1, 2))
+    ap.add_argument("--mqtt-version", type=int, default=5, choices=(3, 5))
+    ap.add_argument("--inflight", type=int, default=1000, help="max QoS>0 messages in flight per connection")
+    ap.add_argument("--broker", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=int(cfg["mqtt"]["port"]))
+    ap.add_argument("--local-broker", action="store_true",
+                    help="start group_1_mini_broker.py in a child process on a free port and use it")
+    ap.add_argument("--db", default=cfg["admin"]["db_path"], help="admin database to read results from")
+    ap.add_argument("--embedded", action="store_true",
+                    help="run the admin bridge (AdminMQTT) in this process instead of relying on the server")
+    ap.add_argument("--settle", type=float, default=30, help="max seconds to wait for ingest to drain (default: 30)")
+    ap.add_argument("--seed", type=int, default=216)
+    ap.add_argument("--trace", help="replay this trace file (group_1_trace.py) instead of simulating devices")
+    ap.add_argument("--speed", type=float, default=1.0,
+                    help="trace replay pace multiplier, 0 = as fast as possible (default: 1)")
+    ap.add_argument("--json", help="write the report to this JSON file")
+    args = ap.parse_args()
+    try:
+        codec.check_format(args.format)
+    except ValueError as e:
+        raise SystemExit(f"[BENCH] {e}")
+    args.run_id = f"b{int(time.time()) % 100000:05d}"
+    random.seed(args.seed)
+
+    broker_proc = None
+    if args.local_broker:
+        # own process, so the broker does not share a GIL with the publishers
+        with socket.socket() as probe_sock:
+            probe_sock.bind(("127.0.0.1", 0))
+            args.port = probe_sock.getsockname()[1]
+        args.broker = "127.0.0.1"
+        broker_proc = subprocess.Popen([sys.executable, "group_1_mini_broker.py", "--port", str(args.port)])
+        deadline = time.time() + 10
+        while True:
+            try:
+                socket.create_connection((args.broker, args.port), timeout=1).close()
+                break
+            except OSError:
+                if time.time() > deadline:
+                    raise SystemExit("[BENCH] local broker did not start")
+                time.sleep(0.1)
+
+    bridge = None
+    if args.embedded:
+        from group_1_db_pool import get_pool
+        from group_1_migrations import migrate
+        from group_1_admin_mqtt import AdminMQTT
+        cfg["admin"]["db_path"] = args.db
+        cfg["mqtt"].update(broker=args.broker, port=args.port)
+        with get_pool(args.db).connection() as conn:
+            migrate(conn)
+        bridge = AdminMQTT(cfg, client_id=f"{args.run_id}-admin")
+        bridge.start()
+        time.sleep(1.0)  # let it subscribe before the first publish
+
+    if not os.path.exists(args.db):
+        print(f"[BENCH] No admin database at {args.db}; start the admin server first or use --embedded")
+        return 2
+
+    # devices
+    trace = None
+    if args.trace:
+        try:
+            trace = TracePlayer(args.trace)
+        except (OSError, ValueError) as e:
+            raise SystemExit(f"[BENCH] {e}")
+        args.devices = len(trace.devices)
+        if args.speed > 0:
+            args.duration = min(args.duration, trace.duration / args.speed + 1.0)
+        n = max(1, min(args.connections, args.devices))
+        slices = [{} for _ in range(n)]
+        for d, (trace_id, location) in enumerate(trace.devices):
+            packager = MessagePackager(f"{args.run_id}-{trace_id}", location or "Bench", args.format, location_every=30)
+            slices[d % n][d] = (None, packager)
+    else:
+        fleet = []
+        for i in range(args.devices):
+            gen = DataGenerator(seed=f"{args.seed}-{i}")
+            gen.set_injection_rates(wild_rate=args.wild_rate, corrupt_rate=args.corrupt_rate)
+            gen.set_wild_enabled(args.wild_rate > 0)
+            gen.set_corrupt_enabled(args.corrupt_rate > 0)
+            fleet.append((gen, MessagePackager(f"{args.run_id}-{i:05d}", "Bench", args.format, location_every=30)))
+        n = max(1, min(args.connections, args.devices))
+        slices = [fleet[k::n] for k in range(n)]
+    stop, in_burst = threading.Event(), threading.Event()
+    pubs = [FleetPublisher(k, slices[k], args, cfg["mqtt"]["topics"]["data"], stop, in_burst, trace)
+            for k in range(n)]
+
+    size_before = db_size(args.db)
+    started = time.time()
+    probe = StoreProbe(args.db, args.run_id, started - 1, float(cfg.get("history", {}).get("partition_hours", 24)))
+    if trace is not None:
+        print(f"[BENCH] run {args.run_id}: replaying {args.trace} ({len(trace)} readings, {args.devices} devices, "
+              f"{trace.duration:.0f}s at speed {args.speed}) over {n} connections -> {args.broker}:{args.port}")
+    else:
+        print(f"[BENCH] run {args.run_id}: {args.devices} devices every {args.interval}s "
+              f"over {n} connections for {args.duration}s -> {args.broker}:{args.port}")
+    for p in pubs:
+        p.start()
+
+    # sample the stored row count once a second while publishing
+    samples = []
+    t0 = time.monotonic()
+    while time.monotonic() - t0 < args.duration:
+        elapsed = time.monotonic() - t0
+        if args.burst_every:
+            if elapsed % args.burst_every < args.burst_len:
+                in_burst.set()
+            else:
+                in_burst.clear()
+        time.sleep(1.0)
+        samples.append((time.monotonic() - t0, probe.counts()[0], sum(p.sent for p in pubs)))
+        if not any(p.is_alive() for p in pubs):
+            break  # trace finished
+    stop.set()
+    for p in pubs:
+        p.join(15)
+    publish_s = time.monotonic() - t0
+    sent = sum(p.sent for p in pubs)
+    if trace is not None:
+        trace.close()
+
+    # wait for the bridge to drain (stored count stops moving)
+    stored, distinct = probe.counts()
+    drain_start = last_change = time.monotonic()
+    while distinct < sent and time.monotonic() - last_change < 5.0 \
+            and time.monotonic() - drain_start < args.settle:
+        time.sleep(0.5)
+        now_counts = probe.counts()
+        if now_counts != (stored, distinct):
+            stored, distinct = now_counts
+            last_change = time.monotonic()
+    drain_s = time.monotonic() - drain_start
+
+    # sustained rate: stored rows over the steady part of the run (skip the first 10%)
+    skip = [s for s in samples if s[0] >= 0.1 * args.duration] or samples
+    if len(skip) >= 2:
+        sustained = (skip[-1][1] - skip[0][1]) / max(1e-9, skip[-1][0] - skip[0][0])
+    else:
+        sustained = stored / max(1e-9, publish_s)
+    peak = max((b[1] - a[1]) / max(1e-9, b[0] - a[0]) for a, b in zip(samples, samples[1:])) if len(samples) > 1 else 0
+
+    if bridge:
+        # commit latencies of the last batch are written by the next flush
+        bridge.writer.kick()
+        bridge.writer.join()
+        report_bridge = {"ingest": bridge.ingest.stats(), "write_queue": bridge.writer.stats()}
+        bridge.stop()
+    if broker_proc:
+        broker_proc.terminate()
+        broker_proc.wait(5)
+    report = {
+        "run_id": args.run_id,
+        "started": started,
+        "config": {k: v for k, v in vars(args).items() if k not in ("json", "run_id")},
+        "sent": sent,
+        "publish_errors": sum(p.errors for p in pubs),
+        "publishes": sum(p.publishes for p in pubs),
+        "payload_bytes_per_reading": round(sum(p.payload_bytes for p in pubs) / sent, 1) if sent else None,
+        "offered_msgs_per_s": round(sent / publish_s, 1),
+        "stored": stored,
+        "stored_distinct": distinct,
+        "lost": max(0, sent - distinct),
+        "loss_pct": round(100.0 * max(0, sent - distinct) / sent, 3) if sent else 0.0,
+        "duplicates": stored - distinct,
+        "sustained_ingest_msgs_per_s": round(sustained, 1),
+        "peak_ingest_msgs_per_s": round(peak, 1),
+        "drain_s": round(drain_s, 2),
+        "latency_ms": probe.latency(),
+        "db_growth_bytes": db_size(args.db) - size_before,
+        "bytes_per_message": round((db_size(args.db) - size_before) / stored, 1) if stored else None,
+        "bridge": report_bridge if bridge else None,
+    }
+
+    print(f"[BENCH] sent {sent} ({report['offered_msgs_per_s']}/s), stored {distinct} distinct "
+          f"(+{report['duplicates']} dup), lost {report['lost']} ({report['loss_pct']}%)")
+    print(f"[BENCH] {args.format} payloads, {report['payload_bytes_per_reading']} B/reading on the wire, "
+          f"{report['publishes']} MQTT publishes")
+    print(f"[BENCH] sustained ingest {report['sustained_ingest_msgs_per_s']} msgs/s, "
+          f"peak {report['peak_ingest_msgs_per_s']}, drain {report['drain_s']}s")
+    for metric, s in report["latency_ms"].items():
+        qs = ", ".join(f"p{round(q * 100)} {s[f'p{round(q * 100)}_ms']} ms" for q in QUANTILES)
+        print(f"[BENCH] {metric}: {qs}, max {s['max_ms']} ms (n={s['count']})")
+    print(f"[BENCH] DB grew {report['db_growth_bytes'] / 1e6:.1f} MB ({report['bytes_per_message']} B/msg)")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    return 0 if sent else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
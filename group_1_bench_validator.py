@@ -0,0 +1,154 @@
+# group_1_bench_validator.py
+# Microbenchmark: the old exception-driven validation chain vs the compiled
+# validator in group_1_validator.py, on realistic payload mixes.
+#
+#   python group_1_bench_validator.py --n 200000
+#
+# Stages: "validate" times the checks alone on an already decoded dict (the
+# compiled validator also extracts the identity fields and builds a result);
+# "end2end" times the bridge's per-message path from the raw MQTT payload.
+# A second table compares the wire formats of group_1_codec on the realistic
+# mix: payload bytes and sniff + decode + validate time per message.
+import sys
+import json
+import time
+import random
+import argparse
+import statistics
+
+import group_1_codec as codec
+from group_1_util import MessagePackager
+from group_1_validator import validate_payload, validate_object
+
+# (name, {kind: share}) -- kinds: valid, SENSOR_FAULT, ERROR, NaN, None
+MIXES = [
+    ("clean", {"valid": 1.0}),
+    ("realistic", {"valid": 0.96, "SENSOR_FAULT": 0.01, "ERROR": 0.01, "NaN": 0.01, "None": 0.01}),
+    ("corrupt on", {"valid": 0.80, "SENSOR_FAULT": 0.05, "ERROR": 0.05, "NaN": 0.05, "None": 0.05}),
+    ("all faults", {"SENSOR_FAULT": 0.25, "ERROR": 0.25, "NaN": 0.25, "None": 0.25}),
+]
+
+_FAULT_VALUES = {"SENSOR_FAULT": "SENSOR_FAULT", "ERROR": "ERROR", "NaN": "NaN", "None": None}
+
+
+def legacy_validate(obj):
+    """The admin bridge's pre-validator chain (raise ValueError on every bad reading)."""
+    try:
+        device_id = obj.get("device_id")
+        location = obj.get("location")
+        packet_id = obj.get("packet_id", "N/A")
+        if not device_id:
+            raise ValueError("Missing device_id")
+        if "sensor_data" not in obj:
+            raise ValueError("Missing sensor_data")
+        sensor_data = obj["sensor_data"]
+        if not isinstance(sensor_data, dict):
+            raise ValueError("sensor_data should be an object")
+        if "value" not in sensor_data:
+            raise ValueError("Missing value in sensor_data")
+        value = sensor_data["value"]
+        if value == "SENSOR_FAULT":
+            raise ValueError("Sensor fault detected")
+        try:
+            return True, float(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid temperature value: {value}")
+    except Exception as e:
+        return False, str(e)
+
+
+def legacy_validate_bytes(payload):
+    # as the bridge did it: decode, parse, re-serialize for raw_data, then validate
+    try:
+        obj = json.loads(payload.decode())
+        json.dumps(obj)
+    except Exception as e:
+        return False, str(e)
+    return legacy_validate(obj)
+
+
+def make_payloads(mix, n, rng, fmt=codec.JSON):
+    packager = MessagePackager("dev001", "Library", fmt, location_every=30)
+    kinds, weights = zip(*mix.items())
+    out = []
+    for kind in rng.choices(kinds, weights, k=n):
+        value = round(rng.uniform(17, 22), 2) if kind == "valid" else _FAULT_VALUES[kind]
+        payload = packager.package(value)
+        out.append(payload.encode() if isinstance(payload, str) else payload)
+    return out
+
+
+def decode_validate(payload):
+    # the bridge's data path: pick the format from the first byte, decode, validate
+    return validate_object(codec.decode(payload, codec.sniff(payload)))
+
+
+def time_ns_per_msg(fn, items, repeat):
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for item in items:
+            fn(item)
+        samples.append((time.perf_counter() - t0) * 1e9 / len(items))
+    return statistics.median(samples)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark data-topic payload validation")
+    ap.add_argument("--n", type=int, default=200_000, help="payloads per mix (default: 200000)")
+    ap.add_argument("--repeat", type=int, default=5, help="runs per case, median is reported (default: 5)")
+    ap.add_argument("--seed", type=int, default=216)
+    ap.add_argument("--json", help="also write results to this JSON file")
+    args = ap.parse_args()
+    rng = random.Random(args.seed)
+
+    results = {}
+    print(f"{'mix':<11} {'stage':<9} {'legacy ns':>10} {'compiled ns':>12} {'speedup':>8}")
+    for name, mix in MIXES:
+        raw = make_payloads(mix, args.n, rng)
+        objs = [json.loads(p) for p in raw]
+
+        # the two must agree on every payload before timing means anything
+        for p in raw:
+            if legacy_validate_bytes(p)[0] != validate_payload(p).ok:
+                # NaN: the legacy chain accepted float("NaN") as a valid reading
+                if b'"NaN"' not in p:
+                    raise SystemExit(f"validators disagree on {p!r}")
+
+        row = {}
+        for stage, items, legacy, compiled in (
+            ("validate", objs, legacy_validate, validate_object),
+            ("end2end", raw, legacy_validate_bytes, validate_payload),
+        ):
+            a = time_ns_per_msg(legacy, items, args.repeat)
+            b = time_ns_per_msg(compiled, items, args.repeat)
+            row[stage] = {"legacy_ns": round(a, 1), "compiled_ns": round(b, 1)}
+            print(f"{name:<11} {stage:<9} {a:>10.1f} {b:>12.1f} {a / b:>7.2f}x")
+        results[name] = row
+
+    formats = {}
+    mix = dict(MIXES)["realistic"]
+    print(f"\n{'format':<9} {'bytes':>7} {'decode+validate ns':>19} {'vs json':>8}")
+    for fmt in codec.FORMATS:
+        if not codec.available(fmt):
+            print(f"{fmt:<9} (not installed)")
+            continue
+        raw = make_payloads(mix, args.n, random.Random(args.seed))
+        encoded = make_payloads(mix, args.n, random.Random(args.seed), fmt)
+        for a, b in zip(raw[:1000], encoded[:1000]):
+            if validate_payload(a).fields.get("value") != decode_validate(b).fields.get("value"):
+                raise SystemExit(f"{fmt} round trip differs on {a!r}")
+        size = sum(map(len, encoded)) / len(encoded)
+        ns = time_ns_per_msg(decode_validate, encoded, args.repeat)
+        formats[fmt] = {"bytes": round(size, 1), "decode_validate_ns": round(ns, 1)}
+        base = formats.get(codec.JSON, formats[fmt])
+        print(f"{fmt:<9} {size:>7.1f} {ns:>19.1f} {base['decode_validate_ns'] / ns:>7.2f}x")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"n": args.n, "repeat": args.repeat, "mixes": dict(MIXES), "results": results,
+                       "formats": formats}, f, indent=2)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
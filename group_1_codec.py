@@ -0,0 +1,288 @@
+# group_1_codec.py
+# Wire formats for the data topic (MessagePackager <-> admin bridge / subscriber):
+#   json    -- the original verbose object; the default, understood everywhere
+#   struct  -- fixed little-endian layout behind a version byte (~30 bytes a reading)
+#   msgpack -- the JSON object minus the redundant datetime/units/reading_type
+#              (needs the optional msgpack package)
+# The format is signalled with the MQTT v5 content-type property (and the
+# payload-format indicator: 1 = UTF-8 JSON, 0 = binary). Without it (MQTT 3.1.1,
+# replayed spill files) the first byte is enough: 0x01 is a struct v1 record,
+# 0x80-0x8f / 0xde / 0xdf a msgpack map, anything else is parsed as JSON.
+# Binary readings decode to the same dict shape as JSON, so validate_object()
+# is shared by every format.
+#
+# Batched messages (envelopes) hold several readings of one device:
+#   {"device_id", "location", "seq": [first, last], "readings": [[counter, timestamp, value], ...]}
+# in JSON / msgpack, and a struct record with version byte 0x02. expand() turns
+# an envelope back into ordinary readings (packet_id "<device_id>-<counter>").
+import json
+import struct
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+JSON = "json"
+STRUCT = "struct"
+MSGPACK = "msgpack"
+FORMATS = (JSON, STRUCT, MSGPACK)
+
+CONTENT_TYPES = {
+    JSON: "application/json",
+    STRUCT: "application/vnd.group1.reading.v1",
+    MSGPACK: "application/msgpack",
+}
+_BY_CONTENT_TYPE = {v: k for k, v in CONTENT_TYPES.items()}
+_BY_CONTENT_TYPE["application/x-msgpack"] = MSGPACK
+
+# ---- struct v1 layout ----
+# header: version, value kind, publish timestamp, packet counter, device_id length
+# then:   device_id, location length (0 = omitted) + location, value
+#         (float64 for a number, nothing for null, length + UTF-8 for a text marker)
+STRUCT_VERSION = 1
+_HEAD = struct.Struct("<BBdIB")
+_F64 = struct.Struct("<d")
+# ---- struct envelope v1 ----
+# header: version 2, first counter, reading count, device_id length
+# then:   device_id, location length + location,
+#         per reading: counter - first, timestamp, value kind, value (as above)
+ENVELOPE_VERSION = 2
+_ENV_HEAD = struct.Struct("<BIHB")
+_ENV_READING = struct.Struct("<HdB")
+_NUMBER, _NULL, _TEXT = 0, 1, 2
+_MSGPACK_MAP = frozenset(range(0x80, 0x90)) | {0xDE, 0xDF}
+
+
+def available(fmt: str) -> bool:
+    return fmt in (JSON, STRUCT) or (fmt == MSGPACK and msgpack is not None)
+
+
+def check_format(fmt: str) -> str:
+    """Returns fmt, or raises ValueError for an unknown or uninstalled format."""
+    if fmt not in FORMATS:
+        raise ValueError(f"unknown payload format {fmt!r} (expected one of {FORMATS})")
+    if not available(fmt):
+        raise ValueError(f"payload format {fmt!r} needs the msgpack package (pip install msgpack)")
+    return fmt
+
+
+def sniff(payload) -> str:
+    """Format of a payload from its first byte (see the module header)."""
+    if not payload or isinstance(payload, str):
+        return JSON
+    first = payload[0]
+    if first == STRUCT_VERSION or first == ENVELOPE_VERSION:
+        return STRUCT
+    if first in _MSGPACK_MAP:
+        return MSGPACK
+    return JSON
+
+
+def content_type_of(msg):
+    """MQTT v5 content-type of a paho message, or None."""
+    return getattr(getattr(msg, "properties", None), "ContentType", None)
+
+
+def payload_format(payload, content_type=None) -> str:
+    """The advertised format when the content type is one of ours, else sniff()."""
+    return _BY_CONTENT_TYPE.get(content_type) or sniff(payload)
+
+
+def publish_properties(fmt: str):
+    """MQTT v5 PUBLISH properties announcing fmt."""
+    from paho.mqtt.properties import Properties
+    from paho.mqtt.packettypes import PacketTypes
+    props = Properties(PacketTypes.PUBLISH)
+    props.ContentType = CONTENT_TYPES[fmt]
+    props.PayloadFormatIndicator = 1 if fmt == JSON else 0
+    return props
+
+
+# ------------------ Encode ------------------
+def encode_reading(fmt: str, device_id: str, counter: int, timestamp: float, value, location=None) -> bytes:
+    """One binary reading (struct or msgpack); location None leaves it out."""
+    if fmt == STRUCT:
+        return _encode_struct(device_id, counter, timestamp, value, location)
+    if fmt == MSGPACK:
+        obj = {"packet_id": f"{device_id}-{counter}", "timestamp": timestamp, "device_id": device_id}
+        if location is not None:
+            obj["location"] = location
+        obj["sensor_data"] = {"value": value}
+        return msgpack.packb(obj)
+    raise ValueError(f"not a binary payload format: {fmt!r}")
+
+
+def encode_envelope(fmt: str, device_id: str, readings, location=None):
+    """One batched message from [(counter, timestamp, value), ...]; str for json, bytes otherwise."""
+    if not readings:
+        raise ValueError("an envelope needs at least one reading")
+    if fmt == STRUCT:
+        return _encode_struct_envelope(device_id, readings, location)
+    obj = {"device_id": device_id}
+    if location is not None:
+        obj["location"] = location
+    obj["seq"] = [readings[0][0], readings[-1][0]]
+    obj["readings"] = [list(r) for r in readings]
+    if fmt == MSGPACK:
+        return msgpack.packb(obj)
+    if fmt == JSON:
+        return json.dumps(obj, separators=(",", ":"))
+    raise ValueError(f"unknown payload format {fmt!r}")
+
+
+def _value_tail(value):
+    """(value kind, encoded value) for the struct layouts."""
+    if value is None:
+        return _NULL, b""
+    if type(value) is float or type(value) is int:
+        return _NUMBER, _F64.pack(value)
+    # fault markers ("SENSOR_FAULT", "ERROR", "NaN") and anything else odd
+    text = (value if isinstance(value, str) else json.dumps(value)).encode()[:255]
+    return _TEXT, bytes((len(text),)) + text
+
+
+def _encode_struct(device_id, counter, timestamp, value, location):
+    dev = device_id.encode()
+    loc = location.encode()[:255] if location else b""
+    kind, tail = _value_tail(value)
+    return b"".join((_HEAD.pack(STRUCT_VERSION, kind, timestamp, counter & 0xFFFFFFFF, len(dev)),
+                     dev, bytes((len(loc),)), loc, tail))
+
+
+def _encode_struct_envelope(device_id, readings, location):
+    dev = device_id.encode()
+    loc = location.encode()[:255] if location else b""
+    first = readings[0][0]
+    if len(readings) > 0xFFFF or any(not 0 <= c - first <= 0xFFFF for c, _, _ in readings):
+        raise ValueError("struct envelope: too many readings or counters too far apart")
+    parts = [_ENV_HEAD.pack(ENVELOPE_VERSION, first & 0xFFFFFFFF, len(readings), len(dev)),
+             dev, bytes((len(loc),)), loc]
+    for counter, timestamp, value in readings:
+        kind, tail = _value_tail(value)
+        parts.append(_ENV_READING.pack(counter - first, timestamp, kind))
+        parts.append(tail)
+    return b"".join(parts)
+
+
+# ------------------ Decode ------------------
+def decode(payload, fmt: str = None):
+    """Decoded payload (a dict for well-formed readings); raises ValueError when malformed."""
+    fmt = fmt or sniff(payload)
+    if fmt == STRUCT:
+        if payload[:1] == b"\x02":
+            return _decode_struct_envelope(payload)
+        return _decode_struct(payload)
+    if fmt == MSGPACK:
+        if msgpack is None:
+            raise ValueError("msgpack payload but the msgpack package is not installed")
+        try:
+            return msgpack.unpackb(payload)
+        except Exception as e:
+            raise ValueError(f"msgpack decode error: {e}")
+    try:
+        return json.loads(payload)
+    except TypeError as e:
+        raise ValueError(str(e))
+
+
+def _decode_struct(buf):
+    try:
+        version, kind, timestamp, counter, dlen = _HEAD.unpack_from(buf, 0)
+        if version != STRUCT_VERSION:
+            raise ValueError(f"unsupported struct payload version {version}")
+        off = _HEAD.size + dlen
+        device_id = str(buf[_HEAD.size:off], "utf-8")
+        llen = buf[off]
+        off += 1
+        location = str(buf[off:off + llen], "utf-8") if llen else None
+        off += llen
+        if kind == _NUMBER:
+            value = _F64.unpack_from(buf, off)[0]
+            off += _F64.size
+        elif kind == _NULL:
+            value = None
+        elif kind == _TEXT:
+            n = buf[off]
+            value = str(buf[off + 1:off + 1 + n], "utf-8")
+            off += 1 + n
+        else:
+            raise ValueError(f"unknown struct value kind {kind}")
+    except (struct.error, IndexError):
+        raise ValueError(f"struct payload truncated ({len(buf)} bytes)")
+    if off != len(buf):
+        raise ValueError(f"struct payload length mismatch ({len(buf)} bytes, expected {off})")
+
+    obj = {"packet_id": f"{device_id}-{counter}", "timestamp": timestamp, "device_id": device_id}
+    if location is not None:
+        obj["location"] = location
+    obj["sensor_data"] = {"value": value}
+    return obj
+
+
+def _decode_struct_envelope(buf):
+    try:
+        version, first, count, dlen = _ENV_HEAD.unpack_from(buf, 0)
+        off = _ENV_HEAD.size + dlen
+        device_id = str(buf[_ENV_HEAD.size:off], "utf-8")
+        llen = buf[off]
+        off += 1
+        location = str(buf[off:off + llen], "utf-8") if llen else None
+        off += llen
+        readings = []
+        for _ in range(count):
+            delta, timestamp, kind = _ENV_READING.unpack_from(buf, off)
+            off += _ENV_READING.size
+            if kind == _NUMBER:
+                value = _F64.unpack_from(buf, off)[0]
+                off += _F64.size
+            elif kind == _NULL:
+                value = None
+            elif kind == _TEXT:
+                n = buf[off]
+                value = str(buf[off + 1:off + 1 + n], "utf-8")
+                off += 1 + n
+            else:
+                raise ValueError(f"unknown struct value kind {kind}")
+            readings.append([first + delta, timestamp, value])
+    except (struct.error, IndexError):
+        raise ValueError(f"struct envelope truncated ({len(buf)} bytes)")
+    if off != len(buf):
+        raise ValueError(f"struct envelope length mismatch ({len(buf)} bytes, expected {off})")
+    if not readings:
+        raise ValueError("struct envelope without readings")
+
+    obj = {"device_id": device_id}
+    if location is not None:
+        obj["location"] = location
+    obj["seq"] = [readings[0][0], readings[-1][0]]
+    obj["readings"] = readings
+    return obj
+
+
+# ------------------ Envelopes ------------------
+def is_envelope(obj) -> bool:
+    return type(obj) is dict and "readings" in obj
+
+
+def expand(envelope) -> list:
+    """The readings of a decoded envelope as ordinary reading dicts; ValueError when malformed."""
+    items = envelope.get("readings")
+    if type(items) is not list or not items:
+        raise ValueError("readings should be a non-empty list")
+    device_id = envelope.get("device_id")
+    location = envelope.get("location")
+    out = []
+    for item in items:
+        if type(item) is not list or len(item) != 3:
+            raise ValueError(f"malformed reading {item!r}")
+        counter, timestamp, value = item
+        reading = {"packet_id": f"{device_id}-{counter}", "timestamp": timestamp, "device_id": device_id}
+        if location is not None:
+            reading["location"] = location
+        reading["sensor_data"] = {"value": value}
+        out.append(reading)
+    seq = envelope.get("seq")
+    if seq is not None and list(seq) != [items[0][0], items[-1][0]]:
+        raise ValueError(f"seq {seq!r} does not match the readings")
+    return out
@@ -1,11 +1,47 @@
 import math
 import random
-from random import uniform, choice
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+CORRUPT_MARKERS = ("SENSOR_FAULT", "ERROR", None, "NaN")
+# below this many samples the scalar loop is cheaper than the NumPy call overhead
+NUMPY_MIN_BLOCK = 64
+
+
+def _numpy_rng(source=random):
+    # seeded from the Python RNG, so a seeded generator's block paths are reproducible too
+    return np.random.default_rng(source.getrandbits(64))
+
+
+def _inject(out, roll, corrupt_p, wild_p, rng):
+    """
+    Wild / corrupt injection for a block, as in get_value(): with one roll per sample,
+    corrupt when roll < corrupt_p, else wild when roll < corrupt_p + wild_p (0 = disabled).
+    Returns out (a list) with the injected samples replaced.
+    """
+    corrupt = np.flatnonzero(roll < corrupt_p)
+    wild = np.flatnonzero((roll >= corrupt_p) & (roll < corrupt_p + wild_p))
+    if wild.size:
+        # choice([uniform(-50, -1), uniform(51, 100)]), rounded
+        hot = rng.random(wild.size) < 0.5
+        spikes = np.round(np.where(hot, rng.uniform(51, 100, wild.size), rng.uniform(-50, -1, wild.size)), 2)
+        for i, v in zip(wild.tolist(), spikes.tolist()):
+            out[i] = v
+    if corrupt.size:
+        for i, k in zip(corrupt.tolist(), rng.integers(0, len(CORRUPT_MARKERS), corrupt.size).tolist()):
+            out[i] = CORRUPT_MARKERS[k]
+    return out
+
 
 class DataGenerator:
     # simple signal generator with optional wild/corrupt injections
+    # seed: any random.Random seed for a private, repeatable RNG; None shares the `random` module
     def __init__(self, base=19.5, amplitude=2.5, frequency=0.08, noise=0.8,
-                 wild_rate=0.02, corrupt_rate=0.02):
+                 wild_rate=0.02, corrupt_rate=0.02, seed=None):
+        self.rng = random if seed is None else random.Random(seed)
         self.base = base
         self.amplitude = amplitude
         self.frequency = frequency
@@ -22,10 +58,13 @@ class DataGenerator:
         self.wild_rate = float(wild_rate)
         self.corrupt_rate = float(corrupt_rate)
 
+        # NumPy generator for get_values(), created on first use (seeded from self.rng)
+        self._np_rng = None
+
     # compute base + sine + noise
     def _normalized_value(self):
         wave = self.amplitude * math.sin(self.frequency * self._x)
-        jitter = uniform(-self.noise, self.noise)
+        jitter = self.rng.uniform(-self.noise, self.noise)
         return round(self.base + wave + jitter, 2)
 
     # produce a value for the next tick
@@ -33,7 +72,7 @@ class DataGenerator:
         self._x += 1
 
         # corrupt takes precedence, then wild (only if enabled)
-        roll = random.random()
+        roll = self.rng.random()
         if self.allow_corrupt and roll < self.corrupt_rate:
             return self.get_corrupt_data()
         if self.allow_wild and roll < (self.corrupt_rate + self.wild_rate):
@@ -41,21 +80,36 @@ class DataGenerator:
 
         return self._normalized_value()
 
+    # produce the next n values at once: same distribution as n get_value() calls
+    def get_values(self, n: int) -> list:
+        if np is None or n < NUMPY_MIN_BLOCK:
+            return [self.get_value() for _ in range(n)]
+        if self._np_rng is None:
+            self._np_rng = _numpy_rng(self.rng)
+        rng = self._np_rng
+        x = np.arange(self._x + 1, self._x + n + 1, dtype=np.float64)
+        self._x += n
+
+        wave = self.amplitude * np.sin(self.frequency * x)
+        jitter = rng.uniform(-self.noise, self.noise, n)
+        out = np.round(self.base + wave + jitter, 2).tolist()
+        if self.allow_corrupt or self.allow_wild:
+            corrupt_p = self.corrupt_rate if self.allow_corrupt else 0.0
+            # get_value() compares the same roll against corrupt + wild
+            wild_p = (self.corrupt_rate + self.wild_rate - corrupt_p) if self.allow_wild else 0.0
+            _inject(out, rng.random(n), corrupt_p, wild_p, rng)
+        return out
+
     # unrealistic spikes far outside normal range
     def get_wild_value(self):
-        return round(choice([
-            uniform(-50, -1),   # too cold
-            uniform(51, 100),   # too hot
+        return round(self.rng.choice([
+            self.rng.uniform(-50, -1),   # too cold
+            self.rng.uniform(51, 100),   # too hot
         ]), 2)
 
     # intentionally invalid/erroneous payloads
     def get_corrupt_data(self):
-        return choice([
-            "SENSOR_FAULT",
-            "ERROR",
-            None,
-            "NaN"
-        ])
+        return self.rng.choice(CORRUPT_MARKERS)
 
     # toggle wild injection
     def set_wild_enabled(self, status: bool):
@@ -84,3 +138,56 @@ class DataGenerator:
             self.noise = noise
 
 
+class DataGeneratorBank:
+    """
+    Many simulated sensors as NumPy arrays (one slot per device), for the fleet engine:
+    - values(slots) returns the next sample of each listed slot and advances only those
+    - Same signal, noise and wild/corrupt model as DataGenerator.get_value()
+    - Without NumPy it holds one DataGenerator per slot and loops (same API)
+    - seed makes the whole bank repeatable (None draws one from `random`)
+    """
+    def __init__(self, size: int, base=19.5, amplitude=2.5, frequency=0.08, noise=0.8,
+                 wild_rate=0.0, corrupt_rate=0.0, seed=None):
+        self.size = size
+        self.wild_rate = float(wild_rate)
+        self.corrupt_rate = float(corrupt_rate)
+        source = random if seed is None else random.Random(seed)
+        if np is None:
+            self._gens = [DataGenerator(base, amplitude, frequency, noise, wild_rate, corrupt_rate,
+                                        seed=source.getrandbits(64))
+                          for _ in range(size)]
+            for g in self._gens:
+                g.set_wild_enabled(wild_rate > 0)
+                g.set_corrupt_enabled(corrupt_rate > 0)
+            return
+        self._gens = None
+        self.base = np.full(size, float(base))
+        self.amplitude = np.full(size, float(amplitude))
+        self.frequency = np.full(size, float(frequency))
+        self.noise = np.full(size, float(noise))
+        self._x = np.zeros(size, dtype=np.int64)
+        self._rng = _numpy_rng(source)
+
+    def set_parameters(self, slot: int, base=None, amplitude=None, frequency=None, noise=None):
+        if self._gens is not None:
+            self._gens[slot].update_parameters(base, amplitude, frequency, noise)
+            return
+        for name, v in (("base", base), ("amplitude", amplitude), ("frequency", frequency), ("noise", noise)):
+            if v is not None:
+                getattr(self, name)[slot] = v
+
+    def values(self, slots) -> list:
+        if self._gens is not None:
+            return [self._gens[i].get_value() for i in slots]
+        idx = np.asarray(slots, dtype=np.intp)
+        n = idx.size
+        if not n:
+            return []
+        self._x[idx] += 1
+        rng = self._rng
+        noise = self.noise[idx]
+        wave = self.amplitude[idx] * np.sin(self.frequency[idx] * self._x[idx])
+        out = np.round(self.base[idx] + wave + rng.uniform(-1.0, 1.0, n) * noise, 2).tolist()
+        if self.corrupt_rate or self.wild_rate:
+            _inject(out, rng.random(n), self.corrupt_rate, self.wild_rate, rng)
+        return out
@@ -0,0 +1,201 @@
+# group_1_db_pool.py
+import os
+import time
+import sqlite3
+import threading
+from urllib.parse import quote
+from contextlib import contextmanager
+
+# applied once, when a connection is opened (not on every checkout)
+COMMON_PRAGMAS = (
+    "PRAGMA busy_timeout=15000;",
+    "PRAGMA foreign_keys=ON;",
+    "PRAGMA temp_store=MEMORY;",
+    "PRAGMA cache_size=-16000;",
+)
+WRITER_PRAGMAS = (
+    "PRAGMA journal_mode=WAL;",
+    "PRAGMA synchronous=NORMAL;",
+)
+
+
+class PooledConnection:
+    """
+    Thin proxy around a pooled sqlite3 connection.
+    close() hands the connection back to the pool instead of closing it,
+    so existing `conn = get_db_connection() ... conn.close()` call sites keep working.
+    """
+    __slots__ = ("_pool", "_slot", "_conn", "_released")
+
+    def __init__(self, pool, slot):
+        self._pool = pool
+        self._slot = slot
+        self._conn = slot["conn"]
+        self._released = False
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        if not self._released:
+            self._released = True
+            self._pool._release(self._slot)
+
+
+class ConnectionPool:
+    """
+    Long-lived SQLite connections shared by the admin server and its MQTT bridge:
+    - Separate read-only and read-write connections (readers never take the write lock)
+    - PRAGMAs run once per connection, not per checkout
+    - A thread that already holds a connection gets the same one back (nested use is free)
+    - Idle connections are kept for the next thread instead of being closed
+    - hit/miss/wait counters for profiling
+    """
+    def __init__(self, db_path: str, max_readers: int = 8, max_writers: int = 4, timeout: float = 15.0):
+        self.db_path = db_path
+        self.timeout = float(timeout)
+        self._limits = {True: max(1, int(max_readers)), False: max(1, int(max_writers))}
+        self._idle = {True: [], False: []}
+        self._open = {True: 0, False: 0}
+        self._cond = threading.Condition()
+        self._local = threading.local()
+
+        self.hits = 0
+        self.misses = 0
+        self.waits = 0
+        self.wait_ms = 0.0
+
+    # ------------------ Public API ------------------
+    def acquire(self, readonly: bool = False) -> PooledConnection:
+        readonly = bool(readonly)
+        held = self._held()
+        slot = held.get(readonly)
+        if slot is not None:
+            slot["depth"] += 1
+            with self._cond:
+                self.hits += 1
+            return PooledConnection(self, slot)
+
+        with self._cond:
+            if self._idle[readonly]:
+                self.hits += 1
+                slot = self._idle[readonly].pop()
+            elif self._open[readonly] < self._limits[readonly]:
+                self.misses += 1
+                self._open[readonly] += 1
+            else:
+                self.waits += 1
+                started = time.perf_counter()
+                while not self._idle[readonly]:
+                    if not self._cond.wait(self.timeout):
+                        raise sqlite3.OperationalError("timed out waiting for a pooled connection")
+                self.wait_ms += (time.perf_counter() - started) * 1000.0
+                slot = self._idle[readonly].pop()
+
+        if slot is None:
+            try:
+                slot = {"conn": self._open_connection(readonly), "readonly": readonly}
+            except Exception:
+                with self._cond:
+                    self._open[readonly] -= 1
+                    self._cond.notify()
+                raise
+
+        slot["depth"] = 1
+        slot["held"] = held
+        held[readonly] = slot
+        return PooledConnection(self, slot)
+
+    @contextmanager
+    def connection(self, readonly: bool = False):
+        conn = self.acquire(readonly)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def close_all(self):
+        """Close idle connections (checked-out ones are closed when returned)."""
+        with self._cond:
+            for readonly in (True, False):
+                for slot in self._idle[readonly]:
+                    slot["conn"].close()
+                    self._open[readonly] -= 1
+                self._idle[readonly] = []
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "waits": self.waits,
+                "wait_ms": round(self.wait_ms, 3),
+                "open_readers": self._open[True],
+                "open_writers": self._open[False],
+                "idle_readers": len(self._idle[True]),
+                "idle_writers": len(self._idle[False]),
+            }
+
+    # ------------------ Internal ------------------
+    def _held(self) -> dict:
+        held = getattr(self._local, "held", None)
+        if held is None:
+            held = self._local.held = {}
+        return held
+
+    def _open_connection(self, readonly: bool):
+        conn = None
+        if readonly and os.path.exists(self.db_path):
+            uri = f"file:{quote(os.path.abspath(self.db_path))}?mode=ro"
+            try:
+                conn = sqlite3.connect(uri, uri=True, timeout=self.timeout,
+                                       isolation_level=None, check_same_thread=False)
+            except sqlite3.OperationalError:
+                conn = None
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=self.timeout,
+                                   isolation_level=None, check_same_thread=False)
+            if not readonly:
+                for pragma in WRITER_PRAGMAS:
+                    conn.execute(pragma)
+        for pragma in COMMON_PRAGMAS:
+            conn.execute(pragma)
+        if readonly:
+            conn.execute("PRAGMA query_only=ON;")
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _release(self, slot):
+        slot["depth"] -= 1
+        if slot["depth"] > 0:
+            return
+        slot.pop("held").pop(slot["readonly"], None)
+        conn = slot["conn"]
+        if conn.in_transaction:
+            try:
+                conn.rollback()
+            except sqlite3.Error:
+                pass
+        with self._cond:
+            self._idle[slot["readonly"]].append(slot)
+            self._cond.notify()
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_path: str, **kwargs) -> ConnectionPool:
+    """Process-wide pool per database file; the first caller's settings win."""
+    key = os.path.abspath(db_path)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = ConnectionPool(db_path, **kwargs)
+        return pool
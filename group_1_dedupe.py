@@ -0,0 +1,125 @@
+# group_1_dedupe.py
+# Per-device duplicate suppression for the data topic. QoS 1 redeliveries
+# (broker retries, publisher reconnects) carry the same packet_id
+# "<device_id>-<counter>"; each device keeps a sliding bitmap of the last
+# `window` counters it has seen, so a repeat is recognised with a shift and a
+# bit test before anything is written.
+import math
+import threading
+from group_1_util import extract_seq
+
+# check() outcomes
+NEW = "NEW"             # first time seen: store it
+DUPLICATE = "DUPLICATE" # already seen in the window: drop it
+EPOCH = "EPOCH"         # publisher restarted (counter went back, timestamp moved on): new window
+TOO_OLD = "TOO_OLD"     # older than the window, cannot be checked: stored
+NO_SEQ = "NO_SEQ"       # no parseable counter: stored
+
+
+class _Window:
+    __slots__ = ("highest", "bits", "last_ts", "epoch", "duplicates")
+
+    def __init__(self, seq, ts):
+        self.highest = seq
+        self.bits = 1  # bit i set = counter (highest - i) already seen
+        self.last_ts = ts
+        self.epoch = 0
+        self.duplicates = 0
+
+
+class SeqDeduper:
+    """
+    Sliding-window duplicate filter keyed by device:
+    - O(1) per message: the window is one integer bitmap
+    - Counters may arrive out of order within the window
+    - A publisher restart resets its counter to 1. A counter that goes back while
+      the payload timestamp moves past the newest one seen starts a new epoch
+      (a redelivery always carries its original, older timestamp)
+    - Only timestamps within max_skew seconds of the arrival time count: one
+      far-future reading must not hide every later restart
+    - State is in memory only; after an admin restart the first redelivery of
+      an already stored message is not caught
+    """
+    def __init__(self, window: int = 1024, max_skew: float = 86400.0):
+        self.window = max(8, int(window))
+        self.max_skew = float(max_skew)
+        self._mask = (1 << self.window) - 1
+        self._lock = threading.Lock()
+        self._devices = {}
+        self.counts = dict.fromkeys((NEW, DUPLICATE, EPOCH, TOO_OLD, NO_SEQ), 0)
+
+    def check(self, device_id, packet_id, ts=None, received=None) -> str:
+        """
+        Classify one message and record it; only DUPLICATE should be dropped.
+        received: arrival time, bounds how far the payload timestamp may be trusted.
+        """
+        ts = self._trusted_ts(ts, received)
+        seq = extract_seq(packet_id)
+        if seq is None or not device_id:
+            return self._count(NO_SEQ)
+        with self._lock:
+            w = self._devices.get(device_id)
+            if w is None:
+                self._devices[device_id] = _Window(seq, ts)
+                self.counts[NEW] += 1
+                return NEW
+
+            newer_ts = ts is not None and w.last_ts is not None and ts > w.last_ts
+            if ts is not None and (w.last_ts is None or ts > w.last_ts):
+                w.last_ts = ts
+
+            if seq > w.highest:
+                shift = seq - w.highest
+                w.bits = ((w.bits << shift) | 1) & self._mask if shift < self.window else 1
+                w.highest = seq
+                self.counts[NEW] += 1
+                return NEW
+
+            if newer_ts:
+                # counter went back but the reading is newer than anything seen: restart
+                w.highest, w.bits = seq, 1
+                w.epoch += 1
+                self.counts[EPOCH] += 1
+                return EPOCH
+
+            offset = w.highest - seq
+            if offset >= self.window:
+                self.counts[TOO_OLD] += 1
+                return TOO_OLD
+            bit = 1 << offset
+            if w.bits & bit:
+                w.duplicates += 1
+                self.counts[DUPLICATE] += 1
+                return DUPLICATE
+            w.bits |= bit
+            self.counts[NEW] += 1
+            return NEW
+
+    def forget(self, device_id):
+        with self._lock:
+            self._devices.pop(device_id, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            per_device = {d: {"highest": w.highest, "epoch": w.epoch, "duplicates": w.duplicates}
+                          for d, w in self._devices.items()}
+            return {
+                "window": self.window,
+                "devices": len(self._devices),
+                "dropped": self.counts[DUPLICATE],
+                "counts": dict(self.counts),
+                "per_device": per_device,
+            }
+
+    # ------------------ Internal ------------------
+    def _trusted_ts(self, ts, received):
+        if type(ts) not in (float, int) or not math.isfinite(ts):
+            return None
+        if received is not None and abs(ts - received) > self.max_skew:
+            return None
+        return ts
+
+    def _count(self, outcome):
+        with self._lock:
+            self.counts[outcome] += 1
+        return outcome
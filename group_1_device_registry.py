@@ -0,0 +1,179 @@
+# group_1_device_registry.py
+import json
+import math
+import time
+import threading
+
+# Two write-backs, one per kind of update, so several processes that each see part of
+# the traffic (shared-subscription ingest workers) never overwrite each other's columns
+# or move a device back in time.
+_UPSERT_STATUS = '''
+    INSERT INTO devices (device_id, location, status, last_updated)
+    VALUES (?, ?, ?, ?)
+    ON CONFLICT(device_id) DO UPDATE SET
+        location = COALESCE(excluded.location, devices.location),
+        status = excluded.status,
+        last_updated = excluded.last_updated
+    WHERE excluded.last_updated >= COALESCE(devices.last_updated, 0)
+'''
+
+_UPSERT_READING = '''
+    INSERT INTO devices (device_id, location, last_value, last_seen, msg_rate)
+    VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT(device_id) DO UPDATE SET
+        location = COALESCE(excluded.location, devices.location),
+        last_value = COALESCE(excluded.last_value, devices.last_value),
+        last_seen = excluded.last_seen,
+        msg_rate = excluded.msg_rate
+    WHERE excluded.last_seen >= COALESCE(devices.last_seen, 0)
+'''
+
+# messages per second from the last few minutes of rollups (what refresh() reports)
+_RATES = '''
+    SELECT device_id, SUM(count) FROM rollup_1m
+    WHERE bucket_ts >= ?
+    GROUP BY device_id
+'''
+
+_COLUMNS = ("device_id", "location", "status", "last_updated", "last_value", "last_seen", "msg_rate")
+
+
+class DeviceRegistry:
+    """
+    Authoritative in-memory device table for the admin bridge:
+    - Updated on every status and data message (status, location, last value, last seen)
+    - Message rate is an exponentially decayed counter (messages/second, time constant rate_tau_s)
+    - Readers get a snapshot plus a version number (used as the HTTP ETag), never touching SQLite
+    - Changed devices are written back to SQLite from the write-behind queue's flush hook
+    - With shared-subscription ingest workers the API process calls refresh() instead
+    """
+    def __init__(self, rate_tau_s: float = 60.0):
+        self.rate_tau = max(1.0, float(rate_tau_s))
+        self.boot = str(int(time.time()))
+        self._lock = threading.Lock()
+        self._devices = {}
+        self._dirty_status = set()
+        self._dirty_reading = set()
+        self.version = 0
+        self._cached = None  # (version, json text)
+
+    # ------------------ Load / write-back ------------------
+    def load(self, conn):
+        """Seed from the devices table (once, at startup)."""
+        rows = conn.execute(f"SELECT {', '.join(_COLUMNS)} FROM devices").fetchall()
+        with self._lock:
+            for r in rows:
+                rec = dict(zip(_COLUMNS, r))
+                rec["msg_rate"] = rec["msg_rate"] or 0.0
+                self._devices[rec["device_id"]] = rec
+            self.version += 1
+
+    def refresh(self, conn, rate_window_s: float = 300):
+        """Re-read the devices table written by other processes; bumps the version only on change."""
+        rows = conn.execute(f"SELECT {', '.join(_COLUMNS)} FROM devices").fetchall()
+        since = time.time() - rate_window_s
+        # the newest minute is still filling up, so average over whole minutes plus the partial one
+        span = max(60.0, time.time() - (since - since % 60))
+        rates = {d: n / span for d, n in conn.execute(_RATES, (since - since % 60,)).fetchall()}
+        with self._lock:
+            changed = False
+            for r in rows:
+                rec = dict(zip(_COLUMNS, r))
+                rec["msg_rate"] = rates.get(rec["device_id"], 0.0)
+                if self._devices.get(rec["device_id"]) != rec:
+                    self._devices[rec["device_id"]] = rec
+                    changed = True
+            if changed:
+                self.version += 1
+        return changed
+
+    def flush(self, conn):
+        """Upsert every device changed since the last flush (runs inside the writer's transaction)."""
+        with self._lock:
+            if not self._dirty_status and not self._dirty_reading:
+                return
+            status, self._dirty_status = self._dirty_status, set()
+            reading, self._dirty_reading = self._dirty_reading, set()
+            status_rows = [(d, self._devices[d]["location"], self._devices[d]["status"],
+                            self._devices[d]["last_updated"]) for d in status]
+            reading_rows = [(d, self._devices[d]["location"], self._devices[d]["last_value"],
+                             self._devices[d]["last_seen"], self._devices[d]["msg_rate"]) for d in reading]
+        try:
+            conn.executemany(_UPSERT_STATUS, status_rows)
+            conn.executemany(_UPSERT_READING, reading_rows)
+        except Exception:
+            with self._lock:
+                self._dirty_status |= status
+                self._dirty_reading |= reading
+            raise
+
+    # ------------------ Updates ------------------
+    def record_status(self, device_id, location, status, ts):
+        if not device_id:
+            return
+        with self._lock:
+            rec = self._get(device_id)
+            if location is not None:
+                rec["location"] = location
+            rec["status"] = status
+            rec["last_updated"] = ts
+            self._touch(device_id, self._dirty_status)
+
+    def record_message(self, device_id, location, value, ts):
+        if not device_id:
+            return
+        with self._lock:
+            rec = self._get(device_id)
+            if location is not None:
+                rec["location"] = location
+            if value is not None:
+                rec["last_value"] = value
+            prev = rec["last_seen"]
+            decay = math.exp(-max(0.0, ts - prev) / self.rate_tau) if prev else 0.0
+            rec["msg_rate"] = rec["msg_rate"] * decay + 1.0 / self.rate_tau
+            rec["last_seen"] = ts
+            self._touch(device_id, self._dirty_reading)
+
+    # ------------------ Reads ------------------
+    def snapshot(self) -> list:
+        """Copy of every device (msg_rate is as of last_seen, so the snapshot only changes with version)."""
+        with self._lock:
+            return [dict(rec, msg_rate=round(rec["msg_rate"], 4)) for rec in self._devices.values()]
+
+    def etag(self) -> str:
+        return f'"{self.boot}-{self.version}"'
+
+    def snapshot_json(self):
+        """(etag, JSON text); serialized at most once per version."""
+        with self._lock:
+            cached = self._cached
+            version = self.version
+        if cached is None or cached[0] != version:
+            cached = (version, json.dumps(self.snapshot()))
+            with self._lock:
+                self._cached = cached
+        return f'"{self.boot}-{cached[0]}"', cached[1]
+
+    def location(self, device_id):
+        """Last known location of a device, or None."""
+        with self._lock:
+            rec = self._devices.get(device_id)
+            return rec["location"] if rec else None
+
+    def __len__(self):
+        with self._lock:
+            return len(self._devices)
+
+    # ------------------ Internal ------------------
+    def _get(self, device_id):
+        rec = self._devices.get(device_id)
+        if rec is None:
+            rec = self._devices[device_id] = dict.fromkeys(_COLUMNS)
+            rec["device_id"] = device_id
+            rec["status"] = "online"
+            rec["msg_rate"] = 0.0
+        return rec
+
+    def _touch(self, device_id, dirty):
+        dirty.add(device_id)
+        self.version += 1
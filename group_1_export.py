@@ -0,0 +1,61 @@
+# group_1_export.py
+# Streaming exports of the partitioned tables: rows go from a SQLite cursor
+# to the HTTP response in chunks, so memory stays flat for any export size.
+import csv
+import io
+import json
+
+EXPORT_TABLES = ("messages", "anomalies", "service_logs")
+EXPORT_FORMATS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+
+def iter_chunks(pool, partitions, base, where="1=1", params=(), since=None, until=None, chunk_rows=1000):
+    """
+    Yields (columns, rows) chunks of `base` in (ts, id) order, oldest first.
+    Partitions are read one at a time; the pooled connection is held only
+    while the generator is alive and returned when it finishes or is closed.
+    """
+    conn = pool.acquire(readonly=True)
+    try:
+        empty = True
+        names = partitions.tables_for_range(conn, base, since, until)
+        for name in reversed(names):
+            cur = conn.execute(f"SELECT * FROM {name} WHERE {where} ORDER BY ts, id", params)
+            columns = [d[0] for d in cur.description]
+            while True:
+                rows = cur.fetchmany(chunk_rows)
+                if not rows:
+                    break
+                empty = False
+                yield columns, rows
+            cur.close()
+        if empty:
+            # nothing matched: still hand out the columns so CSV gets a header
+            cur = conn.execute(f"SELECT * FROM {base} LIMIT 0")
+            yield [d[0] for d in cur.description], []
+    finally:
+        conn.close()
+
+
+def csv_stream(chunks):
+    """CSV text per chunk, header taken from the first chunk."""
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    header_done = False
+    for cols, rows in chunks:
+        if not header_done:
+            writer.writerow(cols)
+            header_done = True
+        writer.writerows(tuple(r) for r in rows)
+        yield buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
+
+
+def ndjson_stream(chunks):
+    """One JSON object per line, one write per chunk."""
+    for cols, rows in chunks:
+        yield "".join(json.dumps(dict(zip(cols, r))) + "\n" for r in rows)
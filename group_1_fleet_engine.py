@@ -0,0 +1,482 @@
+# group_1_fleet_engine.py
+# Headless multi-device publisher: hundreds or thousands of simulated devices in
+# one process, each with its own DataGenerator + MessagePackager and the same
+# miss / blackout simulation and status messages as group_1_publisher.py, all
+# scheduled on one asyncio event loop over a small pool of MQTT connections
+# (paho sockets are driven by the loop, no network threads).
+#
+#   python group_1_fleet_engine.py --devices 1000 --connections 4 --duration 60
+#
+# Status per device (retained, like the Tk publisher): ONLINE when its
+# connection comes up, STOPPED when publishing stops, OFFLINE on a clean
+# shutdown. MQTT has one will per connection, so each connection's will is a
+# grouped status message that the admin bridge and subscriber expand per device:
+#   {"devices": {device_id: location, ...}, "status": "OFFLINE"}
+#
+# Publishes never wait for their PUBACK: each connection tracks its
+# unacknowledged messages (group_1_inflight) and a device's reading is shed
+# (counted as window_full) while the connection has fleet.max_inflight of them.
+import os
+import sys
+import json
+import time
+import heapq
+import random
+import signal
+import asyncio
+import argparse
+import threading
+import tracemalloc
+
+import paho.mqtt.client as mqtt
+
+import group_1_codec as codec
+from group_1_data_generator import DataGeneratorBank
+from group_1_inflight import InflightTracker
+from group_1_latency import LogSketch
+from group_1_util import MessagePackager
+
+
+def load_config(path="group_1_config.json"):
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except Exception as e:
+        print(f"[CONFIG] Failed to load {path}: {e}")
+        return {}
+
+
+class SimDevice:
+    """One simulated device: its generator slot, packager and blackout / batch state."""
+    __slots__ = ("device_id", "location", "slot", "packager", "conn", "blackout_remaining", "pending")
+
+    def __init__(self, device_id, location, slot, fmt=codec.JSON, location_every=0):
+        self.device_id = device_id
+        self.location = location
+        self.slot = slot  # index into the engine's DataGeneratorBank
+        self.packager = MessagePackager(device_id, location, fmt, location_every)
+        self.conn = None
+        self.blackout_remaining = 0
+        self.pending = None  # readings waiting for a batched message
+
+
+def measure_device_memory(n: int = 2000, **device_kwargs) -> float:
+    """Bytes allocated per SimDevice and its generator slot (tracemalloc), averaged over n devices."""
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    try:
+        DataGeneratorBank(1).values([0])  # one-off NumPy allocations are not per device
+        before = tracemalloc.get_traced_memory()[0]
+        bank = DataGeneratorBank(n)
+        devices = [SimDevice(f"mem{i:06d}", "Library", i, **device_kwargs) for i in range(n)]
+        used = tracemalloc.get_traced_memory()[0] - before
+        del devices, bank
+        return used / n
+    finally:
+        if started:
+            tracemalloc.stop()
+
+
+class _Connection:
+    """
+    One paho client whose socket is watched by the asyncio loop:
+    - loop_read / loop_write run when the socket is readable / writable, loop_misc once a second
+    - connect / reconnect (blocking TCP + DNS) run in the default executor
+    - Reconnects with exponential backoff while the engine is running
+    """
+    def __init__(self, engine, index, devices):
+        self.engine = engine
+        self.index = index
+        self.devices = devices
+        self.loop = engine.loop
+        self.connected = False
+        self.closing = False
+        self._misc_task = None
+        self._retries = 0
+        self.inflight = InflightTracker(engine.max_inflight, engine.ack_timeout)
+
+        proto = mqtt.MQTTv5 if engine.mqtt_version == 5 else mqtt.MQTTv311
+        self.client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2,
+                                  client_id=f"group1_fleet_{index}_{os.getpid()}", protocol=proto)
+        self.client.max_inflight_messages_set(engine.max_inflight)
+        self.client.max_queued_messages_set(0)
+        will = json.dumps({"devices": {d.device_id: d.location for d in devices}, "status": "OFFLINE"})
+        self.client.will_set(engine.status_topic, will, qos=1, retain=True)
+
+        self.client.on_connect = self._on_connect
+        self.client.on_disconnect = self._on_disconnect
+        self.client.on_publish = self._on_publish
+        self.client.on_socket_open = self._on_socket_open
+        self.client.on_socket_close = self._on_socket_close
+        self.client.on_socket_register_write = self._on_socket_register_write
+        self.client.on_socket_unregister_write = self._on_socket_unregister_write
+
+    # ------------------ Lifecycle ------------------
+    async def connect(self):
+        try:
+            await self.loop.run_in_executor(None, self.client.connect, self.engine.broker,
+                                            self.engine.port, self.engine.keepalive)
+        except OSError as e:
+            print(f"[FLEET] conn {self.index}: connect error: {e}")
+            self._schedule_reconnect()
+        if self._misc_task is None:
+            self._misc_task = self.loop.create_task(self._misc_loop())
+
+    async def close(self, status="OFFLINE"):
+        """Graceful shutdown: per-device status, wait for outstanding PUBACKs, DISCONNECT (no will)."""
+        if self.connected:
+            for d in self.devices:
+                self.publish_status(d, status)
+            deadline = time.monotonic() + 5
+            while (self.inflight.unacked or self.client.want_write()) and time.monotonic() < deadline:
+                await asyncio.sleep(0.05)
+        self.closing = True
+        self.client.disconnect()
+        # the DISCONNECT packet still has to be written by the loop
+        deadline = time.monotonic() + 2
+        while self.client.socket() is not None and time.monotonic() < deadline:
+            await asyncio.sleep(0.02)
+        if self._misc_task is not None:
+            self._misc_task.cancel()
+            self._misc_task = None
+
+    async def _misc_loop(self):
+        while not self.closing:
+            self.client.loop_misc()  # keepalive pings and timeouts
+            self.inflight.expire()
+            await asyncio.sleep(1)
+
+    def _schedule_reconnect(self):
+        if self.closing or not self.engine.running:
+            return
+        delay = min(30, 2 ** self._retries)
+        self._retries += 1
+        print(f"[FLEET] conn {self.index}: reconnecting in {delay}s")
+        self.loop.call_later(delay, lambda: self.loop.create_task(self._reconnect()))
+
+    async def _reconnect(self):
+        if self.closing or self.connected:
+            return
+        try:
+            await self.loop.run_in_executor(None, self.client.reconnect)
+        except OSError as e:
+            print(f"[FLEET] conn {self.index}: reconnect failed: {e}")
+            self._schedule_reconnect()
+
+    # ------------------ Publishing ------------------
+    def publish(self, payload, readings=1):
+        info = self.client.publish(self.engine.data_topic, payload, qos=self.engine.qos,
+                                   properties=self.engine.publish_props)
+        if info.rc == mqtt.MQTT_ERR_SUCCESS:
+            self.inflight.sent(info.mid, readings)
+            self.engine.counts["readings"] += readings
+            self.engine.counts["publishes"] += 1
+        else:
+            self.engine.counts["errors"] += 1
+
+    def publish_status(self, device, status):
+        payload = json.dumps({"device_id": device.device_id, "location": device.location, "status": status})
+        info = self.client.publish(self.engine.status_topic, payload, qos=1, retain=True)
+        if info.rc == mqtt.MQTT_ERR_SUCCESS:
+            self.inflight.sent(info.mid, 0)
+
+    # ------------------ paho callbacks (loop thread, or the executor during connect) ------------------
+    def _on_connect(self, client, userdata, flags, reason_code, properties=None):
+        if reason_code != 0:
+            print(f"[FLEET] conn {self.index}: connect failed rc={reason_code}")
+            return
+        self.connected = True
+        self._retries = 0
+        self._in_loop(self._announce)
+
+    def _announce(self):
+        for d in self.devices:
+            self.publish_status(d, "ONLINE" if self.engine.publishing else "STOPPED")
+        print(f"[FLEET] conn {self.index}: connected, {len(self.devices)} devices ONLINE")
+
+    def _on_publish(self, client, userdata, mid, reason_code=None, properties=None):
+        self.inflight.acked(mid)
+
+    def _on_disconnect(self, client, userdata, flags, reason_code, properties=None):
+        self.connected = False
+        if not self.closing:
+            print(f"[FLEET] conn {self.index}: disconnected rc={reason_code}")
+            self._in_loop(self._schedule_reconnect)
+
+    def _on_socket_open(self, client, userdata, sock):
+        self._in_loop(self.loop.add_reader, sock, client.loop_read)
+
+    def _on_socket_close(self, client, userdata, sock):
+        # called just before paho closes the socket: unregister now, not later
+        self._in_loop(self._unwatch, sock)
+
+    def _unwatch(self, sock):
+        self.loop.remove_reader(sock)
+        self.loop.remove_writer(sock)
+
+    def _on_socket_register_write(self, client, userdata, sock):
+        self._in_loop(self.loop.add_writer, sock, client.loop_write)
+
+    def _on_socket_unregister_write(self, client, userdata, sock):
+        self._in_loop(self.loop.remove_writer, sock)
+
+    def _in_loop(self, fn, *args):
+        if threading.get_ident() == self.engine.loop_thread:
+            fn(*args)
+        else:
+            self.loop.call_soon_threadsafe(fn, *args)
+
+
+class FleetEngine:
+    """
+    Simulated fleet on one event loop:
+    - Devices come from `device_ids` ({device_id: location}) or are generated ("<prefix>00001", ...)
+    - Devices are spread round-robin over `connections` MQTT clients
+    - One scheduler task keeps a heap of (next due time, device); start times are spread over one interval
+    - Same per-send simulation as TemperaturePublisher: single misses, blackouts of blackout_min..max sends
+    - Readings go out as single messages, or as envelopes of `batch` readings (group_1_codec)
+    """
+    def __init__(self, config: dict, device_ids: dict = None, count: int = None, prefix: str = "fleet",
+                 connections: int = None, seed: int = None):
+        self.cfg = config
+        mqtt_cfg = config.get("mqtt", {})
+        pub_cfg = config.get("publish", {})
+        fleet_cfg = config.get("fleet", {})
+        self.broker = os.environ.get("GROUP1_MQTT_BROKER") or mqtt_cfg.get("broker", "broker.hivemq.com")
+        self.port = int(os.environ.get("GROUP1_MQTT_PORT") or mqtt_cfg.get("port", 1883))
+        self.keepalive = mqtt_cfg.get("keepalive", 15)
+        self.qos = mqtt_cfg.get("qos", 1)
+        self.mqtt_version = mqtt_cfg.get("version", 5)
+        self.data_topic = mqtt_cfg.get("topics", {}).get("data", "group_1/temp")
+        self.status_topic = mqtt_cfg.get("topics", {}).get("status", "group_1/status")
+        self.max_inflight = fleet_cfg.get("max_inflight", 1000)
+        self.ack_timeout = pub_cfg.get("ack_timeout", 30)
+
+        self.interval = float(pub_cfg.get("interval", 2))
+        self.miss_rate = pub_cfg.get("miss_rate", 0.02)
+        blackout = pub_cfg.get("blackout", {})
+        self.blackout_chance = blackout.get("chance", 0.03)
+        self.blackout_min = blackout.get("min", 3)
+        self.blackout_max = blackout.get("max", 8)
+        self.fmt = codec.check_format(pub_cfg.get("format", codec.JSON))
+        self.batch = max(1, int(pub_cfg.get("batch", {}).get("max_readings", 1)))
+        self.publish_props = codec.publish_properties(self.fmt) if self.mqtt_version == 5 else None
+        self.rng = random.Random(seed)
+
+        if device_ids is None:
+            locations = list(config.get("devices", {}).values()) or ["Library"]
+            device_ids = {f"{prefix}{i:05d}": locations[i % len(locations)] for i in range(1, (count or 1) + 1)}
+        location_every = pub_cfg.get("location_every", 30)
+        self.devices = [SimDevice(d, loc, i, self.fmt, location_every)
+                        for i, (d, loc) in enumerate(device_ids.items())]
+        # one vectorised generator for the whole fleet (NumPy when installed); seeded runs repeat exactly
+        self.bank = DataGeneratorBank(len(self.devices), seed=seed)
+        # devices due within this window are sampled together
+        self.coalesce = min(0.002, self.interval / 4)
+
+        self.n_connections = max(1, min(int(connections or fleet_cfg.get("connections", 4)), len(self.devices)))
+        self.connections = []
+        self.loop = None
+        self.loop_thread = None
+        self.running = False
+        self.publishing = False
+        self._stop = None
+        self.counts = dict.fromkeys(("readings", "publishes", "errors", "missed", "blackouts",
+                                     "blackout_skips", "offline_skips", "window_full"), 0)
+
+    # ------------------ Public API ------------------
+    async def run(self, duration: float = None):
+        """Connect, publish until stop() (or `duration` seconds), then shut down cleanly."""
+        self.loop = asyncio.get_running_loop()
+        self.loop_thread = threading.get_ident()
+        self._stop = asyncio.Event()
+        self.running = self.publishing = True
+        for k in range(self.n_connections):
+            devices = self.devices[k::self.n_connections]
+            conn = _Connection(self, k, devices)
+            for d in devices:
+                d.conn = conn
+            self.connections.append(conn)
+        await asyncio.gather(*(c.connect() for c in self.connections))
+
+        scheduler = self.loop.create_task(self._schedule())
+        try:
+            if duration:
+                await asyncio.wait_for(self._stop.wait(), duration)
+            else:
+                await self._stop.wait()
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            self.publishing = False
+            scheduler.cancel()
+            self._flush_batches()
+            await asyncio.gather(*(c.close() for c in self.connections))
+            self.running = False
+
+    def stop(self):
+        """Thread-safe: end run()."""
+        if self.loop is not None and self._stop is not None:
+            self.loop.call_soon_threadsafe(self._stop.set)
+
+    def stats(self) -> dict:
+        latency = LogSketch()
+        for c in self.connections:
+            latency.merge(c.inflight.latency)
+        return dict(self.counts, devices=len(self.devices), connections=len(self.connections),
+                    connected=sum(c.connected for c in self.connections),
+                    acked=sum(c.inflight.counts["acked"] for c in self.connections),
+                    unacked=sum(c.inflight.unacked for c in self.connections),
+                    expired=sum(c.inflight.counts["expired"] for c in self.connections),
+                    ack_latency=latency.summary())
+
+    # ------------------ Internal ------------------
+    async def _schedule(self):
+        now = self.loop.time()
+        heap = [(now + self.rng.uniform(0, self.interval), i) for i in range(len(self.devices))]
+        heapq.heapify(heap)
+        while heap:
+            due, i = heap[0]
+            delay = due - self.loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+                continue
+            # everything due within the coalescing window, up to 256 devices, ticks together
+            horizon = self.loop.time() + self.coalesce
+            batch, seen = [], set()
+            while heap and heap[0][0] <= horizon and len(batch) < 256:
+                due, i = heap[0]
+                if i in seen:
+                    break  # a device that is far behind came round again: next batch
+                seen.add(i)
+                batch.append(self.devices[i])
+                heapq.heapreplace(heap, (due + self.interval, i))
+            self._tick(batch)
+            await asyncio.sleep(0)  # let socket I/O run between batches
+
+    def _tick(self, batch):
+        sampled = [d for d in batch if self._should_sample(d)]
+        for d, value in zip(sampled, self.bank.values([d.slot for d in sampled])):
+            self._emit(d, value)
+
+    def _should_sample(self, d: SimDevice) -> bool:
+        if not d.conn.connected:
+            self.counts["offline_skips"] += 1
+            return False
+        if d.blackout_remaining > 0:
+            d.blackout_remaining -= 1
+            self.counts["blackout_skips"] += 1
+            return False
+        if self.rng.random() < self.miss_rate:
+            self.counts["missed"] += 1
+            return False
+        if self.rng.random() < self.blackout_chance:
+            d.blackout_remaining = self.rng.randint(self.blackout_min, self.blackout_max)
+            self.counts["blackouts"] += 1
+            return False
+        return True
+
+    def _emit(self, d: SimDevice, value):
+        if not d.conn.inflight.has_room():
+            self.counts["window_full"] += 1
+            return
+        if self.batch == 1:
+            d.conn.publish(d.packager.package(value))
+            return
+        if d.pending is None:
+            d.pending = []
+        d.pending.append(d.packager.reading(value))
+        if len(d.pending) >= self.batch:
+            d.conn.publish(d.packager.package_batch(d.pending), len(d.pending))
+            d.pending = None
+
+    def _flush_batches(self):
+        for d in self.devices:
+            if d.pending and d.conn.connected:
+                d.conn.publish(d.packager.package_batch(d.pending), len(d.pending))
+            d.pending = None
+
+
+async def _main_async(engine, args):
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, engine.stop)
+        except (NotImplementedError, RuntimeError):
+            pass  # Windows: Ctrl+C raises KeyboardInterrupt instead
+
+    async def report():
+        last, last_t = 0, time.monotonic()
+        while True:
+            await asyncio.sleep(args.report_every)
+            s = engine.stats()
+            now = time.monotonic()
+            rate = (s["readings"] - last) / (now - last_t)
+            last, last_t = s["readings"], now
+            print(f"[FLEET] {s['connected']}/{s['connections']} connected, {s['readings']} readings "
+                  f"({rate:.0f}/s), {s['publishes']} publishes, {s['unacked']} unacked, "
+                  f"ack p99 {s['ack_latency']['p99_ms']} ms, {s['window_full']} shed, {s['errors']} errors")
+
+    reporter = loop.create_task(report())
+    started = time.monotonic()
+    try:
+        await engine.run(args.duration)
+    finally:
+        reporter.cancel()
+    return time.monotonic() - started
+
+
+def main():
+    cfg = load_config()
+    ap = argparse.ArgumentParser(description="Headless multi-device publisher (one process, one event loop)")
+    ap.add_argument("--devices", type=int, help="simulated devices (default: the devices in group_1_config.json)")
+    ap.add_argument("--prefix", default="fleet", help="device id prefix with --devices (default: fleet)")
+    ap.add_argument("--connections", type=int, help="MQTT connections (default: fleet.connections or 4)")
+    ap.add_argument("--interval", type=float, help="seconds between readings per device (default: publish.interval)")
+    ap.add_argument("--format", choices=codec.FORMATS, help="payload format (default: publish.format)")
+    ap.add_argument("--batch", type=int, help="readings per message (default: publish.batch.max_readings)")
+    ap.add_argument("--duration", type=float, help="seconds to run (default: until Ctrl+C)")
+    ap.add_argument("--report-every", type=float, default=10, help="progress line every N seconds (default: 10)")
+    ap.add_argument("--seed", type=int, default=None, help="seed the simulation and the signals (default: random)")
+    ap.add_argument("--json", help="write final stats (and memory per device) to this JSON file")
+    args = ap.parse_args()
+
+    pub = cfg.setdefault("publish", {})
+    if args.interval:
+        pub["interval"] = args.interval
+    if args.format:
+        pub["format"] = args.format
+    if args.batch:
+        pub.setdefault("batch", {})["max_readings"] = args.batch
+    try:
+        codec.check_format(pub.get("format", codec.JSON))
+    except ValueError as e:
+        raise SystemExit(f"[FLEET] {e}")
+
+    device_ids = None if args.devices else cfg.get("devices") or None
+    engine = FleetEngine(cfg, device_ids=device_ids, count=args.devices, prefix=args.prefix,
+                         connections=args.connections, seed=args.seed)
+    bytes_per_device = measure_device_memory(fmt=engine.fmt)
+    print(f"[FLEET] {len(engine.devices)} devices over {engine.n_connections} connections -> "
+          f"{engine.broker}:{engine.port}, every {engine.interval}s "
+          f"({engine.fmt}, batch {engine.batch}); ~{bytes_per_device:.0f} B per device")
+
+    try:
+        elapsed = asyncio.run(_main_async(engine, args))
+    except KeyboardInterrupt:
+        elapsed = None
+    s = engine.stats()
+    print(f"[FLEET] done: {s['readings']} readings in {s['publishes']} publishes, {s['errors']} errors, "
+          f"{s['missed']} missed, {s['blackouts']} blackouts, {s['acked']} acked "
+          f"(p50 {s['ack_latency']['p50_ms']} / p99 {s['ack_latency']['p99_ms']} ms), "
+          f"{s['unacked']} unacked, {s['window_full']} shed by the in-flight window")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(dict(s, elapsed_s=elapsed, bytes_per_device=round(bytes_per_device, 1)), f, indent=2)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
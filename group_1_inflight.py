@@ -0,0 +1,89 @@
+# group_1_inflight.py
+# Non-blocking publish bookkeeping for the data topic. Instead of
+# info.wait_for_publish() after every message, publishers record each
+# message id here and paho's on_publish callback (PUBACK for QoS 1, socket
+# write for QoS 0) closes it. A max-in-flight window bounds the unacknowledged
+# messages; publishers check has_room() and hold readings back when it is full.
+import time
+import threading
+
+from group_1_latency import LogSketch
+
+
+class InflightTracker:
+    """
+    Unacknowledged publishes of one MQTT client:
+    - sent(mid, readings) after every QoS > 0 client.publish() (status messages with
+      readings=0: they share paho's in-flight window); acked(mid) from on_publish
+    - has_room() is the window check and never waits on the network
+    - Ack latency (publish call -> on_publish) goes into a LogSketch (ms quantiles)
+    - expire() gives up on entries older than the ack timeout so a dead session does
+      not close the window for good (paho still re-sends them after a reconnect)
+    """
+    def __init__(self, window: int = 20, timeout: float = 30.0):
+        self.window = max(1, int(window))
+        self.timeout = float(timeout)
+        self._lock = threading.Lock()
+        self._pending = {}   # mid -> (monotonic send time, readings)
+        self._early = {}     # mid -> ack time, for acks that beat sent() (loop thread vs publisher thread)
+        self.latency = LogSketch()
+        self.counts = dict.fromkeys(("sent", "acked", "readings_acked", "expired", "late_acks"), 0)
+
+    # ------------------ Publisher side ------------------
+    def has_room(self) -> bool:
+        return len(self._pending) < self.window
+
+    def sent(self, mid: int, readings: int = 1):
+        now = time.monotonic()
+        with self._lock:
+            self.counts["sent"] += 1
+            acked_at = self._early.pop(mid, None)
+            if acked_at is None:
+                self._pending[mid] = (now, readings)
+            else:
+                self._ack(now, acked_at, readings)
+
+    def expire(self) -> list:
+        """Drop entries older than the timeout; returns their message ids."""
+        now = time.monotonic()
+        cutoff = now - self.timeout
+        with self._lock:
+            stale = [mid for mid, (t, _) in self._pending.items() if t < cutoff]
+            for mid in stale:
+                del self._pending[mid]
+            self.counts["expired"] += len(stale)
+            # an early ack is matched within microseconds; older ones belong to expired entries
+            for mid in [mid for mid, t in self._early.items() if t < now - 1.0]:
+                del self._early[mid]
+                self.counts["late_acks"] += 1
+        return stale
+
+    # ------------------ paho on_publish ------------------
+    def acked(self, mid: int):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._pending.pop(mid, None)
+            if entry is not None:
+                self._ack(entry[0], now, entry[1])
+            elif len(self._early) < self.window:
+                # either sent() has not run yet, or the entry already expired
+                self._early[mid] = now
+            else:
+                self.counts["late_acks"] += 1
+
+    def _ack(self, sent_at, acked_at, readings):
+        self.counts["acked"] += 1
+        self.counts["readings_acked"] += readings
+        self.latency.add(max(0.0, acked_at - sent_at) * 1000.0)
+
+    # ------------------ Reporting ------------------
+    @property
+    def unacked(self) -> int:
+        return len(self._pending)
+
+    def stats(self) -> dict:
+        with self._lock:
+            oldest = min((t for t, _ in self._pending.values()), default=None)
+            return dict(self.counts, unacked=len(self._pending), window=self.window,
+                        oldest_unacked_s=None if oldest is None else round(time.monotonic() - oldest, 3),
+                        ack_latency=self.latency.summary())
@@ -0,0 +1,258 @@
+# group_1_ingest_pool.py
+import os
+import time
+import queue
+import struct
+import threading
+
+POLICIES = ("block", "drop_oldest", "spill")
+
+_STOP = object()
+# spill record header: receive ts, qos, topic length, payload length
+_HEADER = struct.Struct("<dBHI")
+
+
+class SpillFile:
+    """
+    Append-only overflow file for the "spill" policy (FIFO, length-prefixed records).
+    The file is truncated whenever it has been fully drained. It is scratch space for
+    one process, not a durable queue: opening truncates it and close() deletes it, so
+    messages still spilled when the process stops are lost (the broker has already
+    acknowledged them). Every process needs its own path.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._f = open(path, "w+b")
+        self._read_pos = 0
+        self.pending = 0
+
+    def append(self, item):
+        ts, topic, qos, payload = item
+        t = topic.encode()
+        p = bytes(payload)
+        with self._lock:
+            self._f.seek(0, os.SEEK_END)
+            self._f.write(_HEADER.pack(ts, qos, len(t), len(p)) + t + p)
+            self.pending += 1
+
+    def pop_batch(self, n: int) -> list:
+        with self._lock:
+            if not self.pending:
+                return []
+            self._f.flush()
+            self._f.seek(self._read_pos)
+            items = []
+            while len(items) < n and self.pending:
+                ts, qos, tlen, plen = _HEADER.unpack(self._f.read(_HEADER.size))
+                topic = self._f.read(tlen).decode()
+                items.append((ts, topic, qos, self._f.read(plen)))
+                self.pending -= 1
+            self._read_pos = self._f.tell()
+            if not self.pending:
+                self._f.seek(0)
+                self._f.truncate()
+                self._read_pos = 0
+            return items
+
+    def close(self):
+        with self._lock:
+            self._f.close()
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+class IngestPool:
+    """
+    Bounded hand-off between the paho network thread and message processing:
+    - The MQTT callback only submits (ts, topic, qos, payload); a worker pool runs the handler
+    - Overflow policy is explicit:
+        block       -- wait up to block_timeout_s for room (back-pressure on the network thread), then drop
+        drop_oldest -- discard the oldest queued message to make room
+        spill       -- append to an on-disk spill file, fed back into the queue in order as room frees up
+    - Counters: dropped, late (queued longer than late_ms before processing), spilled, errors
+    """
+    def __init__(self, handler, workers: int = 2, max_size: int = 10000, policy: str = "spill",
+                 block_timeout_s: float = 5.0, late_ms: float = 2000, spill_path: str = None):
+        if policy not in POLICIES:
+            raise ValueError(f"unknown overflow policy {policy!r} (expected one of {POLICIES})")
+        if policy == "spill" and not spill_path:
+            raise ValueError("spill policy needs a spill_path")
+        self.handler = handler
+        self.workers = max(1, int(workers))
+        self.max_size = max(1, int(max_size))
+        self.policy = policy
+        self.block_timeout = float(block_timeout_s)
+        self.late_s = float(late_ms) / 1000.0
+        self.spill_path = spill_path
+
+        self._q = queue.Queue(maxsize=self.max_size)
+        self._threads = []
+        self._spill = None
+        self._spill_wake = threading.Event()
+        self._refilling = 0  # spilled messages taken from the file but not yet queued
+        self._order_lock = threading.Lock()
+        self._started = False
+        self._stopping = threading.Event()
+
+        self._stats_lock = threading.Lock()
+        self.submitted = 0
+        self.processed = 0
+        self.dropped = 0
+        self.late = 0
+        self.spilled = 0
+        self.errors = 0
+        self.max_lag_ms = 0.0
+
+    # ------------------ Public API ------------------
+    def start(self):
+        if self._started:
+            return
+        self._started = True
+        self._stopping.clear()
+        for i in range(self.workers):
+            t = threading.Thread(target=self._work, name=f"admin-ingest-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        if self.policy == "spill":
+            self._spill = SpillFile(self.spill_path)
+            t = threading.Thread(target=self._drain_spill, name="admin-ingest-spill", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def stop(self, timeout: float = 5.0):
+        """Process everything already accepted (including spilled messages), then stop."""
+        if not self._started:
+            return
+        self.join(timeout)
+        self._stopping.set()
+        self._spill_wake.set()
+        for _ in range(self.workers):
+            self._q.put(_STOP)
+        for t in self._threads:
+            t.join(timeout)
+        self._threads = []
+        if self._spill:
+            self._spill.close()
+            self._spill = None
+        self._started = False
+
+    def submit(self, item):
+        """Called from the MQTT network thread; never runs the handler itself."""
+        with self._stats_lock:
+            self.submitted += 1
+
+        if self.policy == "spill":
+            # once anything is spilled, keep FIFO order by spilling until it drains
+            with self._order_lock:
+                if not self._spill_backlog():
+                    try:
+                        self._q.put_nowait(item)
+                        return
+                    except queue.Full:
+                        pass
+                self._to_spill(item)
+            return
+
+        if self.policy == "drop_oldest":
+            while True:
+                try:
+                    self._q.put_nowait(item)
+                    return
+                except queue.Full:
+                    try:
+                        self._q.get_nowait()
+                        self._q.task_done()
+                        self._count("dropped")
+                    except queue.Empty:
+                        pass
+
+        # block
+        try:
+            self._q.put(item, timeout=self.block_timeout)
+        except queue.Full:
+            self._count("dropped")
+
+    def join(self, timeout: float = None):
+        """Wait until every accepted message has been handled (spilled ones too)."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            if not self._spill_backlog():
+                self._q.join()
+                if not self._spill_backlog():
+                    return
+            if deadline is not None and time.monotonic() > deadline:
+                return
+            time.sleep(0.01)
+
+    def depth(self) -> int:
+        return self._q.qsize()
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return {
+                "policy": self.policy,
+                "workers": self.workers,
+                "queue_depth": self._q.qsize(),
+                "queue_max": self.max_size,
+                "submitted": self.submitted,
+                "processed": self.processed,
+                "dropped": self.dropped,
+                "late": self.late,
+                "late_ms": self.late_s * 1000.0,
+                "spilled": self.spilled,
+                "spill_pending": self._spill.pending if self._spill else 0,
+                "errors": self.errors,
+                "max_lag_ms": round(self.max_lag_ms, 3),
+            }
+
+    # ------------------ Internal ------------------
+    def _count(self, name, n=1):
+        with self._stats_lock:
+            setattr(self, name, getattr(self, name) + n)
+
+    def _spill_backlog(self) -> int:
+        return (self._spill.pending if self._spill else 0) + self._refilling
+
+    def _to_spill(self, item):
+        self._spill.append(item)
+        self._count("spilled")
+        self._spill_wake.set()
+
+    def _work(self):
+        while True:
+            item = self._q.get()
+            if item is _STOP:
+                self._q.task_done()
+                return
+            try:
+                lag = time.time() - item[0]
+                self.handler(*item)
+                with self._stats_lock:
+                    self.processed += 1
+                    if lag > self.late_s:
+                        self.late += 1
+                    if lag * 1000.0 > self.max_lag_ms:
+                        self.max_lag_ms = lag * 1000.0
+            except Exception as e:
+                self._count("errors")
+                print(f"[ADMIN] Ingest worker error: {e}")
+            finally:
+                self._q.task_done()
+
+    def _drain_spill(self):
+        # moves spilled messages back into the queue (blocking here is fine: not the network thread)
+        while not self._stopping.is_set():
+            self._spill_wake.wait(0.5)
+            self._spill_wake.clear()
+            while not self._stopping.is_set():
+                with self._order_lock:
+                    batch = self._spill.pop_batch(256)
+                    self._refilling = len(batch)
+                if not batch:
+                    break
+                for item in batch:
+                    self._q.put(item)
+                    self._refilling -= 1
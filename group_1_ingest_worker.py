@@ -0,0 +1,64 @@
+# group_1_ingest_worker.py
+# One shared-subscription ingest process: subscribes through
+# $share/<group>/<topic>, so the broker splits the data/status traffic across
+# all workers in the group, and writes what it receives into the admin database
+# (its own write-behind queue and connections; SQLite WAL serializes the commits).
+#
+#   python group_1_ingest_worker.py --index 0
+#
+# Normally started by group_1_run_ingest_workers.py. Needs an MQTT v5 broker
+# (shared subscriptions); the Flask server keeps serving the same database.
+import os
+import sys
+import json
+import time
+import signal
+import argparse
+import threading
+
+from group_1_db_pool import get_pool
+from group_1_migrations import migrate
+from group_1_admin_mqtt import AdminMQTT
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Run one shared-subscription ingest worker")
+    ap.add_argument("--index", type=int, default=0, help="worker number, used in the client id (default: 0)")
+    ap.add_argument("--config", default="group_1_config.json")
+    args = ap.parse_args()
+
+    with open(args.config) as f:
+        cfg = json.load(f)
+    if int(cfg.get("mqtt", {}).get("version", 5)) != 5:
+        print("[INGEST] Shared subscriptions need MQTT v5; forcing protocol version 5")
+        cfg["mqtt"]["version"] = 5
+
+    db_path = cfg["admin"]["db_path"]
+    pool_cfg = cfg["admin"].get("db_pool", {})
+    pool = get_pool(db_path, max_readers=pool_cfg.get("max_readers", 8),
+                    max_writers=pool_cfg.get("max_writers", 4))
+    with pool.connection() as conn:
+        migrate(conn)
+
+    # unique per process: the broker drops an older session that reuses a client id
+    client_id = f"group1_ingest_{args.index}_{os.getpid()}"
+    bridge = AdminMQTT(cfg, mode="ingest", client_id=client_id)
+
+    done = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: done.set())
+    signal.signal(signal.SIGINT, lambda *_: done.set())
+
+    bridge.start()
+    try:
+        while not done.is_set():
+            done.wait(1.0)
+    finally:
+        # unsubscribe first, then drain the in-process queues into SQLite
+        t0 = time.time()
+        bridge.stop()
+        print(f"[INGEST] {client_id} stopped ({time.time() - t0:.1f}s drain): {bridge.ingest.stats()}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,255 @@
+# group_1_latency.py
+# End-to-end latency for the data topic:
+#   publish -> ingest : MQTT arrival time minus the payload "timestamp" (MessagePackager)
+#   ingest  -> commit : write-behind COMMIT time minus MQTT arrival time
+# Each (device, metric) gets a per-minute log-bucket quantile sketch; minutes are
+# merged into the latency_1m table, so any range can be re-aggregated exactly
+# (within the sketch's relative accuracy) by merging stored sketches.
+import math
+import time
+import struct
+import threading
+
+METRICS = ("publish_ingest", "ingest_commit")
+QUANTILES = (0.5, 0.95, 0.99)
+
+_ALPHA = 0.01        # relative accuracy of every quantile (1%)
+_MIN_MS = 0.001      # anything below 1 us (and negative clock skew) lands in the zero bucket
+MAX_MS = 86_400_000.0  # a day: anything further off is a broken clock or payload, not latency
+_HEADER = struct.Struct("<IId")   # zero count, bucket count, max
+_BUCKET = struct.Struct("<hI")    # bucket index, count
+_K_MIN, _K_MAX = -(1 << 15), (1 << 15) - 1
+
+
+def plausible(ms) -> bool:
+    """True for a finite latency within MAX_MS either way (numbers only)."""
+    return isinstance(ms, (int, float)) and math.isfinite(ms) and abs(ms) < MAX_MS
+
+
+class LogSketch:
+    """
+    Mergeable quantile sketch over positive values (milliseconds):
+    - Bucket k holds values in (gamma^(k-1), gamma^k], gamma = (1 + a) / (1 - a)
+    - Any quantile is returned within relative error a, whatever the distribution
+    - Merging two sketches adds bucket counts; serialized form is a few hundred bytes
+    """
+    __slots__ = ("buckets", "zero", "count", "max", "skewed")
+
+    GAMMA = (1 + _ALPHA) / (1 - _ALPHA)
+    _LOG_GAMMA = math.log(GAMMA)
+
+    def __init__(self):
+        self.buckets = {}
+        self.zero = 0
+        self.count = 0
+        self.max = 0.0
+        self.skewed = 0  # negative or implausible samples (publisher clock ahead of ours, bad timestamps)
+
+    def add(self, ms: float):
+        if not plausible(ms):
+            # NaN / inf / absurd payload timestamps: counted, never bucketed
+            self.skewed += 1
+            return
+        self.count += 1
+        if ms > self.max:
+            self.max = ms
+        if ms < _MIN_MS:
+            self.zero += 1
+            if ms < 0:
+                self.skewed += 1
+            return
+        k = min(_K_MAX, max(_K_MIN, math.ceil(math.log(ms) / self._LOG_GAMMA)))
+        self.buckets[k] = self.buckets.get(k, 0) + 1
+
+    def merge(self, other: "LogSketch"):
+        for k, c in other.buckets.items():
+            self.buckets[k] = self.buckets.get(k, 0) + c
+        self.zero += other.zero
+        self.count += other.count
+        self.skewed += other.skewed
+        if other.max > self.max:
+            self.max = other.max
+        return self
+
+    def quantile(self, q: float):
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zero
+        if seen > rank:
+            return 0.0
+        for k in sorted(self.buckets):
+            seen += self.buckets[k]
+            if seen > rank:
+                # midpoint (in relative terms) of the bucket, capped by the exact max
+                return min(self.max, 2 * self.GAMMA ** k / (self.GAMMA + 1))
+        return self.max
+
+    def summary(self) -> dict:
+        out = {"count": self.count, "max_ms": round(self.max, 3)}
+        for q in QUANTILES:
+            v = self.quantile(q)
+            out[f"p{round(q * 100)}_ms"] = None if v is None else round(v, 3)
+        return out
+
+    def to_bytes(self) -> bytes:
+        parts = [_HEADER.pack(self.zero, len(self.buckets), self.max)]
+        parts.extend(_BUCKET.pack(k, c) for k, c in sorted(self.buckets.items()))
+        return b"".join(parts)
+
+    @classmethod
+    def from_bytes(cls, blob: bytes) -> "LogSketch":
+        s = cls()
+        s.zero, n, s.max = _HEADER.unpack_from(blob, 0)
+        off = _HEADER.size
+        for _ in range(n):
+            k, c = _BUCKET.unpack_from(blob, off)
+            s.buckets[k] = c
+            off += _BUCKET.size
+        s.count = s.zero + sum(s.buckets.values())
+        return s
+
+
+_UPSERT = '''
+    INSERT INTO latency_1m (device_id, metric, bucket_ts, count, p50_ms, p95_ms, p99_ms, max_ms, sketch)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(device_id, metric, bucket_ts) DO UPDATE SET
+        count = excluded.count,
+        p50_ms = excluded.p50_ms,
+        p95_ms = excluded.p95_ms,
+        p99_ms = excluded.p99_ms,
+        max_ms = excluded.max_ms,
+        sketch = excluded.sketch
+'''
+
+
+def create_table(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS latency_1m (
+            device_id TEXT NOT NULL,
+            metric TEXT NOT NULL,
+            bucket_ts REAL NOT NULL,
+            count INTEGER NOT NULL,
+            p50_ms REAL,
+            p95_ms REAL,
+            p99_ms REAL,
+            max_ms REAL,
+            sketch BLOB NOT NULL,
+            PRIMARY KEY (device_id, metric, bucket_ts)
+        ) WITHOUT ROWID
+    ''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_latency_1m_ts ON latency_1m(bucket_ts)")
+
+
+class LatencyTracker:
+    """
+    Per-device, per-minute latency sketches for the admin bridge:
+    - record() is called on the ingest path (publish -> ingest)
+    - on_commit() is the write-behind queue's commit hook (ingest -> commit)
+    - flush() runs inside the writer's transaction and merges the touched minutes
+      into latency_1m (merging, not overwriting, so several ingest processes can share it)
+    - totals() keeps lifetime sketches in memory for the live view
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = {}   # (device_id, metric, minute) -> LogSketch not yet written
+        self._totals = {}    # (device_id, metric) -> LogSketch since start
+
+    def record(self, device_id, metric, ms, ts=None):
+        minute = float(int((ts or time.time()) // 60) * 60)
+        with self._lock:
+            if not plausible(ms):
+                # live view counts it as skewed; no per-minute row for a sample that is not a latency
+                t = self._totals.setdefault((device_id, metric), LogSketch())
+                t.add(ms)
+                return
+            key = (device_id, metric, minute)
+            s = self._pending.get(key)
+            if s is None:
+                s = self._pending[key] = LogSketch()
+            s.add(ms)
+            t = self._totals.get((device_id, metric))
+            if t is None:
+                t = self._totals[(device_id, metric)] = LogSketch()
+            t.add(ms)
+
+    def on_commit(self, tags, commit_ts):
+        """Write-queue commit hook: tags are (device_id, ingest_ts) of the committed message rows."""
+        for device_id, ingest_ts in tags:
+            self.record(device_id, "ingest_commit", (commit_ts - ingest_ts) * 1000.0, ingest_ts)
+
+    def flush(self, conn):
+        with self._lock:
+            if not self._pending:
+                return
+            pending, self._pending = self._pending, {}
+        try:
+            rows = []
+            for key, sketch in list(pending.items()):
+                device_id, metric, minute = key
+                row = conn.execute(
+                    "SELECT sketch FROM latency_1m WHERE device_id = ? AND metric = ? AND bucket_ts = ?",
+                    (device_id, metric, minute)).fetchone()
+                try:
+                    merged = LogSketch.from_bytes(row[0]).merge(sketch) if row else sketch
+                    blob = merged.to_bytes()
+                except (struct.error, ValueError, OverflowError) as e:
+                    # never put back a sketch that cannot be stored: it would fail every flush
+                    print(f"[ADMIN] Dropping latency sketch {device_id}/{metric}@{minute:.0f}: {e}")
+                    del pending[key]
+                    continue
+                s = merged.summary()
+                rows.append((device_id, metric, minute, merged.count, s["p50_ms"], s["p95_ms"],
+                             s["p99_ms"], merged.max, blob))
+            conn.executemany(_UPSERT, rows)
+        except Exception:
+            with self._lock:
+                for key, sketch in pending.items():
+                    cur = self._pending.get(key)
+                    self._pending[key] = sketch.merge(cur) if cur else sketch
+            raise
+
+    def totals(self) -> dict:
+        with self._lock:
+            out = {}
+            for (device_id, metric), s in self._totals.items():
+                out.setdefault(device_id, {})[metric] = dict(s.summary(), skewed=s.skewed)
+            return out
+
+
+def query(conn, device_id=None, metric=None, since=None, until=None, per_minute=False) -> dict:
+    """Merge stored minutes into per-device (and fleet-wide) quantiles, optionally with the minute rows."""
+    where, params = ["1=1"], []
+    if device_id:
+        where.append("device_id = ?")
+        params.append(device_id)
+    if metric:
+        where.append("metric = ?")
+        params.append(metric)
+    if since is not None:
+        where.append("bucket_ts >= ?")
+        params.append(float(since) - float(since) % 60)
+    if until is not None:
+        where.append("bucket_ts <= ?")
+        params.append(float(until))
+    rows = conn.execute(f'''
+        SELECT device_id, metric, bucket_ts, count, p50_ms, p95_ms, p99_ms, max_ms, sketch
+        FROM latency_1m WHERE {" AND ".join(where)}
+        ORDER BY bucket_ts
+    ''', params).fetchall()
+
+    devices, fleet, minutes = {}, {}, []
+    for d, m, bucket_ts, count, p50, p95, p99, mx, blob in rows:
+        sketch = LogSketch.from_bytes(blob)
+        devices.setdefault(d, {}).setdefault(m, LogSketch()).merge(sketch)
+        fleet.setdefault(m, LogSketch()).merge(sketch)
+        if per_minute:
+            minutes.append({"device_id": d, "metric": m, "bucket_ts": bucket_ts, "count": count,
+                            "p50_ms": p50, "p95_ms": p95, "p99_ms": p99, "max_ms": mx})
+    out = {
+        "fleet": {m: s.summary() for m, s in fleet.items()},
+        "devices": {d: {m: s.summary() for m, s in ms.items()} for d, ms in devices.items()},
+    }
+    if per_minute:
+        out["minutes"] = minutes
+    return out
@@ -0,0 +1,117 @@
+# group_1_live_feed.py
+import json
+import time
+import threading
+
+
+class LiveFeed:
+    """
+    In-memory event ring for the admin console's Server-Sent Events stream:
+    - The MQTT bridge publishes events (reading / anomaly / status); each gets a sequential id
+    - Events are serialized once, however many consoles are listening
+    - Clients resume from Last-Event-ID as long as that event is still in the ring
+    - A client whose cursor falls off the ring (too slow, or away too long) is evicted;
+      it receives a "reset" event and should reload its state over the REST API
+    """
+    def __init__(self, capacity: int = 4096, max_clients: int = 32):
+        self.capacity = max(16, int(capacity))
+        self.max_clients = max(1, int(max_clients))
+        # ids are "<boot>-<seq>" so a Last-Event-ID from a previous process is never misread
+        self.boot = str(int(time.time()))
+        self._ring = [None] * self.capacity
+        self._head = 0  # seq of the newest event (0 = none yet)
+        self._cond = threading.Condition()
+        self.clients = 0
+        self.evictions = 0
+
+    # ------------------ Producer ------------------
+    def publish(self, kind: str, device_id, data: dict):
+        body = json.dumps(data)
+        with self._cond:
+            self._head += 1
+            self._ring[self._head % self.capacity] = (self._head, kind, device_id, body)
+            self._cond.notify_all()
+
+    # ------------------ Consumers ------------------
+    def parse_id(self, last_event_id):
+        """Sequence number to resume after, or None if the id is missing/foreign."""
+        if not last_event_id:
+            return None
+        boot, _, seq = str(last_event_id).partition("-")
+        if boot != self.boot or not seq.isdigit():
+            return None
+        return int(seq)
+
+    def read(self, after: int, timeout: float):
+        """
+        Events with seq > after (waits up to `timeout` if there are none).
+        Returns (events, evicted); evicted means `after` has already been overwritten.
+        """
+        with self._cond:
+            if self._head <= after:
+                self._cond.wait(timeout)
+            oldest = max(1, self._head - self.capacity + 1)
+            if after + 1 < oldest:
+                return [], True
+            return [self._ring[s % self.capacity] for s in range(after + 1, self._head + 1)], False
+
+    def head(self) -> int:
+        with self._cond:
+            return self._head
+
+    def stream(self, last_event_id=None, device_ids=None, kinds=None, heartbeat_s: float = 15.0):
+        """
+        SSE text for one client. Without a usable Last-Event-ID the stream starts
+        at the newest event; device_ids / kinds filter what is sent.
+        """
+        with self._cond:
+            if self.clients >= self.max_clients:
+                yield "event: busy\ndata: {}\n\n"
+                return
+            self.clients += 1
+        try:
+            after = self.parse_id(last_event_id)
+            yield "retry: 3000\n\n"
+            if after is None:
+                if last_event_id:
+                    # the client knew an older stream (server restarted): tell it to reload
+                    yield "event: reset\ndata: {}\n\n"
+                    return
+                after = self.head()
+
+            while True:
+                events, evicted = self.read(after, heartbeat_s)
+                if evicted:
+                    with self._cond:
+                        self.evictions += 1
+                    yield "event: reset\ndata: {}\n\n"
+                    return
+                if not events:
+                    yield ": keep-alive\n\n"
+                    continue
+                out = []
+                for seq, kind, device_id, body in events:
+                    if kinds and kind not in kinds:
+                        continue
+                    if device_ids and device_id not in device_ids:
+                        continue
+                    out.append(f"id: {self.boot}-{seq}\nevent: {kind}\ndata: {body}\n\n")
+                after = events[-1][0]
+                if out:
+                    yield "".join(out)
+                else:
+                    # nothing matched the filters: still advance the client's Last-Event-ID
+                    yield f"id: {self.boot}-{after}\n\n"
+        finally:
+            with self._cond:
+                self.clients -= 1
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "head": self._head,
+                "capacity": self.capacity,
+                "clients": self.clients,
+                "max_clients": self.max_clients,
+                "evictions": self.evictions,
+            }
@@ -0,0 +1,206 @@
+# group_1_metrics.py
+# Process-wide instrumentation for the admin bridge, exported in the Prometheus
+# text format (/api/metrics). Counters and histograms aggregate per thread:
+# the recording thread only touches its own shard (no lock on the hot path),
+# and shards are summed when the endpoint is scraped.
+import math
+import bisect
+import threading
+
+# seconds; covers ~10 us JSON decodes up to multi-second purges
+DEFAULT_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025,
+                   0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=None) -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(v) -> str:
+    if v == math.inf:
+        return "+Inf"
+    if isinstance(v, float) and v.is_integer() and abs(v) < 1e15:
+        return str(int(v))
+    return repr(v)
+
+
+class _Sharded:
+    """Base for metrics whose state is one dict per recording thread."""
+    def __init__(self, name: str, help_text: str, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._shards = []  # every thread's dict, kept after the thread exits
+        self._shards_lock = threading.Lock()
+
+    def _shard(self) -> dict:
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = {}
+            with self._shards_lock:
+                self._shards.append(shard)
+            return shard
+
+    def _snapshots(self) -> list:
+        with self._shards_lock:
+            shards = list(self._shards)
+        # dict.copy() is atomic under the GIL, so a concurrent insert cannot break the scrape
+        return [s.copy() for s in shards]
+
+
+class Counter(_Sharded):
+    kind = "counter"
+
+    def inc(self, *labels, n=1):
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0) + n
+
+    def values(self) -> dict:
+        total = {}
+        for snap in self._snapshots():
+            for labels, v in snap.items():
+                total[labels] = total.get(labels, 0) + v
+        return total
+
+    def render(self) -> list:
+        return [f"{self.name}{_labels(self.labelnames, k)} {_number(v)}"
+                for k, v in sorted(self.values().items())]
+
+
+class Histogram(_Sharded):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labels):
+        shard = self._shard()
+        cell = shard.get(labels)
+        if cell is None:
+            # [per-bucket counts (last one is +Inf), sum]; only this thread ever mutates it
+            cell = shard[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        cell[0][bisect.bisect_left(self.buckets, value)] += 1
+        cell[1] += value
+
+    def values(self) -> dict:
+        """labels -> (cumulative bucket counts, sum, count)."""
+        merged = {}
+        for snap in self._snapshots():
+            for labels, (counts, total) in snap.items():
+                m = merged.setdefault(labels, [[0] * (len(self.buckets) + 1), 0.0])
+                for i, c in enumerate(list(counts)):
+                    m[0][i] += c
+                m[1] += total
+        out = {}
+        for labels, (counts, total) in merged.items():
+            cumulative, running = [], 0
+            for c in counts:
+                running += c
+                cumulative.append(running)
+            out[labels] = (cumulative, total, running)
+        return out
+
+    def render(self) -> list:
+        lines = []
+        for labels, (cumulative, total, count) in sorted(self.values().items()):
+            for bound, c in zip(self.buckets + (math.inf,), cumulative):
+                le = f'le="{_number(float(bound))}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {c}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {count}")
+        return lines
+
+
+class Gauge:
+    """Read at scrape time from a callback: fn() -> number, or {label tuple: number}."""
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, fn, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.fn = fn
+
+    def render(self) -> list:
+        try:
+            value = self.fn()
+        except Exception as e:
+            print(f"[ADMIN] Gauge {self.name} failed: {e}")
+            return []
+        if value is None:
+            return []
+        if not isinstance(value, dict):
+            value = {(): value}
+        return [f"{self.name}{_labels(self.labelnames, k)} {_number(float(v))}"
+                for k, v in sorted(value.items())]
+
+
+class MetricsRegistry:
+    """
+    Named metrics in registration order:
+    - counter() / histogram() return the existing metric when the name is already registered
+    - gauge() replaces an existing callback (the bridge may be rebuilt)
+    - render() produces the Prometheus text exposition format (version 0.0.4)
+    """
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric, replace=False):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None and not replace:
+                if existing.kind != metric.kind:
+                    raise ValueError(f"metric {metric.name!r} already registered as a {existing.kind}")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name, help_text, labelnames=()) -> Counter:
+        return self._register(Counter(name, help_text, labelnames))
+
+    def histogram(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help_text, labelnames, buckets))
+
+    def gauge(self, name, help_text, fn, labelnames=()) -> Gauge:
+        return self._register(Gauge(name, help_text, fn, labelnames), replace=True)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for m in metrics:
+            lines.append(f"# HELP {m.name} {m.help}")
+            lines.append(f"# TYPE {m.name} {m.kind}")
+            lines.extend(m.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# ---- bridge metrics (recorded in group_1_admin_mqtt / group_1_write_queue) ----
+MESSAGES = REGISTRY.counter("group1_mqtt_messages_total", "MQTT messages received, by topic", ("topic",))
+DEVICE_MESSAGES = REGISTRY.counter("group1_device_messages_total", "Data messages processed, by device", ("device_id",))
+PAYLOAD_FORMATS = REGISTRY.counter("group1_payload_format_total", "Data payloads received, by wire format (group_1_codec)", ("format",))
+BATCH_READINGS = REGISTRY.histogram("group1_batch_readings", "Readings per batched (envelope) data message",
+                                    buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500, 1000))
+DUPLICATES = REGISTRY.counter("group1_duplicates_dropped_total", "QoS 1 redeliveries dropped before storage, by device", ("device_id",))
+STAGE_SECONDS = REGISTRY.histogram(
+    "group1_ingest_stage_seconds",
+    "Per-message time in each ingest stage (decode, validate, insert = enqueue for the writer)",
+    ("stage",))
+FLUSH_SECONDS = REGISTRY.histogram("group1_db_flush_seconds", "Write-behind group-commit duration")
+FLUSH_ROWS = REGISTRY.counter("group1_db_rows_total", "Rows committed by the write-behind queue, by result", ("result",))
+SCHEDULE_FIRINGS = REGISTRY.counter("group1_schedule_firings_total", "Scheduled control commands published", ("action",))
+PURGE_SECONDS = REGISTRY.histogram("group1_purge_seconds", "Retention purge duration")
@@ -0,0 +1,178 @@
+# group_1_migrations.py
+# Versioned schema for the admin database.
+# The version lives in PRAGMA user_version; every migration runs in its own
+# transaction, so an interrupted upgrade resumes from the last finished step.
+from group_1_partitions import install as install_partitions
+from group_1_rollups import create_tables as create_rollups, backfill as backfill_rollups
+from group_1_latency import create_table as create_latency_table
+
+# tables split into per-period partitions (see group_1_partitions.py)
+PARTITIONED_TABLES = ("messages", "service_logs", "anomalies")
+
+
+# ------------------ Migrations ------------------
+def _m001_baseline(c):
+    # tables exactly as the original init_db() created them
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS devices (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            device_id TEXT UNIQUE,
+            location TEXT,
+            status TEXT DEFAULT 'online',
+            last_updated REAL
+        )
+    ''')
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS messages (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            device_id TEXT,
+            ts REAL,
+            core_temp REAL,
+            packet_id TEXT,
+            valid INTEGER,
+            schema_ok INTEGER,
+            qos INTEGER,
+            topic TEXT,
+            raw_data TEXT
+        )
+    ''')
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS schedules (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            device_id TEXT,
+            action TEXT,
+            start_ts REAL,
+            end_ts REAL
+        )
+    ''')
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS service_logs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            device_id TEXT,
+            ts REAL,
+            qos INTEGER,
+            schema_ok INTEGER,
+            log_message TEXT,
+            anomaly_type TEXT
+        )
+    ''')
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS anomalies (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            device_id TEXT,
+            ts REAL,
+            anomaly_type TEXT,
+            message TEXT
+        )
+    ''')
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS mqtt_config (
+            id INTEGER PRIMARY KEY DEFAULT 1,
+            version INTEGER DEFAULT 5,
+            qos INTEGER DEFAULT 1,
+            CONSTRAINT config_pk UNIQUE (id)
+        )
+    ''')
+
+
+def _m002_missing_columns(c):
+    # the bridge writes messages.location and service_logs.topic, which the
+    # original tables never had (every such insert failed)
+    _add_column(c, "messages", "location", "TEXT")
+    _add_column(c, "service_logs", "topic", "TEXT")
+
+
+def _m003_timeseries_indexes(c):
+    # newest-first listings, fleet-wide range filters and the retention purge
+    c.execute("CREATE INDEX IF NOT EXISTS idx_messages_ts ON messages(ts)")
+    # per-device listings and /api/stats: covers every column the stats query reads
+    c.execute('''
+        CREATE INDEX IF NOT EXISTS idx_messages_device_ts
+        ON messages(device_id, ts, core_temp, valid, schema_ok)
+    ''')
+    # schema failures are rare, so a partial index keeps "bad rows" lookups tiny
+    c.execute('''
+        CREATE INDEX IF NOT EXISTS idx_messages_schema_bad
+        ON messages(device_id, ts) WHERE schema_ok = 0
+    ''')
+    c.execute("CREATE INDEX IF NOT EXISTS idx_anomalies_ts ON anomalies(ts)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_anomalies_device_ts ON anomalies(device_id, ts)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_service_logs_ts ON service_logs(ts)")
+    c.execute("ANALYZE")
+
+
+def _m004_partitions(c):
+    # existing tables become the legacy partition; new rows go to per-period tables
+    install_partitions(c, PARTITIONED_TABLES)
+
+
+def _m005_rollups(c):
+    # per-device 1 min / 1 h / 1 day rollups, seeded from the rows already stored
+    create_rollups(c)
+    tables = {base: [r[0] for r in c.execute(
+        "SELECT name FROM partitions WHERE base = ? AND end_ts > start_ts", (base,)).fetchall()]
+        for base in ("messages", "anomalies")}
+    backfill_rollups(c, tables["messages"], tables["anomalies"])
+
+
+def _m006_device_registry(c):
+    # columns the in-memory device registry writes back
+    _add_column(c, "devices", "last_value", "REAL")
+    _add_column(c, "devices", "last_seen", "REAL")
+    _add_column(c, "devices", "msg_rate", "REAL DEFAULT 0")
+
+
+def _m007_latency(c):
+    # per-device, per-minute latency sketches (group_1_latency)
+    create_latency_table(c)
+
+
+MIGRATIONS = [
+    (1, "baseline schema", _m001_baseline),
+    (2, "messages.location and service_logs.topic", _m002_missing_columns),
+    (3, "time-series indexes", _m003_timeseries_indexes),
+    (4, "time partitions", _m004_partitions),
+    (5, "per-device rollups", _m005_rollups),
+    (6, "device registry columns", _m006_device_registry),
+    (7, "per-minute latency sketches", _m007_latency),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+# ------------------ Runner ------------------
+def current_version(conn) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn, target=None):
+    """
+    Upgrade the database in place up to `target` (default: latest).
+    `conn` must be in autocommit mode (isolation_level=None), as pooled connections are.
+    Returns (version_before, version_after).
+    """
+    target = LATEST_VERSION if target is None else int(target)
+    before = current_version(conn)
+    version = before
+
+    for number, name, step in MIGRATIONS:
+        if number <= version or number > target:
+            continue
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            step(conn)
+            conn.execute(f"PRAGMA user_version = {int(number)}")
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        version = number
+        print(f"[MIGRATE] Applied {number:03d} ({name})")
+
+    return before, version
+
+
+def _add_column(c, table, column, decl):
+    cols = {row[1] for row in c.execute(f"PRAGMA table_info({table})").fetchall()}
+    if column not in cols:
+        c.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
@@ -0,0 +1,714 @@
+# group_1_mini_broker.py
+# Minimal in-process MQTT broker (3.1.1 and 5) on asyncio, so the publisher,
+# subscriber, admin bridge and benchmarks can run offline and be measured
+# without a public broker's latency in the way.
+#
+#   python group_1_mini_broker.py --port 1883          # standalone
+#   python group_1_mini_broker.py --bench 200000       # raw-socket throughput check
+#
+#   broker = MiniBroker(port=0); host, port = broker.start()   # from code/tests
+#
+# Supported: CONNECT (clean sessions only), SUBSCRIBE/UNSUBSCRIBE with + and #
+# wildcards and $share/<group>/<filter> shared subscriptions, PUBLISH QoS 0/1
+# (incoming QoS 2 is acknowledged and delivered at QoS <= 1), retained
+# messages, last will, keepalive, PING, v5 properties (forwarded, not acted on).
+# Not supported: persistent sessions, QoS 2 delivery, auth, topic aliases.
+import sys
+import time
+import struct
+import socket
+import asyncio
+import argparse
+import itertools
+import threading
+
+# packet types (high nibble of the fixed header)
+CONNECT, CONNACK, PUBLISH, PUBACK, PUBREC, PUBREL, PUBCOMP = 1, 2, 3, 4, 5, 6, 7
+SUBSCRIBE, SUBACK, UNSUBSCRIBE, UNSUBACK, PINGREQ, PINGRESP, DISCONNECT, AUTH = 8, 9, 10, 11, 12, 13, 14, 15
+
+_U16 = struct.Struct("!H")
+_PINGRESP = b"\xd0\x00"
+
+# v5 property id -> encoding ("b" byte, "h" u16, "i" u32, "v" varint, "s" string, "p" string pair)
+_PROP_KIND = {
+    0x01: "b", 0x02: "i", 0x03: "s", 0x08: "s", 0x09: "s", 0x0B: "v", 0x11: "i", 0x12: "s",
+    0x13: "h", 0x15: "s", 0x16: "s", 0x17: "b", 0x18: "i", 0x19: "b", 0x1A: "s", 0x1C: "s",
+    0x1F: "s", 0x21: "h", 0x22: "h", 0x23: "h", 0x24: "b", 0x25: "b", 0x26: "p", 0x27: "i",
+    0x28: "b", 0x29: "b", 0x2A: "b",
+}
+# publish properties that describe the hop, not the message: dropped when forwarding
+_HOP_PROPS = (0x0B, 0x23)
+
+
+class ProtocolError(Exception):
+    pass
+
+
+def encode_varint(n: int) -> bytes:
+    out = bytearray()
+    while True:
+        b = n & 0x7F
+        n >>= 7
+        out.append(b | 0x80 if n else b)
+        if not n:
+            return bytes(out)
+
+
+def decode_varint(buf, pos: int):
+    """(value, next position); raises IndexError if the buffer ends first."""
+    value, shift = 0, 0
+    while True:
+        b = buf[pos]
+        pos += 1
+        value |= (b & 0x7F) << shift
+        if not b & 0x80:
+            return value, pos
+        shift += 7
+        if shift > 21:
+            raise ProtocolError("malformed variable byte integer")
+
+
+def encode_str(s) -> bytes:
+    b = s.encode() if isinstance(s, str) else s
+    return _U16.pack(len(b)) + b
+
+
+def _read_str(buf, pos):
+    n = _U16.unpack_from(buf, pos)[0]
+    return bytes(buf[pos + 2:pos + 2 + n]), pos + 2 + n
+
+
+def _skip_props(buf, pos):
+    """Returns (raw property bytes, next position)."""
+    n, pos = decode_varint(buf, pos)
+    return bytes(buf[pos:pos + n]), pos + n
+
+
+def _strip_hop_props(raw: bytes) -> bytes:
+    if not raw:
+        return raw
+    out, pos = bytearray(), 0
+    while pos < len(raw):
+        start = pos
+        pid, pos = decode_varint(raw, pos)
+        kind = _PROP_KIND.get(pid)
+        if kind == "b":
+            pos += 1
+        elif kind == "h":
+            pos += 2
+        elif kind == "i":
+            pos += 4
+        elif kind == "v":
+            _, pos = decode_varint(raw, pos)
+        elif kind == "s":
+            pos += 2 + _U16.unpack_from(raw, pos)[0]
+        elif kind == "p":
+            pos += 2 + _U16.unpack_from(raw, pos)[0]
+            pos += 2 + _U16.unpack_from(raw, pos)[0]
+        else:
+            raise ProtocolError(f"unknown property 0x{pid:02x}")
+        if pid not in _HOP_PROPS:
+            out += raw[start:pos]
+    return bytes(out)
+
+
+def packet(ptype: int, flags: int, body: bytes) -> bytes:
+    return bytes([(ptype << 4) | flags]) + encode_varint(len(body)) + body
+
+
+def topic_matches(filt: str, topic: str) -> bool:
+    """MQTT filter match (+ one level, # the rest); $-topics never match a leading wildcard."""
+    if topic.startswith("$") and filt[:1] in ("+", "#"):
+        return False
+    f, t = filt.split("/"), topic.split("/")
+    for i, part in enumerate(f):
+        if part == "#":
+            return True
+        if i >= len(t) or (part != "+" and part != t[i]):
+            return False
+    return len(f) == len(t)
+
+
+def valid_filter(filt: str) -> bool:
+    if not filt:
+        return False
+    parts = filt.split("/")
+    for i, part in enumerate(parts):
+        if "#" in part and (part != "#" or i != len(parts) - 1):
+            return False
+        if "+" in part and part != "+":
+            return False
+    return True
+
+
+class _Message:
+    __slots__ = ("topic", "payload", "qos", "retain", "props", "sender", "_head")
+
+    def __init__(self, topic, payload, qos, retain, props=b"", sender=None):
+        self.topic = topic
+        self.payload = payload
+        self.qos = qos
+        self.retain = retain
+        self.props = props
+        self.sender = sender
+        self._head = None
+
+    def head(self):
+        """(encoded topic, encoded v5 properties); built once per message, shared by all deliveries."""
+        if self._head is None:
+            self._head = (encode_str(self.topic), encode_varint(len(self.props)) + self.props)
+        return self._head
+
+
+class _Subscription:
+    __slots__ = ("session", "qos", "no_local", "rap")
+
+    def __init__(self, session, qos, no_local=False, rap=False):
+        self.session = session
+        self.qos = qos
+        self.no_local = no_local
+        self.rap = rap
+
+
+class _SharedGroup:
+    """$share/<group>/<filter>: each message goes to one member, round-robin."""
+    __slots__ = ("members", "_rr")
+
+    def __init__(self):
+        self.members = {}  # session -> _Subscription
+        self._rr = 0
+
+    def pick(self):
+        subs = list(self.members.values())
+        if not subs:
+            return None
+        self._rr = (self._rr + 1) % len(subs)
+        return subs[self._rr]
+
+
+class _Session(asyncio.Protocol):
+    """One client connection (clean session)."""
+    def __init__(self, broker):
+        self.broker = broker
+        self.transport = None
+        self.buf = bytearray()
+        self.client_id = None
+        self.version = 4
+        self.keepalive = 0
+        self.last_rx = time.monotonic()
+        self.will = None
+        self.connected = False
+        self.closing = False
+        self.will_on_close = True
+        self.filters = set()       # plain filters this session holds
+        self.shared = set()        # (group, filter) keys
+        self._pids = itertools.cycle(range(1, 65536))
+        self._out = []
+        self._flush_scheduled = False
+
+    # ------------------ asyncio.Protocol ------------------
+    def connection_made(self, transport):
+        self.transport = transport
+        sock = transport.get_extra_info("socket")
+        if sock is not None:
+            try:
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            except OSError:
+                pass
+
+    def data_received(self, data):
+        self.last_rx = time.monotonic()
+        buf = self.buf
+        buf += data
+        pos, n = 0, len(buf)
+        try:
+            while n - pos >= 2:
+                length, body = decode_varint(buf, pos + 1)
+                end = body + length
+                if end > n:
+                    break
+                header = buf[pos]
+                try:
+                    self._dispatch(header >> 4, header & 0x0F, buf, body, end)
+                except IndexError:
+                    raise ProtocolError("truncated packet")
+                pos = end
+                if self.closing:
+                    return
+        except IndexError:
+            pass  # remaining-length bytes not all here yet
+        except (ProtocolError, struct.error, UnicodeDecodeError) as e:
+            self.broker.stats["protocol_errors"] += 1
+            print(f"[BROKER] Protocol error from {self.client_id}: {e}")
+            self.close(send_will=True)
+            return
+        del buf[:pos]
+
+    def connection_lost(self, exc):
+        self.broker._drop(self, send_will=not self.closing or self.will_on_close)
+
+    # ------------------ Output ------------------
+    def send(self, data: bytes):
+        # batched: one transport.write per event-loop turn instead of one per packet
+        self._out.append(data)
+        if not self._flush_scheduled:
+            self._flush_scheduled = True
+            self.broker.loop.call_soon(self._flush)
+
+    def _flush(self):
+        self._flush_scheduled = False
+        if self._out and self.transport is not None and not self.transport.is_closing():
+            self.transport.write(b"".join(self._out))
+        self._out.clear()
+
+    def close(self, send_will=False):
+        if self.closing:
+            return
+        self.closing = True
+        self.will_on_close = send_will
+        self._flush()
+        if self.transport is not None:
+            self.transport.close()
+
+    # ------------------ Packets ------------------
+    def _dispatch(self, ptype, flags, buf, pos, end):
+        if not self.connected and ptype != CONNECT:
+            raise ProtocolError("packet before CONNECT")
+        if ptype == PUBLISH:
+            self._on_publish(flags, buf, pos, end)
+        elif ptype == PUBACK or ptype == PUBCOMP or ptype == PUBREC:
+            if ptype == PUBREC:  # we never send QoS 2, but answer politely
+                self.send(packet(PUBREL, 0x02, bytes(buf[pos:pos + 2])))
+        elif ptype == PUBREL:
+            self.send(packet(PUBCOMP, 0, bytes(buf[pos:pos + 2])))
+        elif ptype == PINGREQ:
+            self.send(_PINGRESP)
+        elif ptype == SUBSCRIBE:
+            self._on_subscribe(buf, pos, end)
+        elif ptype == UNSUBSCRIBE:
+            self._on_unsubscribe(buf, pos, end)
+        elif ptype == CONNECT:
+            self._on_connect(buf, pos, end)
+        elif ptype == DISCONNECT:
+            reason = buf[pos] if self.version == 5 and end > pos else 0
+            self.close(send_will=reason == 0x04)  # 0x04: disconnect with will message
+        elif ptype == AUTH:
+            raise ProtocolError("AUTH not supported")
+        else:
+            raise ProtocolError(f"unexpected packet type {ptype}")
+
+    def _on_connect(self, buf, pos, end):
+        if self.connected:
+            raise ProtocolError("second CONNECT")
+        name, pos = _read_str(buf, pos)
+        level = buf[pos]
+        flags = buf[pos + 1]
+        self.keepalive = _U16.unpack_from(buf, pos + 2)[0]
+        pos += 4
+        if name not in (b"MQTT", b"MQIsdp") or level not in (3, 4, 5):
+            # 3.1.1 return code 1 / v5 reason 0x84: unsupported protocol version
+            self.send(packet(CONNACK, 0, b"\x00\x84\x00" if level == 5 else b"\x00\x01"))
+            self.close()
+            return
+        self.version = level
+        if level == 5:
+            _, pos = _skip_props(buf, pos)
+        cid, pos = _read_str(buf, pos)
+        self.client_id = cid.decode() or f"auto-{id(self):x}"
+        if flags & 0x04:
+            will_props = b""
+            if level == 5:
+                will_props, pos = _skip_props(buf, pos)
+            wtopic, pos = _read_str(buf, pos)
+            wpayload, pos = _read_str(buf, pos)
+            self.will = _Message(wtopic.decode(), wpayload, min(1, (flags >> 3) & 0x03),
+                                 bool(flags & 0x20), _strip_hop_props(will_props), self)
+        self.connected = True
+        self.broker._register(self)
+
+        if level == 5:
+            props = b""
+            if not cid:
+                props += b"\x12" + encode_str(self.client_id)  # assigned client identifier
+            props += b"\x24\x01"  # maximum QoS 1
+            self.send(packet(CONNACK, 0, b"\x00\x00" + encode_varint(len(props)) + props))
+        else:
+            self.send(packet(CONNACK, 0, b"\x00\x00"))
+
+    def _on_publish(self, flags, buf, pos, end):
+        qos = (flags >> 1) & 0x03
+        topic, pos = _read_str(buf, pos)
+        pid = None
+        if qos:
+            pid = bytes(buf[pos:pos + 2])
+            pos += 2
+        props = b""
+        if self.version == 5:
+            props, pos = _skip_props(buf, pos)
+            props = _strip_hop_props(props)
+        topic = topic.decode()
+        if "+" in topic or "#" in topic or not topic:
+            raise ProtocolError(f"invalid publish topic {topic!r}")
+        self.broker.route(_Message(topic, bytes(buf[pos:end]), min(qos, 1), bool(flags & 0x01), props, self))
+        if qos == 1:
+            self.send(packet(PUBACK, 0, pid))
+        elif qos == 2:
+            self.send(packet(PUBREC, 0, pid))
+
+    def _on_subscribe(self, buf, pos, end):
+        pid = bytes(buf[pos:pos + 2])
+        pos += 2
+        if self.version == 5:
+            _, pos = _skip_props(buf, pos)
+        codes, new_subs = bytearray(), []
+        while pos < end:
+            filt, pos = _read_str(buf, pos)
+            opts = buf[pos]
+            pos += 1
+            filt = filt.decode()
+            qos = min(opts & 0x03, 1)
+            group = None
+            if filt.startswith("$share/"):
+                _, group, filt = (filt.split("/", 2) + [""])[:3]
+            if not valid_filter(filt) or group == "":
+                codes.append(0x8F if self.version == 5 else 0x80)  # topic filter invalid / failure
+                continue
+            sub = _Subscription(self, qos, bool(opts & 0x04), bool(opts & 0x08))
+            existed = self.broker._subscribe(self, group, filt, sub)
+            codes.append(qos)
+            retain_handling = (opts >> 4) & 0x03 if self.version == 5 else 0
+            if group is None and (retain_handling == 0 or (retain_handling == 1 and not existed)):
+                new_subs.append((filt, sub))
+        props = b"\x00" if self.version == 5 else b""
+        self.send(packet(SUBACK, 0, pid + props + bytes(codes)))
+        for filt, sub in new_subs:
+            self.broker._send_retained(filt, sub)
+
+    def _on_unsubscribe(self, buf, pos, end):
+        pid = bytes(buf[pos:pos + 2])
+        pos += 2
+        if self.version == 5:
+            _, pos = _skip_props(buf, pos)
+        codes = bytearray()
+        while pos < end:
+            filt, pos = _read_str(buf, pos)
+            filt = filt.decode()
+            group = None
+            if filt.startswith("$share/"):
+                _, group, filt = (filt.split("/", 2) + [""])[:3]
+            codes.append(0x00 if self.broker._unsubscribe(self, group, filt) else 0x11)
+        if self.version == 5:
+            self.send(packet(UNSUBACK, 0, pid + b"\x00" + bytes(codes)))
+        else:
+            self.send(packet(UNSUBACK, 0, pid))
+
+    # ------------------ Delivery ------------------
+    def deliver(self, msg: _Message, qos: int, retain: bool):
+        transport = self.transport
+        if transport is None or self.closing:
+            return
+        if qos == 0 and transport.get_write_buffer_size() > self.broker.max_buffer:
+            self.broker.stats["dropped"] += 1  # slow consumer: shed QoS 0 instead of buffering forever
+            return
+        topic, props = msg.head()
+        if self.version != 5:
+            props = b""
+        if qos:
+            body = b"".join((topic, _U16.pack(next(self._pids)), props, msg.payload))
+        else:
+            body = b"".join((topic, props, msg.payload))
+        self.send(bytes([0x30 | (qos << 1) | (1 if retain else 0)]) + encode_varint(len(body)) + body)
+        self.broker.stats["messages_out"] += 1
+
+
+class MiniBroker:
+    """
+    In-process MQTT broker:
+    - start() runs it on a private event loop thread and returns (host, port); port=0 picks a free port
+    - serve_forever() runs it on the caller's event loop (standalone / asyncio tests)
+    - route() fans a message out to matching subscriptions through a per-topic match cache
+    - stats(): clients, subscriptions, retained, messages_in/out, dropped, protocol_errors
+    """
+    def __init__(self, host: str = "127.0.0.1", port: int = 1883, max_buffer: int = 64 * 1024 * 1024):
+        self.host = host
+        self.port = port
+        self.max_buffer = max_buffer
+        self.loop = None
+        self._server = None
+        self._thread = None
+        self._ready = threading.Event()
+        self._stopped = None
+
+        self.sessions = {}   # client_id -> _Session
+        self.subs = {}       # filter -> {session: _Subscription}
+        self.shared = {}     # (group, filter) -> _SharedGroup
+        self.retained = {}   # topic -> _Message
+        self._match_cache = {}
+        self.stats = {"messages_in": 0, "messages_out": 0, "dropped": 0, "protocol_errors": 0}
+
+    # ------------------ Lifecycle ------------------
+    async def serve_forever(self):
+        await self._open()
+        try:
+            await self._stopped.wait()
+        finally:
+            await self._close()
+
+    def start(self, timeout: float = 5.0):
+        """Run on a background thread; returns (host, port) once listening."""
+        self._thread = threading.Thread(target=lambda: asyncio.run(self.serve_forever()),
+                                        name="mini-broker", daemon=True)
+        self._thread.start()
+        if not self._ready.wait(timeout):
+            raise RuntimeError("broker did not start")
+        return self.host, self.port
+
+    def stop(self, timeout: float = 5.0):
+        if self.loop is not None and self._stopped is not None:
+            self.loop.call_soon_threadsafe(self._stopped.set)
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    async def _open(self):
+        self.loop = asyncio.get_running_loop()
+        self._stopped = asyncio.Event()
+        self._server = await self.loop.create_server(lambda: _Session(self), self.host, self.port,
+                                                     reuse_address=True)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._keepalive_task = self.loop.create_task(self._keepalive_loop())
+        print(f"[BROKER] Listening on {self.host}:{self.port}")
+        self._ready.set()
+
+    async def _close(self):
+        self._keepalive_task.cancel()
+        self._server.close()
+        for s in list(self.sessions.values()):
+            s.close()
+        await self._server.wait_closed()
+
+    async def _keepalive_loop(self):
+        # a client silent for 1.5x its keepalive is gone: close it and publish its will
+        while True:
+            await asyncio.sleep(1.0)
+            now = time.monotonic()
+            for s in list(self.sessions.values()):
+                if s.keepalive and now - s.last_rx > 1.5 * s.keepalive:
+                    print(f"[BROKER] Keepalive timeout: {s.client_id}")
+                    s.close(send_will=True)
+
+    # ------------------ Sessions ------------------
+    def _register(self, session):
+        old = self.sessions.get(session.client_id)
+        if old is not None and old is not session:
+            old.close(send_will=True)  # session takeover
+            self._drop(old, send_will=True)
+        self.sessions[session.client_id] = session
+
+    def _drop(self, session, send_will):
+        if session.client_id is None or session.transport is None:
+            return
+        if self.sessions.get(session.client_id) is session:
+            del self.sessions[session.client_id]
+        for filt in list(session.filters):
+            self._unsubscribe(session, None, filt)
+        for group, filt in list(session.shared):
+            self._unsubscribe(session, group, filt)
+        will, session.will = session.will, None
+        session.transport = None
+        if will is not None and send_will:
+            will.sender = None
+            self.route(will)
+
+    def _subscribe(self, session, group, filt, sub) -> bool:
+        self._match_cache.clear()
+        if group is None:
+            subs = self.subs.setdefault(filt, {})
+            existed = session in subs
+            subs[session] = sub
+            session.filters.add(filt)
+        else:
+            g = self.shared.setdefault((group, filt), _SharedGroup())
+            existed = session in g.members
+            g.members[session] = sub
+            session.shared.add((group, filt))
+        return existed
+
+    def _unsubscribe(self, session, group, filt) -> bool:
+        self._match_cache.clear()
+        if group is None:
+            subs = self.subs.get(filt)
+            if not subs or session not in subs:
+                return False
+            del subs[session]
+            if not subs:
+                del self.subs[filt]
+            session.filters.discard(filt)
+        else:
+            g = self.shared.get((group, filt))
+            if not g or session not in g.members:
+                return False
+            del g.members[session]
+            if not g.members:
+                del self.shared[(group, filt)]
+            session.shared.discard((group, filt))
+        return True
+
+    # ------------------ Routing ------------------
+    def route(self, msg: _Message):
+        self.stats["messages_in"] += 1
+        if msg.retain:
+            if msg.payload:
+                self.retained[msg.topic] = msg
+            else:
+                self.retained.pop(msg.topic, None)
+
+        targets = self._match_cache.get(msg.topic)
+        if targets is None:
+            plain = [sub for filt, subs in self.subs.items() if topic_matches(filt, msg.topic)
+                     for sub in subs.values()]
+            groups = [g for (group, filt), g in self.shared.items() if topic_matches(filt, msg.topic)]
+            targets = self._match_cache[msg.topic] = (plain, groups)
+            if len(self._match_cache) > 10000:
+                self._match_cache.clear()
+
+        plain, groups = targets
+        seen = set()
+        for sub in plain:
+            s = sub.session
+            if s in seen or (sub.no_local and s is msg.sender):
+                continue  # overlapping filters: one copy, at the first match's QoS
+            seen.add(s)
+            s.deliver(msg, min(msg.qos, sub.qos), msg.retain and sub.rap)
+        for g in groups:
+            sub = g.pick()
+            if sub is not None:
+                sub.session.deliver(msg, min(msg.qos, sub.qos), False)
+
+    def _send_retained(self, filt, sub):
+        for topic, msg in list(self.retained.items()):
+            if topic_matches(filt, topic):
+                sub.session.deliver(msg, min(msg.qos, sub.qos), True)
+
+    def snapshot(self) -> dict:
+        return dict(self.stats, clients=len(self.sessions), retained=len(self.retained),
+                    subscriptions=sum(len(s) for s in self.subs.values())
+                    + sum(len(g.members) for g in self.shared.values()))
+
+
+# ------------------ Raw-socket throughput check ------------------
+def _raw_connect(port, client_id, version=4):
+    s = socket.create_connection(("127.0.0.1", port))
+    s.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    body = encode_str("MQTT") + bytes([version, 0x02]) + _U16.pack(60)
+    if version == 5:
+        body += b"\x00"
+    s.sendall(packet(CONNECT, 0, body + encode_str(client_id)))
+    s.recv(64)
+    return s
+
+
+def bench(n: int, qos: int, payload_size: int = 200, version: int = 4) -> dict:
+    broker = MiniBroker(port=0)
+    _, port = broker.start()
+    sub = _raw_connect(port, "bench-sub", version)
+    sub.sendall(packet(SUBSCRIBE, 0x02, _U16.pack(1) + (b"\x00" if version == 5 else b"")
+                       + encode_str("group_1/#") + bytes([qos])))
+    sub.recv(64)
+    pub = _raw_connect(port, "bench-pub", version)
+
+    received = [0]
+
+    def drain():
+        # counts PUBLISH packets in the subscriber stream and acks QoS 1
+        buf = bytearray()
+        while received[0] < n:
+            data = sub.recv(1 << 20)
+            if not data:
+                return
+            buf += data
+            pos, acks = 0, []
+            try:
+                while len(buf) - pos >= 2:
+                    length, body = decode_varint(buf, pos + 1)
+                    if body + length > len(buf):
+                        break
+                    if buf[pos] >> 4 == PUBLISH:
+                        received[0] += 1
+                        if (buf[pos] >> 1) & 0x03:
+                            tlen = _U16.unpack_from(buf, body)[0]
+                            acks.append(packet(PUBACK, 0, bytes(buf[body + 2 + tlen:body + 4 + tlen])))
+                    pos = body + length
+            except IndexError:
+                pass
+            del buf[:pos]
+            if acks:
+                sub.sendall(b"".join(acks))
+
+    reader = threading.Thread(target=drain, daemon=True)
+    reader.start()
+
+    def discard_acks():
+        try:
+            while pub.recv(1 << 20):
+                pass
+        except OSError:
+            pass
+
+    threading.Thread(target=discard_acks, daemon=True).start()
+    topic = encode_str("group_1/temp")
+    payload = b"x" * payload_size
+    chunk = []
+    t0 = time.perf_counter()
+    for i in range(n):
+        if qos:
+            body = topic + _U16.pack(i % 65535 + 1) + (b"\x00" if version == 5 else b"") + payload
+        else:
+            body = topic + (b"\x00" if version == 5 else b"") + payload
+        chunk.append(packet(PUBLISH, qos << 1, body))
+        if len(chunk) >= 500:
+            pub.sendall(b"".join(chunk))
+            chunk = []
+    if chunk:
+        pub.sendall(b"".join(chunk))
+    reader.join(120)
+    elapsed = time.perf_counter() - t0
+    stats = broker.snapshot()
+    pub.close()
+    sub.close()
+    broker.stop()
+    return {"messages": n, "qos": qos, "mqtt_version": version, "payload_bytes": payload_size,
+            "received": received[0], "seconds": round(elapsed, 3),
+            "msgs_per_s": round(received[0] / elapsed, 1), "broker": stats}
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Minimal MQTT 3.1.1/5 broker for offline runs and benchmarks")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=1883)
+    ap.add_argument("--bench", type=int, metavar="N", help="publish N messages through a private broker and exit")
+    ap.add_argument("--qos", type=int, default=1, choices=(0, 1), help="QoS for --bench (default: 1)")
+    ap.add_argument("--mqtt-version", type=int, default=4, choices=(4, 5), help="protocol level for --bench")
+    ap.add_argument("--json", help="write --bench results to this JSON file")
+    args = ap.parse_args()
+
+    if args.bench:
+        result = bench(args.bench, args.qos, version=args.mqtt_version)
+        print(f"[BROKER] {result['received']}/{result['messages']} messages (QoS {result['qos']}) "
+              f"in {result['seconds']}s: {result['msgs_per_s']:.0f} msgs/s")
+        if args.json:
+            import json
+            with open(args.json, "w") as f:
+                json.dump(result, f, indent=2)
+        return 0
+
+    broker = MiniBroker(args.host, args.port)
+    try:
+        asyncio.run(broker.serve_forever())
+    except KeyboardInterrupt:
+        print(f"[BROKER] Stopped: {broker.snapshot()}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
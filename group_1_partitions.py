@@ -0,0 +1,219 @@
+# group_1_partitions.py
+import re
+import time
+import threading
+
+from group_1_db_pool import get_pool
+
+REGISTRY_SQL = '''
+    CREATE TABLE IF NOT EXISTS partitions (
+        name TEXT PRIMARY KEY,
+        base TEXT NOT NULL,
+        start_ts REAL NOT NULL,
+        end_ts REAL NOT NULL
+    )
+'''
+
+_CREATE_TABLE_RE = re.compile(r'^\s*CREATE\s+TABLE\s+(IF\s+NOT\s+EXISTS\s+)?["`\[]?\w+["`\]]?', re.I)
+_CREATE_INDEX_RE = re.compile(
+    r'^\s*CREATE\s+(UNIQUE\s+)?INDEX\s+(IF\s+NOT\s+EXISTS\s+)?["`\[]?(\w+)["`\]]?\s+ON\s+["`\[]?\w+["`\]]?\s*\(',
+    re.I
+)
+
+
+def install(conn, bases):
+    """
+    Create the partition registry and register each existing base table as the
+    "legacy" partition covering everything written before partitioning started.
+    Safe to call on every startup.
+    """
+    conn.execute(REGISTRY_SQL)
+    now = time.time()
+    for base in bases:
+        conn.execute('''
+            INSERT OR IGNORE INTO partitions (name, base, start_ts, end_ts)
+            VALUES (?, ?, 0, ?)
+        ''', (base, base, now))
+
+
+class PartitionManager:
+    """
+    Time-partitioned tables (one table per period, default one day):
+    - Inserts are routed to <base>_p<YYYYMMDD> by timestamp; partitions are cloned
+      from the base table's DDL and indexes the first time they are needed
+    - Reads list only the partitions overlapping the requested range
+    - Retention drops whole expired partitions instead of DELETE-ing rows
+    - Row ids stay unique across partitions (each new one continues the id sequence)
+    """
+    def __init__(self, db_path: str, period_s: float = 86400):
+        self.db_path = db_path
+        self.period = float(period_s)
+        self._routes = {}
+        self._lock = threading.Lock()
+
+    # ------------------ Writes ------------------
+    def route(self, base: str, ts: float) -> str:
+        """Name of the partition that stores a `base` row with timestamp `ts`."""
+        key = (base, int(ts // self.period))
+        name = self._routes.get(key)
+        if name is None:
+            with self._lock:
+                name = self._routes.get(key)
+                if name is None:
+                    start = key[1] * self.period
+                    name = self._partition_name(base, start)
+                    with get_pool(self.db_path).connection() as conn:
+                        self._create(conn, base, name, start, start + self.period)
+                    self._routes[key] = name
+        return name
+
+    def drop_expired(self, conn, base: str, cutoff: float) -> list:
+        """Drop every `base` partition whose whole range is older than cutoff."""
+        rows = conn.execute('''
+            SELECT name FROM partitions
+            WHERE base = ? AND end_ts > start_ts AND end_ts <= ?
+        ''', (base, cutoff)).fetchall()
+        dropped = []
+        for (name,) in rows:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                if name == base:
+                    # legacy rows live in the template table itself: recreate it empty
+                    table_sql, index_sqls = self._ddl(conn, base)
+                    conn.execute(f"DROP TABLE {base}")
+                    conn.execute(table_sql)
+                    for sql in index_sqls:
+                        conn.execute(sql)
+                    conn.execute("UPDATE partitions SET start_ts = 0, end_ts = 0 WHERE name = ?", (name,))
+                else:
+                    conn.execute(f"DROP TABLE IF EXISTS {name}")
+                    conn.execute("DELETE FROM partitions WHERE name = ?", (name,))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            dropped.append(name)
+
+        if dropped:
+            with self._lock:
+                self._routes = {k: v for k, v in self._routes.items() if v not in dropped}
+        return dropped
+
+    # ------------------ Reads ------------------
+    def tables_for_range(self, conn, base: str, since=None, until=None) -> list:
+        """Partitions of `base` overlapping [since, until], newest first."""
+        rows = conn.execute('''
+            SELECT name FROM partitions
+            WHERE base = ? AND end_ts > start_ts
+              AND (? IS NULL OR end_ts > ?)
+              AND (? IS NULL OR start_ts <= ?)
+            ORDER BY end_ts DESC, start_ts DESC
+        ''', (base, since, since, until, until)).fetchall()
+        return [r[0] for r in rows]
+
+    def source(self, conn, base: str, since=None, until=None) -> str:
+        """FROM-clause fragment spanning the partitions that overlap the range."""
+        names = self.tables_for_range(conn, base, since, until)
+        if not names:
+            return base
+        if len(names) == 1:
+            return names[0]
+        union = " UNION ALL ".join(f"SELECT * FROM {n}" for n in names)
+        return f"({union}) AS {base}"
+
+    def fetch_newest(self, conn, base: str, where: str = "1=1", params=(), limit: int = 200,
+                     since=None, until=None, before=None):
+        """
+        Newest-first rows (ORDER BY ts DESC, id DESC) across partitions without a
+        full UNION: partitions are visited newest first and the walk stops once the
+        remaining ones end before the oldest row we are keeping.
+        `before=(ts, id)` is a keyset cursor: only rows strictly older than it are
+        returned, seeking on the ts index instead of skipping with OFFSET.
+        """
+        limit = max(0, int(limit))
+        rows = []
+        if before is not None:
+            before_ts, before_id = before
+            # ts <= ? is the index range; the OR only breaks ties on the same ts
+            where = f"({where}) AND ts <= ? AND (ts < ? OR id < ?)"
+            params = (*params, before_ts, before_ts, before_id)
+            until = before_ts if until is None else min(until, before_ts)
+        bounds = conn.execute('''
+            SELECT name, end_ts FROM partitions
+            WHERE base = ? AND end_ts > start_ts
+              AND (? IS NULL OR end_ts > ?)
+              AND (? IS NULL OR start_ts <= ?)
+            ORDER BY end_ts DESC, start_ts DESC
+        ''', (base, since, since, until, until)).fetchall()
+        for name, end_ts in bounds:
+            if len(rows) >= limit and end_ts <= rows[-1]["ts"]:
+                break
+            rows.extend(conn.execute(
+                f"SELECT * FROM {name} WHERE {where} ORDER BY ts DESC, id DESC LIMIT ?",
+                (*params, limit)
+            ).fetchall())
+            rows.sort(key=lambda r: (r["ts"], r["id"]), reverse=True)
+            del rows[limit:]
+        return rows
+
+    # ------------------ Internal ------------------
+    def _partition_name(self, base: str, start: float) -> str:
+        fmt = "%Y%m%d" if self.period % 86400 == 0 else "%Y%m%d_%H%M"
+        try:
+            stamp = time.strftime(fmt, time.gmtime(start))
+        except (OverflowError, OSError, ValueError):
+            stamp = ""
+        # names go into SQL unquoted: refuse anything that is not a plain identifier (year < 0, ...)
+        if not stamp.replace("_", "").isdigit():
+            raise ValueError(f"timestamp {start} is outside the partitionable range")
+        return f"{base}_p{stamp}"
+
+    def _ddl(self, conn, base: str):
+        row = conn.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (base,)).fetchone()
+        if row is None:
+            raise ValueError(f"no base table {base!r} to partition")
+        index_sqls = [r[0] for r in conn.execute('''
+            SELECT sql FROM sqlite_master
+            WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL
+        ''', (base,)).fetchall()]
+        return row[0], index_sqls
+
+    def _create(self, conn, base: str, name: str, start: float, end: float):
+        table_sql, index_sqls = self._ddl(conn, base)
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(_CREATE_TABLE_RE.sub(f"CREATE TABLE IF NOT EXISTS {name}", table_sql, count=1))
+            for sql in index_sqls:
+                conn.execute(_CREATE_INDEX_RE.sub(
+                    lambda m: f"CREATE {m.group(1) or ''}INDEX IF NOT EXISTS {m.group(3)}__{name} ON {name}(",
+                    sql, count=1
+                ))
+            inserted = conn.execute('''
+                INSERT OR IGNORE INTO partitions (name, base, start_ts, end_ts)
+                VALUES (?, ?, ?, ?)
+            ''', (name, base, start, end)).rowcount
+            if inserted:
+                # continue the id sequence so (ts, id) stays unique across partitions
+                seq = conn.execute('''
+                    SELECT MAX(seq) FROM sqlite_sequence
+                    WHERE name IN (SELECT name FROM partitions WHERE base = ?)
+                ''', (base,)).fetchone()[0]
+                if seq:
+                    conn.execute("INSERT INTO sqlite_sequence (name, seq) VALUES (?, ?)", (name, seq))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+
+_managers = {}
+_managers_lock = threading.Lock()
+
+
+def get_partitions(db_path: str, period_s: float = 86400) -> PartitionManager:
+    """Process-wide partition manager per database file; the first caller's period wins."""
+    with _managers_lock:
+        mgr = _managers.get(db_path)
+        if mgr is None:
+            mgr = _managers[db_path] = PartitionManager(db_path, period_s)
+        return mgr
@@ -1,3 +1,4 @@
+import os
 import sys
 import json
 import time
@@ -10,7 +11,12 @@ from typing import Optional
 
 import paho.mqtt.client as mqtt
 
+import group_1_codec as codec
+
 from group_1_data_generator import DataGenerator
+from group_1_inflight import InflightTracker
+from group_1_scheduler import Ticker, MIN_INTERVAL, POLICIES
+from group_1_spool import Spool
 from group_1_util import MessagePackager
 from group_1_publisher_ui import setup_style, build_ui
 
@@ -30,8 +36,9 @@ def load_config(path="group_1_config.json"):
 CFG = load_config()
 
 # ------------------ MQTT + app config (defaults if not in config file) ------------------
-BROKER = CFG.get("mqtt", {}).get("broker", "broker.hivemq.com")
-PORT = CFG.get("mqtt", {}).get("port", 1883)
+# GROUP1_MQTT_BROKER / GROUP1_MQTT_PORT override the config (e.g. a local group_1_mini_broker.py)
+BROKER = os.environ.get("GROUP1_MQTT_BROKER") or CFG.get("mqtt", {}).get("broker", "broker.hivemq.com")
+PORT = int(os.environ.get("GROUP1_MQTT_PORT") or CFG.get("mqtt", {}).get("port", 1883))
 KEEPALIVE = CFG.get("mqtt", {}).get("keepalive", 5)
 QOS = CFG.get("mqtt", {}).get("qos", 1)
 
@@ -39,7 +46,45 @@ TOPIC_DATA = CFG.get("mqtt", {}).get("topics", {}).get("data", "group_1/temp")
 TOPIC_STATUS = CFG.get("mqtt", {}).get("topics", {}).get("status", "group_1/status")
 
 PUBLISH_INTERVAL = CFG.get("publish", {}).get("interval", 2)
+if PUBLISH_INTERVAL < MIN_INTERVAL:
+    print(f"[CONFIG] publish.interval {PUBLISH_INTERVAL}s is below {MIN_INTERVAL}s, using {MIN_INTERVAL}s")
+    PUBLISH_INTERVAL = MIN_INTERVAL
+# what happens to ticks missed by a stalled loop: skip | catch_up (group_1_scheduler)
+TICK_POLICY = CFG.get("publish", {}).get("tick_policy", "skip")
+MAX_CATCH_UP = CFG.get("publish", {}).get("max_catch_up", 10)
+if TICK_POLICY not in POLICIES:
+    print(f"[CONFIG] Unknown publish.tick_policy {TICK_POLICY!r}, using skip")
+    TICK_POLICY = "skip"
+# sub-second intervals: log one sent message per second instead of every one
+LOG_EVERY = max(1, round(1 / PUBLISH_INTERVAL))
+
+# wire format of data readings: json | struct | msgpack (group_1_codec)
+PAYLOAD_FORMAT = CFG.get("publish", {}).get("format", "json")
+LOCATION_EVERY = CFG.get("publish", {}).get("location_every", 30)
+# batching: up to max_readings readings (or max_ms of them) per MQTT message; 1 = off
+BATCH_CFG = CFG.get("publish", {}).get("batch", {})
+BATCH_MAX_READINGS = max(1, int(BATCH_CFG.get("max_readings", 1)))
+BATCH_MAX_MS = float(BATCH_CFG.get("max_ms", 10000))
+# non-blocking publishes: at most max_inflight unacknowledged messages, readings are
+# held back (and later sent as one batch) while the window is full
+MAX_INFLIGHT = CFG.get("publish", {}).get("max_inflight", 20)
+ACK_TIMEOUT = CFG.get("publish", {}).get("ack_timeout", 30)
+MAX_HELD = CFG.get("publish", {}).get("max_held", 1000)
+ACK_REPORT_EVERY = 30  # seconds between ack latency lines on the console
+# store-and-forward: readings taken while disconnected are spooled to disk and
+# replayed (batched, oldest first) once connected; false keeps the old skip
+SPOOL_CFG = CFG.get("spool", {})
+SPOOL_ENABLED = SPOOL_CFG.get("enabled", True)
+SPOOL_PATH = SPOOL_CFG.get("path", "group_1_spool_{device_id}.db")
+SPOOL_MAX_READINGS = SPOOL_CFG.get("max_readings", 100000)
+SPOOL_DRAIN_RATE = float(SPOOL_CFG.get("drain_rate", 200))  # readings/s
+SPOOL_BATCH = max(1, int(SPOOL_CFG.get("batch", 50)))
+if not codec.available(PAYLOAD_FORMAT):
+    print(f"[CONFIG] Payload format {PAYLOAD_FORMAT!r} not available, using json")
+    PAYLOAD_FORMAT = codec.JSON
 DEFAULT_MISS_RATE = CFG.get("publish", {}).get("miss_rate", 0.02)
+# seeded signal (per device) for repeatable demos; null = different every run
+SIGNAL_SEED = CFG.get("publish", {}).get("seed")
 
 BLACKOUT_CFG = CFG.get("publish", {}).get("blackout", {})
 DEFAULT_BLACKOUT_CHANCE = BLACKOUT_CFG.get("chance", 0.03)
@@ -69,8 +114,25 @@ class TemperaturePublisher:
         # device info
         self.device_id = DEVICE_ID
         self.location = LOCATION
-        self.generator = DataGenerator()
-        self.packager = MessagePackager(self.device_id, self.location)
+        self.generator = DataGenerator(seed=None if SIGNAL_SEED is None else f"{SIGNAL_SEED}-{DEVICE_ID}")
+        self.packager = MessagePackager(self.device_id, self.location, PAYLOAD_FORMAT, LOCATION_EVERY)
+        self.publish_props = codec.publish_properties(PAYLOAD_FORMAT)
+        self.pending = []  # (counter, timestamp, value) waiting for the next batched message
+        self.pending_lock = threading.Lock()
+        self.inflight = InflightTracker(MAX_INFLIGHT, ACK_TIMEOUT)
+        self.dropped = 0  # held readings given up when more than MAX_HELD piled up
+        self._last_ack_report = time.monotonic()
+        self.ticker: Optional[Ticker] = None
+
+        # store-and-forward spool (continues the packet counter after any spooled readings)
+        self.spool: Optional[Spool] = None
+        self.drain_ticker: Optional[Ticker] = None
+        if SPOOL_ENABLED:
+            self.spool = Spool(SPOOL_PATH.format(device_id=self.device_id), SPOOL_MAX_READINGS)
+            self.packager.counter = self.spool.last_counter
+            if self.spool.pending:
+                print(f"[{self.device_id}] {self.spool.pending} spooled readings from a previous run to replay.")
+            threading.Thread(target=self.drain_loop, daemon=True).start()
 
         # MQTT state
         self.client: Optional[mqtt.Client] = None
@@ -136,8 +198,10 @@ class TemperaturePublisher:
         })
         self.client.will_set(TOPIC_STATUS, lwt_payload, qos=1, retain=True)
 
+        self.client.max_inflight_messages_set(MAX_INFLIGHT)
         self.client.on_connect = self.on_connect
         self.client.on_disconnect = self.on_disconnect
+        self.client.on_publish = self.on_publish
 
     # ---- helper to publish status (ONLINE / OFFLINE / STOPPED) ----
     def publish_status(self, status: str):
@@ -149,7 +213,9 @@ class TemperaturePublisher:
                     "status": status
                 })
                 # retain so subscribers always see the latest state
-                self.client.publish(TOPIC_STATUS, payload, qos=1, retain=True)
+                info = self.client.publish(TOPIC_STATUS, payload, qos=1, retain=True)
+                if info.rc == mqtt.MQTT_ERR_SUCCESS:
+                    self.inflight.sent(info.mid, 0)
         except Exception as e:
             print(f"[{self.device_id}] Failed to publish status '{status}': {e}")
 
@@ -189,6 +255,10 @@ class TemperaturePublisher:
             print(f"[{self.device_id}] Connected: reason_code={reason_code}")
             self.reconnecting = False
 
+            # replay batches still waiting for an ack from before the drop are sent again
+            if self.spool and self.spool.requeue():
+                print(f"[{self.device_id}] Re-sending unacknowledged spool batches.")
+
             # ONLINE status (retained)
             self.publish_status("ONLINE")
         else:
@@ -216,6 +286,12 @@ class TemperaturePublisher:
             t.daemon = True
             t.start()
 
+    # MQTT on_publish callback: PUBACK received (QoS 1) or message written (QoS 0)
+    def on_publish(self, client, userdata, mid, reason_code=None, properties=None):
+        self.inflight.acked(mid)
+        if self.spool:
+            self.spool.acked(mid)
+
     # ------------------------ Start/Stop -------------------------
     def start_publishing(self):
         if not self.connected and not self.manual_offline:
@@ -247,6 +323,11 @@ class TemperaturePublisher:
 
     def stop_publishing(self):
         self.running = False
+        if self.ticker:
+            self.ticker.stop()
+        # a partial batch goes out before STOPPED (subscribers ignore data after it)
+        if self.pending and self.connected:
+            self.publish_batch()
         self.start_btn.config(state=NORMAL)
         self.stop_btn.config(state=DISABLED)
         self.ui_status("Status: Stopped")
@@ -256,14 +337,24 @@ class TemperaturePublisher:
 
     # ----------------------- Publish loop with blackout bursts -----------------------
     def publish_loop(self):
-        while self.running:
-            time.sleep(PUBLISH_INTERVAL)
-
+        # deadlines are absolute, so publish/ack work does not stretch the period
+        ticker = self.ticker = Ticker(PUBLISH_INTERVAL, TICK_POLICY, MAX_CATCH_UP)
+        while self.running and ticker.wait():
             if self.block_publishing:
                 continue
 
             if not self.connected:
-                print(f"[{self.device_id}] Not connected, skipping this cycle.")
+                if self.spool is None:
+                    print(f"[{self.device_id}] Not connected, skipping this cycle.")
+                    continue
+                # keep the reading (and any held back by the window) for replay
+                value = self.generator.get_value()
+                with self.pending_lock:
+                    held, self.pending = self.pending, []
+                held.append(self.packager.reading(value, ticker.due_time()))
+                self.spool.extend(held)
+                if self.packager.counter % LOG_EVERY == 0:
+                    print(f"[{self.device_id}] Not connected, spooled reading ({self.spool.pending} in spool).")
                 continue
 
             if self.blackout_active:
@@ -283,17 +374,95 @@ class TemperaturePublisher:
                 continue
 
             value = self.generator.get_value()
-            payload = self.packager.package(value)
-            info = self.client.publish(TOPIC_DATA, payload, qos=QOS)
-
-            if info.rc == mqtt.MQTT_ERR_SUCCESS:
-                info.wait_for_publish(timeout=3)
-                if info.is_published():
-                    print(f"[{self.device_id}] Published: {payload}")
-                else:
-                    print(f"[{self.device_id}] Publish not acknowledged (likely offline).")
-            else:
-                print(f"[{self.device_id}] Publish failed with rc={info.rc}")
+            expired = self.inflight.expire()
+            if expired and self.spool is not None:
+                # no ack coming for these: replay their spooled readings instead of stalling
+                self.spool.requeue(expired)
+            self.report_acks()
+            if self.spool is not None and self.spool.pending:
+                # older readings are still being replayed: queue behind them to keep counter order
+                self.spool.append(self.packager.reading(value, ticker.due_time()))
+                continue
+            if BATCH_MAX_READINGS > 1 or self.pending or not self.inflight.has_room():
+                with self.pending_lock:
+                    self.pending.append(self.packager.reading(value, ticker.due_time()))
+                    if len(self.pending) > MAX_HELD:
+                        del self.pending[0]
+                        self.dropped += 1
+                    age_ms = (time.time() - self.pending[0][1]) * 1000.0
+                    due = len(self.pending) >= BATCH_MAX_READINGS or age_ms >= BATCH_MAX_MS
+                if not self.inflight.has_room():
+                    print(f"[{self.device_id}] In-flight window full ({self.inflight.unacked} unacked), "
+                          f"holding {len(self.pending)} readings.")
+                    continue
+                if due:
+                    self.publish_batch()
+                continue
+
+            payload = self.packager.package(value, ticker.due_time())
+            shown = payload if PAYLOAD_FORMAT == codec.JSON else f"{PAYLOAD_FORMAT}, {len(payload)} bytes"
+            self.publish_data(payload, shown)
+
+    def publish_batch(self):
+        with self.pending_lock:
+            readings, self.pending = self.pending, []
+        if not readings:
+            return
+        payload = self.packager.package_batch(readings)
+        self.publish_data(payload, f"batch of {len(readings)} (seq {readings[0][0]}-{readings[-1][0]}, "
+                                   f"{PAYLOAD_FORMAT}, {len(payload)} bytes)", len(readings))
+
+    # never waits for the PUBACK: on_publish settles it in the in-flight tracker
+    def publish_data(self, payload, shown, readings=1):
+        """Returns the message id, or None when paho could not queue the message."""
+        info = self.client.publish(TOPIC_DATA, payload, qos=QOS, properties=self.publish_props)
+
+        if info.rc == mqtt.MQTT_ERR_SUCCESS:
+            self.inflight.sent(info.mid, readings)
+            if readings > 1 or self.packager.counter % LOG_EVERY == 0:
+                print(f"[{self.device_id}] Sent: {shown} ({self.inflight.unacked} unacked)")
+            return info.mid
+        print(f"[{self.device_id}] Publish failed with rc={info.rc}")
+        return None
+
+    # ----------------------- Spool replay -----------------------
+    def drain_loop(self):
+        # at least twice the live rate, so the backlog shrinks while live readings queue behind it
+        rate = max(SPOOL_DRAIN_RATE, 2.0 / PUBLISH_INTERVAL)
+        ticker = self.drain_ticker = Ticker(max(MIN_INTERVAL, SPOOL_BATCH / rate))
+        replaying = False
+        while ticker.wait():
+            if not self.connected or self.manual_offline or not self.inflight.has_room():
+                continue
+            if not self.spool.unsent:
+                if replaying and not self.spool.pending:
+                    replaying = False
+                    s = self.spool.stats()
+                    print(f"[{self.device_id}] Spool drained ({s['replayed']} replayed, {s['evicted']} evicted).")
+                continue
+            replaying = True
+            self.spool.send_batch(self.publish_spooled, SPOOL_BATCH)
+
+    def publish_spooled(self, readings):
+        payload = self.packager.package_batch(readings)
+        return self.publish_data(payload, f"replay of {len(readings)} (seq {readings[0][0]}-{readings[-1][0]}, "
+                                          f"{self.spool.pending} in spool)", len(readings))
+
+    def report_acks(self):
+        now = time.monotonic()
+        if now - self._last_ack_report < ACK_REPORT_EVERY:
+            return
+        self._last_ack_report = now
+        s = self.inflight.stats()
+        lat = s["ack_latency"]
+        print(f"[{self.device_id}] Acks: {s['acked']}/{s['sent']} acked, {s['unacked']} unacked "
+              f"(window {s['window']}), ack p50 {lat['p50_ms']} ms / p99 {lat['p99_ms']} ms, "
+              f"{s['expired']} expired, {self.dropped} held readings dropped")
+        if self.ticker:
+            t = self.ticker.stats()
+            print(f"[{self.device_id}] Ticks: {t['ticks']} every {t['interval']}s, lateness p99 "
+                  f"{t['lateness']['p99_ms']} ms, {t['overruns']} overruns, {t['skipped']} skipped, "
+                  f"{t['caught_up']} caught up ({t['policy']})")
 
     def start_blackout(self):
         self.blackout_active = True
@@ -365,6 +534,12 @@ class TemperaturePublisher:
             try: self.client.disconnect()
             except Exception: pass
 
+        # unacknowledged spooled readings stay on disk for the next run
+        if self.spool:
+            if self.drain_ticker:
+                self.drain_ticker.stop()
+            self.spool.close()
+
         self.master.destroy()
 
 
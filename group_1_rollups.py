@@ -0,0 +1,298 @@
+# group_1_rollups.py
+import math
+import time
+import threading
+
+# (table, bucket size in seconds), coarsest first
+LEVELS = (
+    ("rollup_1d", 86400),
+    ("rollup_1h", 3600),
+    ("rollup_1m", 60),
+)
+
+_FIELDS = ("count", "temp_count", "sum", "min", "max", "invalid_count", "schema_invalid_count", "anomaly_count")
+
+_UPSERT = '''
+    INSERT INTO {table} (device_id, bucket_ts, count, temp_count, sum, min, max,
+                         invalid_count, schema_invalid_count, anomaly_count)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(device_id, bucket_ts) DO UPDATE SET
+        count = count + excluded.count,
+        temp_count = temp_count + excluded.temp_count,
+        sum = sum + excluded.sum,
+        min = min(coalesce(min, excluded.min), coalesce(excluded.min, min)),
+        max = max(coalesce(max, excluded.max), coalesce(excluded.max, max)),
+        invalid_count = invalid_count + excluded.invalid_count,
+        schema_invalid_count = schema_invalid_count + excluded.schema_invalid_count,
+        anomaly_count = anomaly_count + excluded.anomaly_count
+'''
+
+
+# ------------------ Schema ------------------
+def create_tables(conn):
+    for table, _ in LEVELS:
+        conn.execute(f'''
+            CREATE TABLE IF NOT EXISTS {table} (
+                device_id TEXT NOT NULL,
+                bucket_ts REAL NOT NULL,
+                count INTEGER NOT NULL DEFAULT 0,
+                temp_count INTEGER NOT NULL DEFAULT 0,
+                sum REAL NOT NULL DEFAULT 0,
+                min REAL,
+                max REAL,
+                invalid_count INTEGER NOT NULL DEFAULT 0,
+                schema_invalid_count INTEGER NOT NULL DEFAULT 0,
+                anomaly_count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (device_id, bucket_ts)
+            ) WITHOUT ROWID
+        ''')
+        conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_bucket ON {table}(bucket_ts)")
+
+
+def backfill(conn, message_tables, anomaly_tables):
+    """Build the rollups from rows already stored (one-off, at install time)."""
+    for table, size in LEVELS:
+        for src in message_tables:
+            conn.execute(f'''
+                INSERT INTO {table} (device_id, bucket_ts, count, temp_count, sum, min, max,
+                                     invalid_count, schema_invalid_count, anomaly_count)
+                SELECT device_id, CAST(ts / {size} AS INTEGER) * {size},
+                       COUNT(*), COUNT(core_temp), TOTAL(core_temp), MIN(core_temp), MAX(core_temp),
+                       SUM(CASE WHEN valid = 0 THEN 1 ELSE 0 END),
+                       SUM(CASE WHEN schema_ok = 0 THEN 1 ELSE 0 END), 0
+                FROM {src}
+                WHERE device_id IS NOT NULL AND ts IS NOT NULL
+                GROUP BY 1, 2
+                ON CONFLICT(device_id, bucket_ts) DO UPDATE SET
+                    count = count + excluded.count,
+                    temp_count = temp_count + excluded.temp_count,
+                    sum = sum + excluded.sum,
+                    min = min(coalesce(min, excluded.min), coalesce(excluded.min, min)),
+                    max = max(coalesce(max, excluded.max), coalesce(excluded.max, max)),
+                    invalid_count = invalid_count + excluded.invalid_count,
+                    schema_invalid_count = schema_invalid_count + excluded.schema_invalid_count
+            ''')
+        for src in anomaly_tables:
+            conn.execute(f'''
+                INSERT INTO {table} (device_id, bucket_ts, anomaly_count)
+                SELECT device_id, CAST(ts / {size} AS INTEGER) * {size}, COUNT(*)
+                FROM {src}
+                WHERE device_id IS NOT NULL AND ts IS NOT NULL
+                GROUP BY 1, 2
+                ON CONFLICT(device_id, bucket_ts) DO UPDATE SET
+                    anomaly_count = anomaly_count + excluded.anomaly_count
+            ''')
+
+
+# ------------------ Ingest ------------------
+def _empty():
+    return [0, 0, 0.0, None, None, 0, 0, 0]
+
+
+def _add_message(acc, core_temp, valid, schema_ok):
+    acc[0] += 1
+    if core_temp is not None:
+        acc[1] += 1
+        acc[2] += core_temp
+        acc[3] = core_temp if acc[3] is None or core_temp < acc[3] else acc[3]
+        acc[4] = core_temp if acc[4] is None or core_temp > acc[4] else acc[4]
+    if not valid:
+        acc[5] += 1
+    if not schema_ok:
+        acc[6] += 1
+
+
+def _merge(acc, other):
+    acc[0] += other[0]
+    acc[1] += other[1]
+    acc[2] += other[2]
+    if other[3] is not None and (acc[3] is None or other[3] < acc[3]):
+        acc[3] = other[3]
+    if other[4] is not None and (acc[4] is None or other[4] > acc[4]):
+        acc[4] = other[4]
+    acc[5] += other[5]
+    acc[6] += other[6]
+    acc[7] += other[7]
+
+
+def apply(conn, minute_deltas):
+    """Upsert {(device_id, minute_ts): acc} into every rollup level."""
+    for table, size in LEVELS:
+        if size == 60:
+            deltas = minute_deltas
+        else:
+            deltas = {}
+            for (device_id, bucket), acc in minute_deltas.items():
+                key = (device_id, (bucket // size) * size)
+                _merge(deltas.setdefault(key, _empty()), acc)
+        conn.executemany(_UPSERT.format(table=table), [
+            (device_id, bucket, *acc) for (device_id, bucket), acc in deltas.items()
+        ])
+
+
+class RollupAccumulator:
+    """
+    In-memory per-device/per-minute deltas collected on the ingest path.
+    The write-behind writer calls flush() inside its transaction, so the
+    rollups are committed together with the raw rows they summarize.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = {}
+
+    def add_message(self, device_id, ts, core_temp, valid, schema_ok):
+        if device_id is None:
+            return
+        key = (device_id, (int(ts) // 60) * 60)
+        with self._lock:
+            acc = self._pending.get(key)
+            if acc is None:
+                acc = self._pending[key] = _empty()
+            _add_message(acc, core_temp, valid, schema_ok)
+
+    def add_anomaly(self, device_id, ts):
+        if device_id is None:
+            return
+        key = (device_id, (int(ts) // 60) * 60)
+        with self._lock:
+            acc = self._pending.get(key)
+            if acc is None:
+                acc = self._pending[key] = _empty()
+            acc[7] += 1
+
+    def flush(self, conn):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return
+        try:
+            apply(conn, pending)
+        except Exception:
+            # keep the deltas for the next transaction
+            with self._lock:
+                for key, acc in pending.items():
+                    _merge(self._pending.setdefault(key, _empty()), acc)
+            raise
+
+
+# ------------------ Queries ------------------
+def plan(since, until):
+    """
+    Split [since, until) into pieces answered by the coarsest rollup whose
+    buckets fit entirely inside, with raw rows only for the sub-minute edges.
+    Returns [(table or "raw", start, end), ...].
+    """
+    pieces = []
+
+    def cover(a, b, levels):
+        if a >= b:
+            return
+        if not levels:
+            pieces.append(("raw", a, b))
+            return
+        table, size = levels[0]
+        first = math.ceil(a / size) * size
+        last = math.floor(b / size) * size
+        if first < last:
+            cover(a, first, levels[1:])
+            pieces.append((table, first, last))
+            cover(last, b, levels[1:])
+        else:
+            cover(a, b, levels[1:])
+
+    cover(since, until, LEVELS)
+    return pieces
+
+
+def stats(conn, partitions, device_id=None, since=None, until=None) -> dict:
+    """COUNT/AVG/MIN/MAX/invalid/anomaly totals for a device (or the fleet) over a range."""
+    since = 0.0 if since is None else float(since)
+    until = time.time() if until is None else float(until)
+    total = _empty()
+    dev_sql = " AND device_id = ?" if device_id else ""
+    dev_params = (device_id,) if device_id else ()
+
+    pieces = plan(since, until)
+    for i, (table, a, b) in enumerate(pieces):
+        # the last piece keeps the original inclusive upper bound (ts <= until)
+        upper = "ts <= ?" if i == len(pieces) - 1 else "ts < ?"
+        if table == "raw":
+            row = conn.execute(f'''
+                SELECT COUNT(*), COUNT(core_temp), TOTAL(core_temp), MIN(core_temp), MAX(core_temp),
+                       SUM(CASE WHEN valid = 0 THEN 1 ELSE 0 END),
+                       SUM(CASE WHEN schema_ok = 0 THEN 1 ELSE 0 END)
+                FROM {partitions.source(conn, "messages", a, b)}
+                WHERE ts >= ? AND {upper}{dev_sql}
+            ''', (a, b, *dev_params)).fetchone()
+            anomalies = conn.execute(f'''
+                SELECT COUNT(*) FROM {partitions.source(conn, "anomalies", a, b)}
+                WHERE ts >= ? AND {upper}{dev_sql}
+            ''', (a, b, *dev_params)).fetchone()[0]
+            _merge(total, [row[0], row[1], row[2], row[3], row[4], row[5] or 0, row[6] or 0, anomalies])
+        else:
+            row = conn.execute(f'''
+                SELECT TOTAL(count), TOTAL(temp_count), TOTAL(sum), MIN(min), MAX(max),
+                       TOTAL(invalid_count), TOTAL(schema_invalid_count), TOTAL(anomaly_count)
+                FROM {table}
+                WHERE bucket_ts >= ? AND bucket_ts < ?{dev_sql}
+            ''', (a, b, *dev_params)).fetchone()
+            _merge(total, [int(row[0]), int(row[1]), row[2], row[3], row[4],
+                           int(row[5]), int(row[6]), int(row[7])])
+
+    return {
+        "count": total[0],
+        "temp_count": total[1],
+        "avg": (total[2] / total[1]) if total[1] else None,
+        "min": total[3],
+        "max": total[4],
+        "invalid_count": total[5],
+        "schema_invalid_count": total[6],
+        "anomaly_count": total[7],
+    }
+
+
+def history(conn, device_id=None, since=None, until=None, points=300) -> dict:
+    """
+    Bucketed series for charts: the finest rollup level that yields at most
+    `points` buckets over the range (falls back to daily buckets).
+    """
+    until = time.time() if until is None else float(until)
+    since = until - 3600 if since is None else float(since)
+    span = max(1.0, until - since)
+    table, size = LEVELS[0]
+    for t, s in reversed(LEVELS):
+        if span / s <= points:
+            table, size = t, s
+            break
+
+    q = f'''
+        SELECT bucket_ts, TOTAL(count), TOTAL(temp_count), TOTAL(sum), MIN(min), MAX(max),
+               TOTAL(invalid_count), TOTAL(anomaly_count)
+        FROM {table}
+        WHERE bucket_ts >= ? AND bucket_ts <= ?
+    '''
+    params = [math.floor(since / size) * size, until]
+    if device_id:
+        q += " AND device_id = ?"
+        params.append(device_id)
+    q += " GROUP BY bucket_ts ORDER BY bucket_ts"
+
+    buckets = []
+    for r in conn.execute(q, params).fetchall():
+        buckets.append({
+            "ts": r[0],
+            "count": int(r[1]),
+            "avg": (r[3] / r[2]) if r[2] else None,
+            "min": r[4],
+            "max": r[5],
+            "invalid_count": int(r[6]),
+            "anomaly_count": int(r[7]),
+        })
+    return {"resolution_s": size, "buckets": buckets}
+
+
+def purge(conn, minute_cutoff, coarse_cutoff):
+    """Rollups are small; minute buckets follow raw retention, hourly/daily live longer."""
+    conn.execute("DELETE FROM rollup_1m WHERE bucket_ts < ?", (minute_cutoff,))
+    conn.execute("DELETE FROM rollup_1h WHERE bucket_ts < ?", (coarse_cutoff,))
+    conn.execute("DELETE FROM rollup_1d WHERE bucket_ts < ?", (coarse_cutoff,))
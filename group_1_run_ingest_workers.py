@@ -0,0 +1,59 @@
+# run_ingest_workers.py
+# Starts N shared-subscription ingest workers (group_1_ingest_worker.py) and
+# restarts any that exit unexpectedly. Set admin.shared_ingest.enabled in
+# group_1_config.json so the Flask server stops ingesting on its own and only
+# serves the database the workers write.
+import sys, subprocess, time, json, argparse
+
+def main():
+    with open("group_1_config.json") as f:
+        shared = json.load(f).get("admin", {}).get("shared_ingest", {})
+
+    ap = argparse.ArgumentParser(description="Run shared-subscription ingest workers")
+    ap.add_argument("-n", "--num", type=int, default=shared.get("workers", 2),
+                    help="number of ingest workers to start (default: admin.shared_ingest.workers)")
+    ap.add_argument("--max-backoff", type=float, default=30.0,
+                    help="longest wait before restarting a crashed worker, seconds (default: 30)")
+    args = ap.parse_args()
+    if not shared.get("enabled", False):
+        print("Warning: admin.shared_ingest.enabled is false; the admin server will also ingest.")
+
+    py = sys.executable
+    start = lambda i: subprocess.Popen([py, "group_1_ingest_worker.py", "--index", str(i)])
+    procs = [start(i) for i in range(args.num)]
+    backoff = [1.0] * args.num
+    restart_at = [None] * args.num
+    started_at = [time.time()] * args.num
+    print(f"Started {args.num} ingest workers. Press Ctrl+C to stop.")
+
+    try:
+        while True:
+            time.sleep(1)
+            now = time.time()
+            for i, p in enumerate(procs):
+                if p.poll() is None:
+                    # a worker that stayed up for a minute earns a fresh backoff
+                    if now - started_at[i] > 60:
+                        backoff[i] = 1.0
+                    continue
+                if restart_at[i] is None:
+                    restart_at[i] = now + backoff[i]
+                    print(f"Ingest worker {i} exited with {p.returncode}; restarting in {backoff[i]:.0f}s")
+                    backoff[i] = min(backoff[i] * 2, args.max_backoff)
+                elif now >= restart_at[i]:
+                    procs[i] = start(i)
+                    started_at[i] = now
+                    restart_at[i] = None
+    except KeyboardInterrupt:
+        # SIGTERM lets each worker unsubscribe and drain its queue into SQLite
+        for p in procs:
+            if p.poll() is None:
+                p.terminate()
+        for p in procs:
+            try:
+                p.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                p.kill()
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,41 @@
-import subprocess
+import sys
+import json
 import time
+import argparse
+import subprocess
+
+
+def load_device_ids(path="group_1_config.json"):
+    try:
+        with open(path, "r") as f:
+            return list(json.load(f).get("devices", {})) or ["dev001", "dev002", "dev003"]
+    except (OSError, ValueError):
+        return ["dev001", "dev002", "dev003"]
+
+
+ap = argparse.ArgumentParser(description="Launch the publishers for the configured devices",
+                             epilog="With --headless, every other option is passed to group_1_fleet_engine.py "
+                                    "(--devices, --connections, --duration, ...).")
+ap.add_argument("--headless", action="store_true",
+                help="run every device in this process (one event loop, shared MQTT connections) "
+                     "instead of one Tk window each")
+args, rest = ap.parse_known_args()
+
+if args.headless:
+    import group_1_fleet_engine
+    sys.argv = [group_1_fleet_engine.__file__] + rest
+    sys.exit(group_1_fleet_engine.main())
+elif rest:
+    ap.error(f"unrecognized arguments: {' '.join(rest)} (engine options need --headless)")
 
-# List of predefined device IDs
-device_ids = ["dev001", "dev002", "dev003"]
+# List of device IDs (from group_1_config.json)
+device_ids = load_device_ids()
 
 # Launch each publisher in a separate subprocess
 processes = []
 for dev_id in device_ids:
     print(f"Starting publisher for {dev_id}...")
-    process = subprocess.Popen(["python", "group_1_publisher.py", dev_id])
+    process = subprocess.Popen([sys.executable, "group_1_publisher.py", dev_id])
     processes.append(process)
     time.sleep(1)  # Optional: stagger the start time slightly
 
@@ -21,4 +48,4 @@ try:
 except KeyboardInterrupt:
     print("\nTerminating all publishers...")
     for p in processes:
-        p.terminate()
\ No newline at end of file
+        p.terminate()
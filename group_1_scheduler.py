@@ -0,0 +1,151 @@
+# group_1_scheduler.py
+# Fixed-rate publish ticks on absolute monotonic deadlines (start + n * interval).
+# A loop that sleeps `interval` after doing its work runs at interval + work time
+# and drifts; here the work only eats into the wait for the next deadline, so the
+# rate holds until the work itself is longer than the interval (10 ms is fine).
+#
+# When a tick is late by one or more whole intervals (GC pause, slow publish,
+# suspended laptop) the policy decides what happens to the missed deadlines:
+#   skip     -- drop them and carry on from the next future deadline (default)
+#   catch_up -- fire them back-to-back, at most max_catch_up, and drop the rest
+# Missed ticks never produce a reading, so they never consume a packet counter:
+# sequence gaps seen by the subscriber still mean messages lost in transit.
+#
+#   python group_1_scheduler.py --interval 0.01 --work-ms 3 --duration 5   # sleep loop vs Ticker
+import time
+import argparse
+import threading
+
+from group_1_latency import LogSketch
+
+SKIP = "skip"
+CATCH_UP = "catch_up"
+POLICIES = (SKIP, CATCH_UP)
+MIN_INTERVAL = 0.01  # 100 Hz
+
+
+class Ticker:
+    """
+    Drift-free periodic ticks for a publish thread:
+    - wait() blocks until the next deadline (False once stop() is called)
+    - due / due_time() give the deadline of the tick just fired (monotonic / wall clock),
+      so back-to-back catch-up readings keep their own sample times
+    - stats(): ticks, overruns, skipped and caught-up ticks, lateness quantiles
+    """
+    def __init__(self, interval: float, policy: str = SKIP, max_catch_up: int = 10):
+        if policy not in POLICIES:
+            raise ValueError(f"unknown tick policy {policy!r} (expected one of {POLICIES})")
+        self.policy = policy
+        self.max_catch_up = max(0, int(max_catch_up))
+        self.interval = self._check(interval)
+        self.due = None
+        self._next = None
+        self._owed = 0  # overdue deadlines still to fire (catch_up)
+        self._stop = threading.Event()
+        self.lateness = LogSketch()
+        self.counts = dict.fromkeys(("ticks", "overruns", "skipped", "caught_up"), 0)
+
+    @staticmethod
+    def _check(interval):
+        interval = float(interval)
+        if interval < MIN_INTERVAL:
+            raise ValueError(f"tick interval {interval}s is below the {MIN_INTERVAL}s minimum")
+        return interval
+
+    def set_interval(self, interval: float):
+        """New period, starting one interval after the last tick."""
+        self.interval = self._check(interval)
+        if self.due is not None:
+            self._next = self.due + self.interval
+        self._owed = 0
+
+    def wait(self) -> bool:
+        if self._next is None:
+            self._next = time.monotonic() + self.interval
+        while True:
+            delay = self._next - time.monotonic()
+            if delay <= 0:
+                break
+            if self._stop.wait(delay):
+                return False
+        if self._stop.is_set():
+            return False
+
+        now = time.monotonic()
+        self.due = self._next
+        self.lateness.add((now - self.due) * 1000.0)
+        self.counts["ticks"] += 1
+        if self._owed:
+            self._owed -= 1
+            self.counts["caught_up"] += 1
+
+        self._next += self.interval
+        behind = int((now - self._next) // self.interval) + 1 if now >= self._next else 0
+        if behind > self._owed:
+            # deadlines passed while this tick was late: an overrun
+            self.counts["overruns"] += 1
+            keep = self.max_catch_up if self.policy == CATCH_UP else 0
+            drop = max(0, behind - keep)
+            self._next += drop * self.interval
+            self.counts["skipped"] += drop
+            self._owed = behind - drop
+        return True
+
+    def due_time(self) -> float:
+        """Wall-clock time of the last tick's deadline."""
+        return time.time() - (time.monotonic() - self.due)
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self) -> dict:
+        return dict(self.counts, interval=self.interval, policy=self.policy,
+                    lateness=self.lateness.summary())
+
+
+# ------------------ Bench ------------------
+def _run_sleep_loop(interval, work, duration):
+    ticks, t0 = 0, time.monotonic()
+    while time.monotonic() - t0 < duration:
+        time.sleep(interval)
+        _busy(work)
+        ticks += 1
+    return ticks / (time.monotonic() - t0)
+
+
+def _run_ticker(interval, work, duration, policy):
+    ticker = Ticker(interval, policy)
+    threading.Timer(duration, ticker.stop).start()
+    t0 = time.monotonic()
+    while ticker.wait():
+        _busy(work)
+    return ticker.counts["ticks"] / (time.monotonic() - t0), ticker.stats()
+
+
+def _busy(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Achieved tick rate: sleep(interval) loop vs Ticker")
+    ap.add_argument("--interval", type=float, default=0.01)
+    ap.add_argument("--work-ms", type=float, default=2.0, help="simulated work per tick")
+    ap.add_argument("--duration", type=float, default=5.0)
+    ap.add_argument("--policy", choices=POLICIES, default=SKIP)
+    args = ap.parse_args()
+
+    target = 1.0 / args.interval
+    work = args.work_ms / 1000.0
+    rate = _run_sleep_loop(args.interval, work, args.duration)
+    print(f"[BENCH] sleep loop: {rate:.1f} ticks/s of {target:.1f} ({(rate / target - 1) * 100:+.1f}%)")
+    rate, s = _run_ticker(args.interval, work, args.duration, args.policy)
+    lat = s["lateness"]
+    print(f"[BENCH] Ticker ({args.policy}): {rate:.1f} ticks/s of {target:.1f} ({(rate / target - 1) * 100:+.1f}%), "
+          f"lateness p50 {lat['p50_ms']} / p99 {lat['p99_ms']} ms, {s['overruns']} overruns, "
+          f"{s['skipped']} skipped, {s['caught_up']} caught up")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+# group_1_spool.py
+# On-device store-and-forward for the publisher. Readings taken while the MQTT
+# connection is down are appended to a small SQLite file (one per device) instead
+# of being dropped, and replayed oldest-first as batched envelopes once the
+# connection is back. Rows are deleted only when the broker has acknowledged the
+# message that carried them, so a crash mid-replay re-sends (the admin bridge
+# dedupes by packet id) rather than loses. The file is bounded by max_readings:
+# past it the oldest readings are evicted and show up as sequence gaps.
+import os
+import sqlite3
+import threading
+
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL;",
+    "PRAGMA synchronous=NORMAL;",  # a power cut may lose the last few appends, never corrupt the file
+)
+
+
+class Spool:
+    """
+    FIFO of (counter, timestamp, value) readings for one device:
+    - append() / extend() while offline (or while older readings are still queued)
+    - send_batch(publish, n) hands the oldest unsent readings to publish() and records the
+      returned message id; acked(mid) (from on_publish) deletes them
+    - requeue(mids) gives up on batches whose ack will not come (expired, session lost):
+      their readings are handed out again by the next send_batch()
+    - Oldest-first eviction past max_readings; counters: spooled, replayed, evicted, requeued
+    - last_counter lets a restarted publisher continue numbering after the spooled readings
+    """
+    def __init__(self, path: str, max_readings: int = 100000):
+        self.path = path
+        self.max_readings = max(1, int(max_readings))
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        for pragma in PRAGMAS:
+            self.conn.execute(pragma)
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS spool (
+                counter INTEGER PRIMARY KEY,
+                timestamp REAL NOT NULL,
+                value
+            )
+        ''')
+        self.pending, self.last_counter = self.conn.execute(
+            "SELECT COUNT(*), COALESCE(MAX(counter), 0) FROM spool").fetchone()
+        self._cursor = 0     # highest counter handed to send_batch()
+        self._inflight = {}  # mid -> (first counter, last counter)
+        self.counts = dict.fromkeys(("spooled", "replayed", "evicted", "requeued"), 0)
+
+    # ------------------ Offline side ------------------
+    def append(self, reading):
+        self.extend([reading])
+
+    def extend(self, readings):
+        if not readings:
+            return
+        with self._lock:
+            self.conn.executemany("INSERT OR REPLACE INTO spool (counter, timestamp, value) VALUES (?, ?, ?)",
+                                  readings)
+            self.pending += len(readings)
+            self.counts["spooled"] += len(readings)
+            self.last_counter = max(self.last_counter, readings[-1][0])
+            excess = self.pending - self.max_readings
+            if excess > 0:
+                self.conn.execute("DELETE FROM spool WHERE counter IN "
+                                  "(SELECT counter FROM spool ORDER BY counter LIMIT ?)", (excess,))
+                self.pending -= excess
+                self.counts["evicted"] += excess
+
+    # ------------------ Replay side ------------------
+    def send_batch(self, publish, n: int) -> int:
+        """
+        publish(readings) -> message id (None when it could not be queued).
+        Returns how many readings went out; runs under the spool lock so acked()
+        cannot see the message id before it is recorded.
+        """
+        with self._lock:
+            readings = self.conn.execute(
+                "SELECT counter, timestamp, value FROM spool WHERE counter > ? ORDER BY counter LIMIT ?",
+                (self._cursor, n)).fetchall()
+            if not readings:
+                return 0
+            mid = publish(readings)
+            if mid is None:
+                return 0
+            self._inflight[mid] = (readings[0][0], readings[-1][0])
+            self._cursor = readings[-1][0]
+            self.counts["replayed"] += len(readings)
+            return len(readings)
+
+    def acked(self, mid: int):
+        with self._lock:
+            span = self._inflight.pop(mid, None)
+            if span is None:
+                return
+            gone = self.conn.execute("DELETE FROM spool WHERE counter BETWEEN ? AND ?", span).rowcount
+            self.pending -= gone
+
+    def requeue(self, mids=None) -> int:
+        """
+        Forget the listed in-flight batches (all when mids is None) and rewind so their
+        rows are sent again; returns how many batches. A late ack for one of them is ignored,
+        the rows go when the re-sent batch is acked (the admin dedupes the repeat).
+        """
+        with self._lock:
+            spans = [self._inflight.pop(mid) for mid in
+                     (list(self._inflight) if mids is None else mids) if mid in self._inflight]
+            if spans:
+                self._cursor = min(self._cursor, min(first for first, _ in spans) - 1)
+                self.counts["requeued"] += len(spans)
+            return len(spans)
+
+    @property
+    def unsent(self) -> bool:
+        """True while some spooled readings have not been handed out yet."""
+        return self.pending > 0 and self.last_counter > self._cursor
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self.counts, pending=self.pending, inflight_batches=len(self._inflight),
+                        bytes=os.path.getsize(self.path) if os.path.exists(self.path) else 0)
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
@@ -1,3 +1,4 @@
+import os
 import json
 import time
 import threading
@@ -12,8 +13,12 @@ from datetime import datetime
 from tkinter import Tk, StringVar, END, DISABLED, NORMAL, VERTICAL, Canvas
 from tkinter import ttk, scrolledtext
 import paho.mqtt.client as mqtt
+import group_1_codec as codec
 from typing import Optional, Dict, Any, List, Tuple
 from group_1_alert_manager import AlertManager
+from group_1_validator import validate_object, BAD_TYPE
+from group_1_util import extract_seq, expand_status
+from group_1_latency import LogSketch
 
 
 # ------------------ Config loader ------------------
@@ -31,8 +36,9 @@ def load_config(path="group_1_config.json"):
 CFG = load_config()
 
 # ------------------ MQTT + app config ------------------
-BROKER = CFG.get("mqtt", {}).get("broker", "broker.hivemq.com")
-PORT = CFG.get("mqtt", {}).get("port", 1883)
+# GROUP1_MQTT_BROKER / GROUP1_MQTT_PORT override the config (e.g. a local group_1_mini_broker.py)
+BROKER = os.environ.get("GROUP1_MQTT_BROKER") or CFG.get("mqtt", {}).get("broker", "broker.hivemq.com")
+PORT = int(os.environ.get("GROUP1_MQTT_PORT") or CFG.get("mqtt", {}).get("port", 1883))
 KEEPALIVE = CFG.get("mqtt", {}).get("keepalive", 15)
 QOS = CFG.get("mqtt", {}).get("qos", 1)
 
@@ -41,6 +47,12 @@ TOPIC_STATUS = CFG.get("mqtt", {}).get("topics", {}).get("status", "group_1/stat
 
 PUBLISH_INTERVAL = float(CFG.get("publish", {}).get("interval", 2.0))
 
+# batched publishers (publish.batch) send several readings per message, so messages arrive less often
+BATCH_CFG = CFG.get("publish", {}).get("batch", {})
+_BATCH_READINGS = min(max(1, int(BATCH_CFG.get("max_readings", 1))),
+                      int(float(BATCH_CFG.get("max_ms", 10000)) / 1000.0 / PUBLISH_INTERVAL) + 1)
+MESSAGE_INTERVAL = _BATCH_READINGS * PUBLISH_INTERVAL
+
 # Only wild rule matters now.
 WILD_MIN = 0.0
 WILD_MAX = 50.0
@@ -247,6 +259,9 @@ class TemperatureSubscriber:
         self.chart_labels: List[ttk.Label] = []
         self.chart_device_map: Dict[str, int] = {}  # device_id -> slot idx
 
+        # publish -> receive latency per device (payload timestamp vs arrival)
+        self.latency: Dict[str, LogSketch] = {}
+
         # reorder buffer window (seconds)
         self.REORDER_WINDOW = max(0.8, 0.6 * PUBLISH_INTERVAL)
         self.reorder_bufs: Dict[str, List[Tuple[float, str, Optional[float]]]] = defaultdict(list)
@@ -332,7 +347,7 @@ Group 1 IoT Subscriber Monitor
         dev.rowconfigure(0, weight=1)
         container.rowconfigure(3, weight=1, minsize=170)
 
-        columns = ("Device ID", "Location", "Status", "Last Value", "Last Data", "Alert")
+        columns = ("Device ID", "Location", "Status", "Last Value", "Last Data", "Latency p50/p95", "Alert")
         self.devices_tree = ttk.Treeview(dev, columns=columns, show="headings", height=8)
         for col in columns:
             self.devices_tree.heading(col, text=col)
@@ -468,21 +483,37 @@ Group 1 IoT Subscriber Monitor
 
     # ---------- Messages ----------
     def on_message(self, client, userdata, msg):
+        fmt = codec.JSON
         try:
-            raw = msg.payload.decode('utf-8', errors='replace')
-            if not raw.strip():
-                self.log_message(f"❌ Corrupt data: Empty payload from {msg.topic}")
-                return
-            payload = json.loads(raw)
+            # v5 content-type when present, else the payload's first byte (group_1_codec)
+            fmt = codec.payload_format(msg.payload, codec.content_type_of(msg))
+            if fmt == codec.JSON:
+                raw = msg.payload.decode('utf-8', errors='replace')
+                if not raw.strip():
+                    self.log_message(f"❌ Corrupt data: Empty payload from {msg.topic}")
+                    return
+                payload = json.loads(raw)
+            else:
+                payload = codec.decode(msg.payload, fmt)
             if not isinstance(payload, dict):
                 self.log_message(f"❌ Corrupt data: Payload not a JSON object from {msg.topic}")
                 return
-            if msg.topic == TOPIC_DATA:
+            if msg.topic == TOPIC_DATA and codec.is_envelope(payload):
+                # batched message: readings in order, so sequence-gap detection sees every counter
+                for reading in codec.expand(payload):
+                    self.handle_data_message(reading)
+            elif msg.topic == TOPIC_DATA:
                 self.handle_data_message(payload)
+            elif msg.topic == TOPIC_STATUS and isinstance(payload.get("devices"), dict):
+                # grouped will of a fleet connection (group_1_fleet_engine)
+                for device_id, location, status in expand_status(payload):
+                    self.handle_status_message({"device_id": device_id, "location": location, "status": status})
             elif msg.topic == TOPIC_STATUS:
                 self.handle_status_message(payload)
         except json.JSONDecodeError as e:
             self.log_message(f"❌ Corrupt data: JSON decode error from {msg.topic}: {e}")
+        except ValueError as e:
+            self.log_message(f"❌ Corrupt data: {fmt} decode error from {msg.topic}: {e}")
         except Exception as e:
             self.log_message(f"❌ Unexpected error processing {msg.topic}: {e}")
 
@@ -499,17 +530,14 @@ Group 1 IoT Subscriber Monitor
 
     def _parse_src_ts(self, t) -> float:
         try:
-            return float(t)
+            t = float(t)
         except Exception:
             return time.time()
+        # NaN / inf would poison the chart's time axis and reorder buffer
+        return t if math.isfinite(t) else time.time()
 
     def _extract_seq(self, packet_id: Optional[str]) -> Optional[int]:
-        if not packet_id or "-" not in str(packet_id):
-            return None
-        try:
-            return int(str(packet_id).split("-")[-1])
-        except ValueError:
-            return None
+        return extract_seq(packet_id)
 
     # reorder-buffer emit/queue
     def _emit_to_chart(self, device_id: str, kind: str, src_ts: float, value: Optional[float]):
@@ -532,20 +560,26 @@ Group 1 IoT Subscriber Monitor
 
     # ---------- DATA handler ----------
     def handle_data_message(self, data):
-        device_id = data.get("device_id")
+        # same compiled rules as the admin bridge (group_1_validator)
+        rx_wall = time.time()
+        result = validate_object(data, rx_wall)
+        fields = result.fields
+        device_id = fields.get("device_id")
         if not device_id:
             self.log_message("❌ Corrupt data: Missing device_id")
             return
-        location = data.get("location", "unknown")
-        sensor_data = data.get("sensor_data", {})
-        if not isinstance(sensor_data, dict):
+        # compact formats only carry the location now and then
+        location = fields.get("location") or self.device_states.get(device_id, {}).get("location") or "unknown"
+        if result.field == "sensor_data" and result.reason == BAD_TYPE:
             self.log_message(f"❌ Corrupt data from {device_id}: sensor_data not a dict")
             return
 
-        rx_wall = time.time()
         rx_mono = time.monotonic()
-        src_ts = self._parse_src_ts(data.get("timestamp"))
-        packet_id = data.get("packet_id")
+        src_ts = self._parse_src_ts(fields.get("timestamp"))
+        packet_id = fields.get("packet_id")
+        if isinstance(fields.get("timestamp"), (int, float)):
+            # LogSketch.add() counts NaN / inf / absurd timestamps as skewed instead of raising
+            self.latency.setdefault(device_id, LogSketch()).add((rx_wall - fields["timestamp"]) * 1000.0)
 
         st = self.device_states.setdefault(device_id, {
             "location": location, "status": "ONLINE",
@@ -566,13 +600,9 @@ Group 1 IoT Subscriber Monitor
             st["alert"] = ""
             self.log_message(f"✅ {device_id}: Data feed resumed")
 
-        # Parse numeric & finite
-        value_raw = sensor_data.get("value")
-        try:
-            value = float(value_raw)
-            if not math.isfinite(value):
-                raise ValueError("non-finite")
-        except (ValueError, TypeError):
+        # Numeric & finite (checked by the validator)
+        if not result.ok:
+            value_raw = (data.get("sensor_data") or {}).get("value")
             st.update({"location": location, "status": "ONLINE", "alert": "CORRUPT"})
             self._queue_for_chart(device_id, "wild", src_ts, None)  # red sloped bridge later
             # email for corrupt data
@@ -582,8 +612,9 @@ Group 1 IoT Subscriber Monitor
                 device_id, "CORRUPT_DATA"
             )
             self.update_device_display()
-            self.log_message(f"❌ Corrupt data from {device_id}: invalid/NaN value")
+            self.log_message(f"❌ Corrupt data from {device_id}: {result.detail}")
             return
+        value = float(fields["value"])
 
         # Sequence gap → flat hold + optional email for blackout
         seq = self._extract_seq(packet_id)
@@ -697,7 +728,7 @@ Group 1 IoT Subscriber Monitor
     # ---------- NO DATA watchdog (monotonic time) ----------
     def setup_monitoring_timer(self):
         NO_DATA_SLOP = 0.75
-        self.NO_DATA_THRESHOLD = (2.0 * PUBLISH_INTERVAL) + NO_DATA_SLOP
+        self.NO_DATA_THRESHOLD = (2.0 * MESSAGE_INTERVAL) + NO_DATA_SLOP
 
         def check_no_data_feed():
             now_mono = time.monotonic()
@@ -709,12 +740,12 @@ Group 1 IoT Subscriber Monitor
                             if st.get("alert") != "NO DATA":
                                 st["alert"] = "NO DATA"  # alert only; keep chart smooth
                                 self.log_message(
-                                    f"⚠️ {device_id}: No data for {elapsed:.1f}s (expected every {PUBLISH_INTERVAL}s)"
+                                    f"⚠️ {device_id}: No data for {elapsed:.1f}s (expected every {MESSAGE_INTERVAL}s)"
                                 )
                                 # Email for extended no-data blackout
                                 self.send_email_notification(
                                     f"No Data Feed - {device_id}",
-                                    f"No data has arrived for {elapsed:.1f}s (expected every {PUBLISH_INTERVAL}s).",
+                                    f"No data has arrived for {elapsed:.1f}s (expected every {MESSAGE_INTERVAL}s).",
                                     device_id, "NO_DATA_FEED"
                                 )
                                 self.update_device_display()
@@ -744,6 +775,9 @@ Group 1 IoT Subscriber Monitor
 
                     value_str = f"{last_value}°C" if isinstance(last_value, (int, float)) else "No data"
                     last_data_str = datetime.fromtimestamp(last_wall).strftime("%H:%M:%S") if last_wall else "Never"
+                    sketch = self.latency.get(device_id)
+                    latency_str = (f"{sketch.quantile(0.5):.0f} / {sketch.quantile(0.95):.0f} ms"
+                                   if sketch and sketch.count else "-")
 
                     if alert == "NETWORK DROP":
                         alert_cell = "🔴 NETWORK DROP"
@@ -761,7 +795,7 @@ Group 1 IoT Subscriber Monitor
                         alert_cell = alert or ""
 
                     self.devices_tree.insert("", "end", iid=device_id, values=(
-                        device_id, location, status, value_str, last_data_str, alert_cell
+                        device_id, location, status, value_str, last_data_str, latency_str, alert_cell
                     ))
 
             self.master.after(0, _update)
@@ -6,21 +6,24 @@ This script helps test the subscriber's ability to detect:
 2. Network Drop - when publisher goes offline (LWT message)
 """
 
+import os
 import subprocess
 import sys
 import time
 import threading
-from tkinter import Tk, Frame, Label, Button, StringVar, BooleanVar, BOTH, X, Y, LEFT, RIGHT, END, DISABLED, NORMAL
+from tkinter import Tk, Frame, Label, LabelFrame, Button, StringVar, BooleanVar, BOTH, X, Y, W, LEFT, RIGHT, END, DISABLED, NORMAL
 from tkinter import messagebox
 
 class TestScenarioController:
     def __init__(self, master):
         self.master = master
         self.master.title("Group 1 - Test Scenario Controller")
-        self.master.geometry("600x400")
+        self.master.geometry("600x460")
         
         self.publisher_process = None
         self.subscriber_process = None
+        self.broker = None
+        self.child_env = None  # set once the local broker runs
         
         self.setup_ui()
     
@@ -53,6 +56,13 @@ This controller helps test the subscriber's detection capabilities:
         button_frame = Frame(self.master)
         button_frame.pack(pady=20)
         
+        # Local broker (offline runs: group_1_mini_broker.py in this process)
+        self.start_broker_btn = Button(button_frame, text="Start Local Broker",
+                                      command=self.start_local_broker,
+                                      bg="#607D8B", fg="white", font=("Arial", 11, "bold"),
+                                      width=20)
+        self.start_broker_btn.pack(pady=5)
+
         # Start publisher button
         self.start_pub_btn = Button(button_frame, text="Start Publisher (dev001)", 
                                    command=self.start_publisher,
@@ -71,6 +81,9 @@ This controller helps test the subscriber's detection capabilities:
         status_frame = LabelFrame(self.master, text="Process Status", font=("Arial", 11, "bold"))
         status_frame.pack(fill=X, padx=20, pady=10)
         
+        self.broker_status = Label(status_frame, text="Broker: from group_1_config.json", fg="gray")
+        self.broker_status.pack(anchor=W, padx=10, pady=2)
+
         self.pub_status = Label(status_frame, text="Publisher: Stopped", fg="red")
         self.pub_status.pack(anchor=W, padx=10, pady=2)
         
@@ -93,13 +106,27 @@ This controller helps test the subscriber's detection capabilities:
                          font=("Arial", 9), justify=LEFT)
         test_list.pack(anchor=W, padx=20, pady=2)
     
+    def start_local_broker(self):
+        if self.broker is None:
+            try:
+                from group_1_mini_broker import MiniBroker
+                self.broker = MiniBroker("127.0.0.1", port=0)
+                host, port = self.broker.start()
+                # processes started from now on talk to the local broker
+                self.child_env = dict(os.environ, GROUP1_MQTT_BROKER=host, GROUP1_MQTT_PORT=str(port))
+                self.broker_status.config(text=f"Broker: local {host}:{port}", fg="green")
+                self.start_broker_btn.config(text="Local Broker Running", state=DISABLED)
+            except Exception as e:
+                self.broker = None
+                messagebox.showerror("Error", f"Failed to start local broker: {e}")
+
     def start_publisher(self):
         if self.publisher_process is None:
             try:
                 # Start publisher for dev001
                 self.publisher_process = subprocess.Popen([
                     sys.executable, "group_1_publisher.py", "dev001"
-                ], cwd=".")
+                ], cwd=".", env=self.child_env)
                 
                 self.pub_status.config(text="Publisher: Running (dev001)", fg="green")
                 self.start_pub_btn.config(text="Publisher Running", state=DISABLED)
@@ -116,7 +143,7 @@ This controller helps test the subscriber's detection capabilities:
                 # Start subscriber
                 self.subscriber_process = subprocess.Popen([
                     sys.executable, "group_1_subscriber.py"
-                ], cwd=".")
+                ], cwd=".", env=self.child_env)
                 
                 self.sub_status.config(text="Subscriber: Running", fg="green")
                 self.start_sub_btn.config(text="Subscriber Running", state=DISABLED)
@@ -168,7 +195,10 @@ This controller helps test the subscriber's detection capabilities:
                     self.subscriber_process.kill()
                 except:
                     pass
-        
+
+        if self.broker:
+            self.broker.stop()
+
         self.master.destroy()
 
 
@@ -0,0 +1,397 @@
+# group_1_trace.py
+# Recorded signal traces for repeatable benchmarks: a trace is the readings of a
+# fleet (generated from seeded DataGenerators, or captured off the data topic)
+# in a compact binary file that can be replayed byte-for-byte identically, at
+# the recorded pace or faster, into MessagePackager or the ingest bench.
+#
+#   python group_1_trace.py generate fleet.g1t --devices 500 --interval 1 --duration 600 --seed 216
+#   python group_1_trace.py capture live.g1t --duration 300      # what the broker carries now
+#   python group_1_trace.py info fleet.g1t
+#   python group_1_trace.py play fleet.g1t --speed 10           # publish it (or --dry-run)
+#   python group_1_bench_ingest.py --local-broker --embedded --trace fleet.g1t --speed 5
+#
+# File layout (little-endian):
+#   header  magic "G1TRACE\0", version, record size, first timestamp, record count, footer offset
+#   records fixed 23 bytes: timestamp f64, device index u16, packet counter u32,
+#           value kind u8 (0 number, 1 null, 2+ = text table entry), value f64
+#   footer  UTF-8 JSON: {"devices": [[device_id, location], ...], "texts": [...], "meta": {...}}
+# Fixed-size records make the player a zero-copy view over an mmap of the file.
+import os
+import sys
+import json
+import mmap
+import time
+import random
+import struct
+import argparse
+import threading
+
+import group_1_codec as codec
+from group_1_util import MessagePackager, extract_seq
+from group_1_data_generator import DataGeneratorBank
+
+MAGIC = b"G1TRACE\0"
+VERSION = 1
+_HEADER = struct.Struct("<8sHHdQQ")
+_RECORD = struct.Struct("<dHIBd")
+_NUMBER, _NULL = 0, 1
+_FLUSH_BYTES = 1 << 16
+# generated traces start here unless told otherwise, so same-seed runs are byte-identical
+GENERATE_START = 1_700_000_000.0
+
+
+class TraceRecorder:
+    """
+    Writes a trace file:
+    - record(device_id, location, counter, timestamp, value) appends one reading
+    - Device ids and text values (fault markers) go to tables in the footer; records hold indexes
+    - close() (or leaving the with block) writes the footer and the final header;
+      a file that was never closed is not a valid trace
+    """
+    def __init__(self, path: str, meta: dict = None):
+        self.path = path
+        self.meta = dict(meta or {})
+        self._f = open(path, "wb")
+        self._f.write(_HEADER.pack(MAGIC, VERSION, _RECORD.size, 0.0, 0, 0))
+        self._buf = bytearray()
+        self._devices = {}   # device_id -> index
+        self._locations = []
+        self._texts = {}
+        self.count = 0
+        self.first_ts = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def record(self, device_id, location, counter, timestamp, value):
+        d = self._devices.get(device_id)
+        if d is None:
+            if len(self._devices) > 0xFFFF:
+                raise ValueError("a trace holds at most 65536 devices")
+            d = self._devices[device_id] = len(self._devices)
+            self._locations.append(location)
+        elif location and not self._locations[d]:
+            self._locations[d] = location
+        if value is None:
+            kind, number = _NULL, 0.0
+        elif type(value) is float or type(value) is int:
+            kind, number = _NUMBER, value
+        else:
+            text = value if isinstance(value, str) else json.dumps(value)
+            k = self._texts.get(text)
+            if k is None:
+                if len(self._texts) > 253:
+                    raise ValueError("a trace holds at most 254 distinct text values")
+                k = self._texts[text] = len(self._texts)
+            kind, number = 2 + k, 0.0
+        if self.first_ts is None:
+            self.first_ts = timestamp
+        self._buf += _RECORD.pack(timestamp, d, counter & 0xFFFFFFFF, kind, number)
+        self.count += 1
+        if len(self._buf) >= _FLUSH_BYTES:
+            self._f.write(self._buf)
+            self._buf.clear()
+
+    def close(self):
+        if self._f.closed:
+            return
+        self._f.write(self._buf)
+        self._buf.clear()
+        footer_at = self._f.tell()
+        self._f.write(json.dumps({
+            "devices": [[d, loc] for d, loc in zip(self._devices, self._locations)],
+            "texts": list(self._texts),
+            "meta": self.meta,
+        }).encode())
+        self._f.seek(0)
+        self._f.write(_HEADER.pack(MAGIC, VERSION, _RECORD.size, self.first_ts or 0.0, self.count, footer_at))
+        self._f.close()
+
+
+class TracePlayer:
+    """
+    Read-only, memory-mapped trace:
+    - len(), duration, devices [(device_id, location)], meta
+    - records() yields (timestamp, device index, counter, value) straight from the mapping
+    - play(sink, speed) calls sink(timestamp, device index, counter, value) at the recorded
+      spacing divided by speed (0 = as fast as possible), on absolute monotonic deadlines
+    - payloads(fmt) feeds the readings through one MessagePackager per device, keeping
+      the recorded packet counters (and so any recorded sequence gaps)
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._f = open(path, "rb")
+        try:
+            self._mm = mmap.mmap(self._f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._f.close()
+            raise ValueError(f"{path}: empty file, not a trace")
+        magic, version, size, self.first_ts, self.count, footer_at = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"{path}: not a trace file")
+        if version != VERSION or size != _RECORD.size:
+            self.close()
+            raise ValueError(f"{path}: unsupported trace version {version}")
+        if not footer_at:
+            self.close()
+            raise ValueError(f"{path}: trace was not closed (recording interrupted?)")
+        footer = json.loads(self._mm[footer_at:].decode())
+        self.devices = [tuple(d) for d in footer["devices"]]
+        self.texts = footer["texts"]
+        self.meta = footer.get("meta", {})
+        self._end = _HEADER.size + self.count * _RECORD.size
+        self.last_ts = _RECORD.unpack_from(self._mm, self._end - _RECORD.size)[0] if self.count else self.first_ts
+
+    def __len__(self):
+        return self.count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def duration(self) -> float:
+        return self.last_ts - self.first_ts
+
+    def records(self):
+        texts = self.texts
+        view = memoryview(self._mm)[_HEADER.size:self._end]
+        try:
+            for ts, d, counter, kind, number in _RECORD.iter_unpack(view):
+                if kind == _NUMBER:
+                    yield ts, d, counter, number
+                else:
+                    yield ts, d, counter, None if kind == _NULL else texts[kind - 2]
+        finally:
+            view.release()
+
+    def play(self, sink, speed: float = 1.0, stop: threading.Event = None) -> int:
+        """Returns how many records were played (fewer when stop was set)."""
+        start = time.monotonic()
+        first = self.first_ts
+        played = 0
+        for ts, d, counter, value in self.records():
+            if speed > 0:
+                delay = start + (ts - first) / speed - time.monotonic()
+                if delay > 0 and stop is not None:
+                    if stop.wait(delay):
+                        break
+                elif delay > 0:
+                    time.sleep(delay)
+            elif stop is not None and stop.is_set():
+                break
+            sink(ts, d, counter, value)
+            played += 1
+        return played
+
+    def packagers(self, fmt: str = codec.JSON, location_every: int = 0, prefix: str = "") -> list:
+        """One MessagePackager per trace device (device ids optionally prefixed)."""
+        return [MessagePackager(prefix + device_id, location or "", fmt, location_every)
+                for device_id, location in self.devices]
+
+    def payloads(self, fmt: str = codec.JSON, rebase: bool = True):
+        """
+        (device index, payload) for every record, in order. rebase stamps each reading with
+        the current time (for replay into a live pipeline), else with its recorded timestamp.
+        """
+        packagers = self.packagers(fmt)
+        for ts, d, counter, value in self.records():
+            p = packagers[d]
+            p.counter = counter - 1
+            yield d, p.package(value, None if rebase else ts)
+
+    def close(self):
+        mm = getattr(self, "_mm", None)
+        if mm is not None:
+            mm.close()
+        self._f.close()
+
+
+# ------------------ Sources ------------------
+def generate(path, devices=100, interval=1.0, duration=60.0, seed=216, wild_rate=0.0, corrupt_rate=0.0,
+             prefix="trace", locations=("Library",), start=GENERATE_START) -> int:
+    """
+    Synthetic trace from a seeded DataGeneratorBank: every device once per interval.
+    Same arguments, same file; start=None stamps the readings from the current time instead.
+    """
+    bank = DataGeneratorBank(devices, wild_rate=wild_rate, corrupt_rate=corrupt_rate, seed=seed)
+    phase_rng = random.Random(seed)
+    phases = sorted((phase_rng.uniform(0, interval), i) for i in range(devices))
+    order = [i for _, i in phases]
+    start = time.time() if start is None else start
+    steps = max(1, int(duration / interval))
+    meta = {"source": "generate", "devices": devices, "interval": interval, "seed": seed,
+            "wild_rate": wild_rate, "corrupt_rate": corrupt_rate, "start": start}
+    with TraceRecorder(path, meta) as rec:
+        names = [(f"{prefix}{i:05d}", locations[i % len(locations)]) for i in range(devices)]
+        for step in range(steps):
+            values = bank.values(order)
+            base = start + step * interval
+            for (phase, i), value in zip(phases, values):
+                rec.record(names[i][0], names[i][1], step + 1, base + phase, value)
+        return rec.count
+
+
+def capture(path, broker, port, topic, duration=None, stop: threading.Event = None, qos=1) -> int:
+    """Record readings arriving on the data topic (arrival time, decoded value) until duration / stop."""
+    import paho.mqtt.client as mqtt
+
+    stop = stop or threading.Event()
+    lock = threading.Lock()
+    locations = {}
+    rec = TraceRecorder(path, {"source": "capture", "broker": f"{broker}:{port}", "topic": topic})
+
+    def on_message(client, userdata, msg):
+        arrived = time.time()
+        try:
+            obj = codec.decode(msg.payload, codec.payload_format(msg.payload, codec.content_type_of(msg)))
+            readings = codec.expand(obj) if codec.is_envelope(obj) else [obj]
+        except (ValueError, AttributeError):
+            return
+        with lock:
+            if rec is None or stop.is_set():
+                return
+            for r in readings:
+                device_id = r.get("device_id")
+                counter = extract_seq(r.get("packet_id"))
+                if not device_id or counter is None:
+                    continue
+                if r.get("location"):
+                    locations[device_id] = r["location"]
+                rec.record(device_id, locations.get(device_id), counter, arrived,
+                           (r.get("sensor_data") or {}).get("value"))
+
+    client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, client_id=f"group1_trace_{os.getpid()}",
+                         protocol=mqtt.MQTTv5)
+    client.on_message = on_message
+    client.on_connect = lambda c, u, f, rc, p=None: c.subscribe(topic, qos=qos)
+    client.connect(broker, port, keepalive=30)
+    client.loop_start()
+    try:
+        stop.wait(duration)
+    finally:
+        stop.set()
+        client.loop_stop()
+        client.disconnect()
+        with lock:
+            rec.close()
+    return rec.count
+
+
+# ------------------ CLI ------------------
+def _load_config(path="group_1_config.json"):
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def main():
+    cfg = _load_config()
+    mqtt_cfg = cfg.get("mqtt", {})
+    broker = os.environ.get("GROUP1_MQTT_BROKER") or mqtt_cfg.get("broker", "broker.hivemq.com")
+    port = int(os.environ.get("GROUP1_MQTT_PORT") or mqtt_cfg.get("port", 1883))
+    topic = mqtt_cfg.get("topics", {}).get("data", "group_1/temp")
+
+    ap = argparse.ArgumentParser(description="Record and replay signal traces for repeatable benchmarks")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    g = sub.add_parser("generate", help="synthetic trace from seeded generators")
+    g.add_argument("path")
+    g.add_argument("--devices", type=int, default=100)
+    g.add_argument("--interval", type=float, default=1.0)
+    g.add_argument("--duration", type=float, default=60.0, help="simulated seconds")
+    g.add_argument("--seed", type=int, default=216)
+    g.add_argument("--wild-rate", type=float, default=0.0)
+    g.add_argument("--corrupt-rate", type=float, default=0.0)
+    g.add_argument("--prefix", default="trace")
+    g.add_argument("--start", type=float, default=GENERATE_START,
+                   help=f"epoch seconds of the first step (default: {GENERATE_START:.0f}, "
+                        f"so same-seed traces are byte-identical); replays are relative to it")
+    c = sub.add_parser("capture", help="record the readings on the data topic")
+    c.add_argument("path")
+    c.add_argument("--duration", type=float, help="seconds (default: until Ctrl+C)")
+    i = sub.add_parser("info", help="describe a trace")
+    i.add_argument("path")
+    p = sub.add_parser("play", help="publish a trace to the data topic")
+    p.add_argument("path")
+    p.add_argument("--speed", type=float, default=1.0, help="pace multiplier, 0 = as fast as possible")
+    p.add_argument("--format", choices=codec.FORMATS, default=codec.JSON)
+    p.add_argument("--dry-run", action="store_true", help="package but do not publish (player throughput)")
+    args = ap.parse_args()
+
+    if args.cmd == "generate":
+        t0 = time.perf_counter()
+        n = generate(args.path, args.devices, args.interval, args.duration, args.seed,
+                     args.wild_rate, args.corrupt_rate, args.prefix,
+                     tuple(cfg.get("devices", {}).values()) or ("Library",), args.start)
+        print(f"[TRACE] {n} readings from {args.devices} devices -> {args.path} "
+              f"({os.path.getsize(args.path) / 1e6:.1f} MB) in {time.perf_counter() - t0:.1f}s")
+    elif args.cmd == "capture":
+        print(f"[TRACE] capturing {topic} from {broker}:{port} -> {args.path} (Ctrl+C to stop)")
+        stop = threading.Event()
+        worker = threading.Thread(target=capture, args=(args.path, broker, port, topic, args.duration, stop),
+                                  daemon=True)
+        worker.start()
+        try:
+            while worker.is_alive():
+                worker.join(0.5)
+        except KeyboardInterrupt:
+            stop.set()
+            worker.join(10)
+        with TracePlayer(args.path) as t:
+            print(f"[TRACE] captured {len(t)} readings from {len(t.devices)} devices")
+    elif args.cmd == "info":
+        with TracePlayer(args.path) as t:
+            size = os.path.getsize(args.path)
+            print(json.dumps({"records": len(t), "devices": len(t.devices), "duration_s": round(t.duration, 3),
+                              "bytes": size, "bytes_per_reading": round(size / max(1, len(t)), 1),
+                              "texts": t.texts, "meta": t.meta}, indent=2))
+    elif args.cmd == "play":
+        codec.check_format(args.format)
+        with TracePlayer(args.path) as t:
+            packagers = t.packagers(args.format, cfg.get("publish", {}).get("location_every", 30))
+            client = None
+            if not args.dry_run:
+                import paho.mqtt.client as mqtt
+                client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, client_id=f"group1_play_{os.getpid()}",
+                                     protocol=mqtt.MQTTv5)
+                client.max_inflight_messages_set(1000)
+                client.connect(broker, port, keepalive=30)
+                client.loop_start()
+            props = codec.publish_properties(args.format)
+            qos = mqtt_cfg.get("qos", 1)
+
+            def sink(ts, d, counter, value):
+                p = packagers[d]
+                p.counter = counter - 1
+                payload = p.package(value)
+                if client is not None:
+                    client.publish(topic, payload, qos=qos, properties=props)
+
+            t0 = time.monotonic()
+            try:
+                n = t.play(sink, args.speed)
+            except KeyboardInterrupt:
+                n = None
+            elapsed = time.monotonic() - t0
+            if client is not None:
+                deadline = time.monotonic() + 10
+                while client.want_write() and time.monotonic() < deadline:
+                    time.sleep(0.05)
+                client.loop_stop()
+                client.disconnect()
+            if n is not None:
+                print(f"[TRACE] played {n} readings in {elapsed:.1f}s ({n / max(elapsed, 1e-9):,.0f}/s, "
+                      f"trace spans {t.duration:.1f}s at speed {args.speed})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
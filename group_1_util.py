@@ -1,15 +1,36 @@
 import json
 import time
+import base64
+import group_1_codec as codec
 
 class MessagePackager:
-    def __init__(self, device_id: str, location: str):
+    """
+    Builds data-topic payloads for one device:
+    - fmt "json" (default) is the original object; "struct" / "msgpack" are the
+      compact encodings in group_1_codec (bytes, announce them with content_type)
+    - Binary formats carry location only on the first reading and then every
+      location_every readings (0 = always); consumers keep the last one seen
+    - Batching: reading() numbers and timestamps a value, package_batch() wraps
+      several of them into one envelope message (always with the location)
+    - timestamp defaults to now; schedulers pass the tick's deadline instead
+    """
+    def __init__(self, device_id: str, location: str, fmt: str = codec.JSON, location_every: int = 0):
         self.device_id = device_id
         self.location = location
         self.counter = 0
+        self.fmt = codec.check_format(fmt)
+        self.content_type = codec.CONTENT_TYPES[fmt]
+        self.location_every = max(0, int(location_every))
 
-    def package(self, value: float) -> str:
+    def package(self, value: float, timestamp: float = None):
         self.counter += 1
-        timestamp = time.time()
+        timestamp = timestamp or time.time()
+        if self.fmt != codec.JSON:
+            send_location = (not self.location_every or self.counter == 1
+                             or self.counter % self.location_every == 0)
+            value = round(value, 2) if isinstance(value, float) else value
+            return codec.encode_reading(self.fmt, self.device_id, self.counter, timestamp, value,
+                                        self.location if send_location else None)
         payload = {
             "packet_id": f"{self.device_id}-{self.counter}",
             "timestamp": timestamp,
@@ -24,6 +45,50 @@ class MessagePackager:
         }
         return json.dumps(payload)
 
+    def reading(self, value, timestamp: float = None) -> tuple:
+        """(counter, timestamp, value) for a later package_batch()."""
+        self.counter += 1
+        return self.counter, timestamp or time.time(), round(value, 2) if isinstance(value, float) else value
+
+    def package_batch(self, readings):
+        return codec.encode_envelope(self.fmt, self.device_id, readings, self.location)
+
+
+def expand_status(obj) -> list:
+    """
+    [(device_id, location, status)] from a status-topic message: a single device,
+    or the grouped will of a fleet connection (group_1_fleet_engine):
+    {"devices": {device_id: location, ...}, "status": "OFFLINE"}
+    """
+    status = obj.get("status")
+    devices = obj.get("devices")
+    if isinstance(devices, dict):
+        return [(device_id, location, status) for device_id, location in devices.items()]
+    return [(obj.get("device_id"), obj.get("location"), status)]
+
+
+def extract_seq(packet_id):
+    """Counter from a MessagePackager packet_id ("<device_id>-<counter>"), or None."""
+    if not packet_id or "-" not in str(packet_id):
+        return None
+    try:
+        return int(str(packet_id).rsplit("-", 1)[-1])
+    except ValueError:
+        return None
+
 
+# ---- keyset pagination cursors ----
+def encode_cursor(ts: float, row_id: int) -> str:
+    """Opaque token for the (ts, id) of the last row on a page."""
+    raw = json.dumps([ts, row_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
 
 
+def decode_cursor(token: str):
+    """(ts, id) from encode_cursor(); raises ValueError on a malformed token."""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        ts, row_id = json.loads(raw)
+        return float(ts), int(row_id)
+    except Exception:
+        raise ValueError(f"invalid cursor: {token!r}")
@@ -0,0 +1,212 @@
+# group_1_validator.py
+# Shared payload validation for the data topic (admin bridge and subscriber).
+# The schema below mirrors MessagePackager.package(); it is compiled once into
+# a single generated function, and expected faults (SENSOR_FAULT, NaN, None, ...)
+# come back as a result object instead of exceptions.
+import json
+from operator import itemgetter
+
+# ---- reason codes ----
+OK = "OK"
+DECODE_ERROR = "DECODE_ERROR"   # not JSON / not UTF-8 / malformed binary reading
+NOT_OBJECT = "NOT_OBJECT"       # JSON, but not an object
+MISSING = "MISSING"             # required field absent (or empty)
+BAD_TYPE = "BAD_TYPE"           # wrong JSON type
+FAULT = "FAULT"                 # sensor reported a fault marker ("SENSOR_FAULT", "ERROR")
+NULL = "NULL"                   # value is null
+NOT_NUMBER = "NOT_NUMBER"       # string that does not parse as a number
+NON_FINITE = "NON_FINITE"       # NaN / Infinity
+SKEWED = "SKEWED"               # number too far from the arrival time (max_skew)
+
+MAX_CLOCK_SKEW_S = 86400        # payload timestamps further than this from arrival are not trusted
+
+# (name, spec) in check order; identity fields come first so they are known
+# even when the reading itself is bad.
+# spec: type = "str" | "number" | "object", required, finite, faults, fields (for objects),
+#       max_skew (seconds from the `received` time passed to validate; optional fields are dropped)
+PAYLOAD_SCHEMA = (
+    ("device_id", {"type": "str", "required": True}),
+    ("packet_id", {"type": "str"}),
+    ("timestamp", {"type": "number", "finite": True, "max_skew": MAX_CLOCK_SKEW_S}),
+    ("location", {"type": "str"}),
+    ("sensor_data", {"type": "object", "required": True, "fields": (
+        ("value", {"type": "number", "required": True, "finite": True,
+                   "faults": ("SENSOR_FAULT", "ERROR")}),
+    )}),
+)
+
+
+class ValidationResult(tuple):
+    """
+    Outcome of one validation (a tuple, so building one per message stays cheap):
+    - ok: True when every required field is present and well-formed
+    - reason: one of the reason codes above (OK when ok)
+    - field: dotted path of the failing field (None when ok)
+    - detail: human-readable message for logs / anomaly rows
+    - fields: flat dict of the leaf values read so far (device_id, value, ...)
+    - data: the decoded JSON object (None if it could not be decoded)
+    """
+    __slots__ = ()
+
+    ok = property(itemgetter(0))
+    reason = property(itemgetter(1))
+    field = property(itemgetter(2))
+    detail = property(itemgetter(3))
+    fields = property(itemgetter(4))
+    data = property(itemgetter(5))
+
+    def __repr__(self):
+        return f"ValidationResult(ok={self.ok}, reason={self.reason}, field={self.field}, detail={self.detail!r})"
+
+
+# ------------------ Compiler ------------------
+# compile_schema() turns the schema into the source of one flat function
+# (straight-line type checks, no per-field calls) and exec()s it once.
+_ABSENT = object()
+
+
+def _slow_number(v, name, label, faults, finite):
+    """Non-numeric JSON value for a required number: (number, None) or (None, failure)."""
+    if v is _ABSENT:
+        return None, (MISSING, label, f"Missing {name}" + (f" in {label.rsplit('.', 2)[-2]}" if "." in label else ""))
+    if v is None:
+        return None, (NULL, label, f"Invalid {name}: None")
+    if type(v) is str:
+        if v in faults:
+            return None, (FAULT, label, f"Sensor fault detected: {v}")
+        try:
+            num = float(v)  # numeric strings ("23.5", "NaN") are rare
+        except ValueError:
+            return None, (NOT_NUMBER, label, f"Invalid {name}: {v}")
+        if finite and num - num != 0:
+            return None, (NON_FINITE, label, f"Invalid {name}: {v}")
+        return num, None
+    return None, (BAD_TYPE, label, f"Invalid {name}: {v!r}")
+
+
+class _Codegen:
+    def __init__(self):
+        self.lines = []
+        self.env = {"_R": ValidationResult, "_ABSENT": _ABSENT, "_slow_number": _slow_number,
+                    "OK": OK, "MISSING": MISSING, "BAD_TYPE": BAD_TYPE, "NON_FINITE": NON_FINITE,
+                    "SKEWED": SKEWED}
+        self.leaves = []   # (name, var) already bound, in order
+        self.n = 0
+
+    def var(self):
+        self.n += 1
+        return f"v{self.n}"
+
+    def fields(self, extra=None):
+        items = [f"{name!r}: {var}" for name, var in self.leaves]
+        if extra:
+            items.append(f"{extra!r}: None")
+        return "{" + ", ".join(items) + "}"
+
+    def emit(self, depth, line):
+        self.lines.append("    " * depth + line)
+
+    def fail(self, depth, reason, label, detail, extra=None):
+        self.emit(depth, f"return _R((False, {reason}, {label!r}, {detail}, {self.fields(extra)}, obj))")
+
+    def object_fields(self, schema, src, path, depth):
+        for name, spec in schema:
+            kind = spec.get("type")
+            required = spec.get("required", False)
+            label = path + name
+            v = self.var()
+
+            if kind == "object":
+                self.emit(depth, f"{v} = {src}.get({name!r})")
+                self.emit(depth, f"if type({v}) is not dict:")
+                if required:
+                    parent = path.rstrip(".")
+                    missing = f"Missing {name}" + (f" in {parent}" if parent else "")
+                    self.fail(depth + 1, f"MISSING if {v} is None else BAD_TYPE", label,
+                              f"{missing!r} if {v} is None else {name + ' should be an object'!r}")
+                else:
+                    self.emit(depth + 1, f"{v} = {{}}")
+                self.object_fields(spec.get("fields", ()), v, label + ".", depth)
+
+            elif kind == "str":
+                self.emit(depth, f"{v} = {src}.get({name!r})")
+                self.emit(depth, f"if type({v}) is not str or not {v}:")
+                if required:
+                    self.fail(depth + 1, f"MISSING if not {v} else BAD_TYPE", label,
+                              f"{'Missing ' + name!r} if not {v} else {name + ' should be a string'!r}", name)
+                else:
+                    self.emit(depth + 1, f"{v} = None")
+                self.leaves.append((name, v))
+
+            elif kind == "number":
+                finite = spec.get("finite", False)
+                max_skew = spec.get("max_skew")
+                self.emit(depth, f"{v} = {src}.get({name!r}, _ABSENT)")
+                self.emit(depth, f"t = type({v})")
+                self.emit(depth, "if t is float or t is int:")
+                checks = []
+                if finite:
+                    # x - x is 0.0 for finite numbers and NaN for NaN/inf
+                    checks.append((f"{v} - {v} != 0", "NON_FINITE", f"'Invalid {name}: ' + str({v})"))
+                if max_skew is not None:
+                    checks.append((f"received is not None and not -{max_skew!r} <= {v} - received <= {max_skew!r}",
+                                   "SKEWED", f"'Invalid {name}: ' + str({v}) + ' (clock skew)'"))
+                for i, (cond, reason, detail) in enumerate(checks):
+                    self.emit(depth + 1, f"{'if' if i == 0 else 'elif'} {cond}:")
+                    if required:
+                        self.fail(depth + 2, reason, label, detail, name)
+                    else:
+                        self.emit(depth + 2, f"{v} = None")
+                if not checks:
+                    self.emit(depth + 1, "pass")
+                self.emit(depth, "else:")
+                if required:
+                    key = f"_faults_{self.n}"
+                    self.env[key] = frozenset(spec.get("faults", ()))
+                    self.emit(depth + 1, f"{v}, f = _slow_number({v}, {name!r}, {label!r}, {key}, {finite!r})")
+                    self.emit(depth + 1, "if f is not None:")
+                    self.fail(depth + 2, "f[0]", label, "f[2]", name)
+                else:
+                    self.emit(depth + 1, f"{v} = None")
+                self.leaves.append((name, v))
+
+            else:
+                raise ValueError(f"unknown schema type {kind!r} for {label}")
+
+
+def compile_schema(schema):
+    """
+    Returns validate(obj, received=None) -> ValidationResult for an already decoded JSON object;
+    received (arrival time) enables the max_skew checks.
+    """
+    gen = _Codegen()
+    gen.emit(0, "def validate(obj, received=None):")
+    gen.emit(1, "if type(obj) is not dict:")
+    gen.emit(2, "return _R((False, 'NOT_OBJECT', None, 'Payload is not a JSON object', {}, obj))")
+    gen.object_fields(schema, "obj", "", 1)
+    gen.emit(1, f"return _R((True, OK, None, '', {gen.fields()}, obj))")
+    source = "\n".join(gen.lines)
+    namespace = dict(gen.env)
+    exec(compile(source, "<validator>", "exec"), namespace)
+    validate = namespace["validate"]
+    validate.source = source
+    return validate
+
+
+validate_object = compile_schema(PAYLOAD_SCHEMA)
+
+
+def decode_failure(detail: str) -> ValidationResult:
+    """Result for a payload that could not be decoded at all (any wire format)."""
+    return ValidationResult((False, DECODE_ERROR, None, detail, {}, None))
+
+
+def validate_payload(payload, received=None):
+    """Validate raw MQTT payload bytes/str (or an already decoded dict)."""
+    if type(payload) is dict:
+        return validate_object(payload, received)
+    try:
+        obj = json.loads(payload)
+    except (ValueError, TypeError) as e:  # JSONDecodeError and UnicodeDecodeError are ValueErrors
+        return decode_failure(f"JSON decode error: {e}")
+    return validate_object(obj, received)
@@ -0,0 +1,233 @@
+# group_1_write_queue.py
+import time
+import queue
+import sqlite3
+import threading
+from group_1_db_pool import get_pool
+from group_1_metrics import FLUSH_SECONDS, FLUSH_ROWS
+
+_STOP = object()
+
+
+class _Rows(list):
+    """Several parameter tuples for one statement, queued as a single item by put_many()."""
+    __slots__ = ()
+
+
+class WriteBehindQueue:
+    """
+    Group-commit writer for the admin database:
+    - Producers (the MQTT bridge) only enqueue (sql, params) and never touch SQLite
+    - put_many() queues the rows of one batched message as a single item
+    - A single writer thread drains the bounded queue
+    - Pending rows are flushed with one executemany per statement inside one transaction
+    - A flush happens when batch_size rows are pending or flush_ms has elapsed
+    - Flush hooks run inside the same transaction (e.g. incremental rollups)
+    - Commit hooks run after COMMIT with the tags of the rows it made durable
+    """
+    def __init__(self, db_path: str, batch_size: int = 500, flush_ms: float = 50, max_size: int = 20000):
+        self.db_path = db_path
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval = max(0.001, float(flush_ms) / 1000.0)
+        self.max_size = max(1, int(max_size))
+
+        self._q = queue.Queue(maxsize=self.max_size)
+        self._thread = threading.Thread(target=self._run, name="admin-writer", daemon=True)
+        self._started = False
+        self._hooks = []
+        self._commit_hooks = []
+
+        # stats (only the writer thread updates these, except full_waits)
+        self._stats_lock = threading.Lock()
+        self.rows_written = 0
+        self.rows_failed = 0
+        self.batches = 0
+        self.full_waits = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self._total_flush_ms = 0.0
+
+    # ------------------ Public API ------------------
+    def start(self):
+        if not self._started:
+            self._started = True
+            self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        """Flush everything still queued and stop the writer thread."""
+        if not self._started:
+            return
+        self._q.put(_STOP)
+        self._thread.join(timeout)
+        self._started = False
+
+    def put(self, sql: str, params: tuple, tag=None):
+        """Queue one row; blocks (back-pressure) if the queue is full. `tag` goes to the commit hooks."""
+        if self._q.full():
+            with self._stats_lock:
+                self.full_waits += 1
+        self._q.put((sql, params, tag))
+
+    def put_many(self, sql: str, rows: list, tags=None):
+        """Queue several rows of one statement as one item (one queue hand-off for a whole batch)."""
+        if not rows:
+            return
+        if self._q.full():
+            with self._stats_lock:
+                self.full_waits += 1
+        self._q.put((sql, _Rows(rows), list(tags) if tags else None))
+
+    def kick(self):
+        """Make the writer run a flush (and its hooks) even if no rows are queued."""
+        self._q.put((None, None, None))
+
+    def add_flush_hook(self, fn):
+        """fn(conn) is called inside every flush transaction, before COMMIT."""
+        self._hooks.append(fn)
+
+    def add_commit_hook(self, fn):
+        """fn(tags, commit_ts) is called after every successful COMMIT with the tags of its tagged rows."""
+        self._commit_hooks.append(fn)
+
+    def join(self):
+        """Wait until every queued row has been committed."""
+        self._q.join()
+
+    def depth(self) -> int:
+        return self._q.qsize()
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            avg = (self._total_flush_ms / self.batches) if self.batches else 0.0
+            return {
+                "queue_depth": self._q.qsize(),
+                "queue_max": self.max_size,
+                "batch_size": self.batch_size,
+                "flush_ms": self.flush_interval * 1000.0,
+                "rows_written": self.rows_written,
+                "rows_failed": self.rows_failed,
+                "batches": self.batches,
+                "full_waits": self.full_waits,
+                "last_flush_ms": round(self.last_flush_ms, 3),
+                "avg_flush_ms": round(avg, 3),
+                "max_flush_ms": round(self.max_flush_ms, 3),
+            }
+
+    # ------------------ Internal ------------------
+    def _run(self):
+        # the writer keeps one pooled read-write connection for its whole life
+        conn = get_pool(self.db_path).acquire()
+        stopping = False
+        try:
+            while not stopping:
+                item = self._q.get()
+                if item is _STOP:
+                    self._q.task_done()
+                    break
+
+                batch = [item]
+                pending = _row_count(item)
+                deadline = time.monotonic() + self.flush_interval
+                while pending < self.batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        item = self._q.get(timeout=remaining)
+                    except queue.Empty:
+                        break
+                    if item is _STOP:
+                        self._q.task_done()
+                        stopping = True
+                        break
+                    batch.append(item)
+                    pending += _row_count(item)
+
+                try:
+                    self._flush(conn, batch)
+                finally:
+                    for _ in batch:
+                        self._q.task_done()
+        finally:
+            conn.close()
+
+    def _flush(self, conn, batch):
+        # group rows by statement, keeping first-seen order
+        grouped = {}
+        tags = []
+        for sql, params, tag in batch:
+            if sql is None:
+                continue
+            if type(params) is _Rows:
+                grouped.setdefault(sql, []).extend(params)
+                if tag:
+                    tags.extend(tag)
+                continue
+            grouped.setdefault(sql, []).append(params)
+            if tag is not None:
+                tags.append(tag)
+
+        started = time.perf_counter()
+        written = failed = 0
+        try:
+            conn.execute("BEGIN")
+            for sql, rows in grouped.items():
+                conn.execute("SAVEPOINT stmt")
+                try:
+                    conn.executemany(sql, rows)
+                    conn.execute("RELEASE stmt")
+                    written += len(rows)
+                except sqlite3.Error as e:
+                    # one bad row must not cost the whole batch: retry row by row
+                    conn.execute("ROLLBACK TO stmt")
+                    conn.execute("RELEASE stmt")
+                    print(f"[ADMIN] Batch insert error ({e}); retrying {len(rows)} rows individually")
+                    for params in rows:
+                        try:
+                            conn.execute(sql, params)
+                            written += 1
+                        except sqlite3.Error as row_err:
+                            failed += 1
+                            print(f"[ADMIN] Error inserting row: {row_err}")
+            for hook in self._hooks:
+                conn.execute("SAVEPOINT hook")
+                try:
+                    hook(conn)
+                    conn.execute("RELEASE hook")
+                except Exception as e:
+                    conn.execute("ROLLBACK TO hook")
+                    conn.execute("RELEASE hook")
+                    print(f"[ADMIN] Flush hook error: {e}")
+            conn.execute("COMMIT")
+            committed_at = time.time()
+            for hook in self._commit_hooks:
+                try:
+                    hook(tags, committed_at)
+                except Exception as e:
+                    print(f"[ADMIN] Commit hook error: {e}")
+        except sqlite3.Error as e:
+            print(f"[ADMIN] Flush failed, {sum(map(_row_count, batch))} rows lost: {e}")
+            try:
+                conn.execute("ROLLBACK")
+            except sqlite3.Error:
+                pass
+            written, failed = 0, sum(len(rows) for rows in grouped.values())
+
+        elapsed_ms = (time.perf_counter() - started) * 1000.0
+        FLUSH_SECONDS.observe(elapsed_ms / 1000.0)
+        FLUSH_ROWS.inc("written", n=written)
+        if failed:
+            FLUSH_ROWS.inc("failed", n=failed)
+        with self._stats_lock:
+            self.rows_written += written
+            self.rows_failed += failed
+            self.batches += 1
+            self.last_flush_ms = elapsed_ms
+            self._total_flush_ms += elapsed_ms
+            if elapsed_ms > self.max_flush_ms:
+                self.max_flush_ms = elapsed_ms
+
+
+def _row_count(item) -> int:
+    params = item[1]
+    return len(params) if type(params) is _Rows else 1